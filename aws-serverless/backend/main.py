@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
@@ -7,6 +8,8 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from dependencies import limiter
 from database import create_text_index
+from services.vector_search import FAISS_BACKGROUND_REFRESH, refresh_index_periodically
+from services.task_queue import ensure_indexes as ensure_task_queue_indexes
 from routes import (
     auth,
     jobs,
@@ -36,6 +39,10 @@ app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 @app.on_event("startup")
 async def startup_event():
     await create_text_index()
+    await ensure_task_queue_indexes()
+    await jobs.ensure_indexes()
+    if FAISS_BACKGROUND_REFRESH:
+        asyncio.create_task(refresh_index_periodically())
 
 # This is the handler that AWS Lambda will invoke
 handler = Mangum(app)
@@ -9,18 +9,15 @@ from datetime import datetime, timedelta
 from encryption import decrypt_field
 import razorpay
 import os
-import asyncio
-import uuid
 
 router = APIRouter()
 users_collection = db["users"]
 recommendations_collection = db["recommendations"]
-tasks_collection = db["generation_tasks"]
 
 # Import recommendation generation function (lazy import to avoid circular dependency)
-def get_recommendation_generator():
-    from routes.recommendations import _run_recommendation_generation
-    return _run_recommendation_generation
+def get_generation_starter():
+    from routes.recommendations import start_generation_task
+    return start_generation_task
 
 razorpay_client = razorpay.Client(
     auth=(os.getenv("RAZORPAY_KEY_ID"), os.getenv("RAZORPAY_KEY_SECRET"))
@@ -386,20 +383,9 @@ async def complete_onboarding(current_user: dict = Depends(get_current_user)):
                 existing_jobs = user.get("job_applications", [])
                 
                 if not existing_recs and not existing_jobs:
-                    # Create a generation task and start background recommendation generation
-                    task_id = str(uuid.uuid4())
-                    await tasks_collection.insert_one({
-                        "_id": task_id,
-                        "user_id": str(user_id),
-                        "status": "pending",
-                        "source": "onboarding_auto",
-                        "created_at": datetime.utcnow(),
-                        "updated_at": datetime.utcnow()
-                    })
-                    
-                    # Get the recommendation generator and run it
-                    _run_recommendation_generation = get_recommendation_generator()
-                    asyncio.create_task(_run_recommendation_generation(str(user_id), task_id))
+                    # Queue a generation task (started right away in inline mode)
+                    start_generation_task = get_generation_starter()
+                    task_id = await start_generation_task(str(user_id), source="onboarding_auto")
                     auto_generation_started = True
                     print(f"DEBUG: Auto-started recommendation generation for new user {user_id}")
     except Exception as e:
@@ -449,20 +435,9 @@ async def skip_onboarding(current_user: dict = Depends(get_current_user)):
                 existing_jobs = user.get("job_applications", [])
                 
                 if not existing_recs and not existing_jobs:
-                    # Create a generation task and start background recommendation generation
-                    task_id = str(uuid.uuid4())
-                    await tasks_collection.insert_one({
-                        "_id": task_id,
-                        "user_id": str(user_id),
-                        "status": "pending",
-                        "source": "onboarding_skip_auto",
-                        "created_at": datetime.utcnow(),
-                        "updated_at": datetime.utcnow()
-                    })
-                    
-                    # Get the recommendation generator and run it
-                    _run_recommendation_generation = get_recommendation_generator()
-                    asyncio.create_task(_run_recommendation_generation(str(user_id), task_id))
+                    # Queue a generation task (started right away in inline mode)
+                    start_generation_task = get_generation_starter()
+                    task_id = await start_generation_task(str(user_id), source="onboarding_skip_auto")
                     auto_generation_started = True
                     print(f"DEBUG: Auto-started recommendation generation for skipped-onboarding user {user_id}")
     except Exception as e:
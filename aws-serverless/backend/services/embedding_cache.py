@@ -0,0 +1,185 @@
+"""
+Embedding Cache for Tackleit v2.5
+
+Two-tier cache for Gemini embeddings, keyed by a hash of (model, task_type, text):
+1. In-process LRU (per worker / Lambda container) with TTL and a max entry count
+2. MongoDB `embedding_cache` collection shared by every worker, with a TTL index
+   and a document cap enforced by trimming the oldest entries
+
+Vectors are stored as raw float32 bytes so this module doesn't need numpy;
+callers rebuild arrays with np.frombuffer.
+
+Embedding calls run in worker threads, so the Mongo tier uses synchronous pymongo.
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_CACHE_TTL_SECONDS = int(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "2048"))
+EMBEDDING_CACHE_MONGO = os.getenv("EMBEDDING_CACHE_MONGO", "true").lower() in ("1", "true", "yes")
+EMBEDDING_CACHE_MONGO_MAX_DOCS = int(os.getenv("EMBEDDING_CACHE_MONGO_MAX_DOCS", "50000"))
+# Check the Mongo document cap once every N writes rather than on each one
+_TRIM_EVERY_N_WRITES = 100
+# Seconds to wait before reconnecting after the Mongo tier was unreachable
+_RECONNECT_AFTER_SECONDS = 60
+
+# --- In-process LRU tier ---
+_lru = OrderedDict()  # key -> (vector_bytes, expires_at)
+_lru_lock = threading.Lock()
+
+# --- MongoDB tier ---
+_collection = None
+_collection_ready = False  # connected, or the tier is disabled
+_collection_failed_at = None
+_collection_lock = threading.Lock()
+_writes_since_trim = 0
+
+
+def make_key(model: str, task_type: str, text: str) -> str:
+    """Cache key for one embedding: sha256 over model, task type and text."""
+    digest = hashlib.sha256()
+    for part in (model, task_type, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _get_collection():
+    """
+    Lazily connect to the Mongo tier. Returns None if it's disabled or unreachable;
+    an unreachable tier is retried after _RECONNECT_AFTER_SECONDS.
+    """
+    global _collection, _collection_ready, _collection_failed_at
+    if _collection_ready:
+        return _collection
+    with _collection_lock:
+        if _collection_ready:
+            return _collection
+        if _collection_failed_at is not None and time.monotonic() - _collection_failed_at < _RECONNECT_AFTER_SECONDS:
+            return None
+
+        mongo_uri = os.getenv("MONGO_URI", "")
+        if not EMBEDDING_CACHE_MONGO or not mongo_uri:
+            _collection_ready = True
+            return None
+        try:
+            from pymongo import MongoClient
+            collection = MongoClient(mongo_uri)["jobfinder"]["embedding_cache"]
+            # TTL index drops entries after EMBEDDING_CACHE_TTL_SECONDS; also used to find the oldest when trimming
+            collection.create_index("created_at", expireAfterSeconds=EMBEDDING_CACHE_TTL_SECONDS)
+        except Exception as e:
+            print(f"DEBUG: Embedding cache Mongo tier unavailable (non-fatal), retrying in {_RECONNECT_AFTER_SECONDS}s: {e}")
+            _collection_failed_at = time.monotonic()
+            return None
+        _collection = collection
+        _collection_ready = True
+        _collection_failed_at = None
+        return _collection
+
+
+def _lru_get(key: str):
+    with _lru_lock:
+        entry = _lru.get(key)
+        if entry is None:
+            return None
+        vector_bytes, expires_at = entry
+        if expires_at < time.time():
+            del _lru[key]
+            return None
+        _lru.move_to_end(key)
+        return vector_bytes
+
+
+def _lru_put(key: str, vector_bytes: bytes):
+    with _lru_lock:
+        _lru[key] = (vector_bytes, time.time() + EMBEDDING_CACHE_TTL_SECONDS)
+        _lru.move_to_end(key)
+        while len(_lru) > EMBEDDING_CACHE_MAX_ENTRIES:
+            _lru.popitem(last=False)
+
+
+def _trim_collection(collection):
+    """Size-based eviction: delete the oldest documents beyond the configured cap."""
+    excess = collection.estimated_document_count() - EMBEDDING_CACHE_MONGO_MAX_DOCS
+    if excess <= 0:
+        return
+    oldest = collection.find({}, {"_id": 1}).sort("created_at", 1).limit(excess)
+    collection.delete_many({"_id": {"$in": [doc["_id"] for doc in oldest]}})
+    print(f"DEBUG: Embedding cache trimmed {excess} oldest entries")
+
+
+def get_many(keys: list) -> dict:
+    """
+    Look up embeddings for a list of cache keys.
+
+    Returns:
+        dict mapping key -> float32 vector bytes for every key that was found
+    """
+    found = {}
+    missing = []
+    for key in keys:
+        vector_bytes = _lru_get(key)
+        if vector_bytes is not None:
+            found[key] = vector_bytes
+        else:
+            missing.append(key)
+
+    collection = _get_collection() if missing else None
+    if collection is not None:
+        try:
+            for doc in collection.find({"_id": {"$in": missing}}, {"vector": 1}):
+                vector_bytes = bytes(doc["vector"])
+                found[doc["_id"]] = vector_bytes
+                _lru_put(doc["_id"], vector_bytes)
+        except Exception as e:
+            print(f"DEBUG: Embedding cache lookup failed (non-fatal): {e}")
+
+    return found
+
+
+def put_many(vectors: dict, model: str, task_type: str):
+    """
+    Store freshly computed embeddings in both tiers.
+
+    Args:
+        vectors: dict mapping cache key -> float32 vector bytes
+        model: Embedding model name (kept on the document for inspection)
+        task_type: Gemini task type the vectors were computed for
+    """
+    global _writes_since_trim
+    if not vectors:
+        return
+
+    for key, vector_bytes in vectors.items():
+        _lru_put(key, vector_bytes)
+
+    collection = _get_collection()
+    if collection is None:
+        return
+    try:
+        from pymongo import UpdateOne
+        from bson.binary import Binary
+        now = datetime.utcnow()
+        collection.bulk_write([
+            UpdateOne(
+                {"_id": key},
+                {"$set": {"vector": Binary(vector_bytes), "model": model, "task_type": task_type, "created_at": now}},
+                upsert=True,
+            )
+            for key, vector_bytes in vectors.items()
+        ], ordered=False)
+
+        _writes_since_trim += len(vectors)
+        if _writes_since_trim >= _TRIM_EVERY_N_WRITES:
+            _writes_since_trim = 0
+            _trim_collection(collection)
+    except Exception as e:
+        print(f"DEBUG: Embedding cache write failed (non-fatal): {e}")
@@ -0,0 +1,145 @@
+"""
+Job Feature Columns for Tackleit v2.5
+
+Per-job attributes used by the recommendation hard filters, computed once at
+index build time and stored as extra columns of faiss_id_map.npy. Vector search
+turns a set of filters into an eligible-id mask over these columns, so FAISS
+only returns jobs that pass the filters.
+
+The keyword tables here are also used by pre_filter_jobs in
+services/prefilter.py, so the filters applied in the index and the ones
+applied in Python stay identical.
+
+Pure Python (no numpy) so scraper/build_embeddings.py can import it as well.
+"""
+
+import hashlib
+
+# --- Title / location keyword tables ---
+SENIOR_TITLE_KEYWORDS = ["senior", "sr.", "sr ", "lead", "principal", "staff", "architect", "director", "head"]
+ENTRY_TITLE_KEYWORDS = ["fresher", "entry", "graduate", "intern", "trainee", "associate", "junior"]
+MANAGEMENT_TITLE_KEYWORDS = ["manager", "head", "director", "vp", "team lead", "engineering manager"]
+REMOTE_KEYWORDS = ["remote", "work from home", "wfh", "anywhere", "distributed", "remote-first"]
+
+# Map user experience level to maximum years they can apply for
+USER_MAX_EXPERIENCE_YEARS = {
+    "fresher": 1, "internship": 1, "1-3 years": 3,
+    "3-5 years": 5, "5-7 years": 7, "7-10 years": 10, "10+ years": 15
+}
+DEFAULT_USER_MAX_EXPERIENCE_YEARS = 5  # mid-level
+# Allow applying to jobs requiring up to 1 year more than user has
+EXPERIENCE_TOLERANCE_YEARS = 1
+
+# --- Bits of the `flags` column ---
+FLAG_REMOTE = 1
+FLAG_SENIOR_TITLE = 2
+FLAG_ENTRY_TITLE = 4
+FLAG_MANAGEMENT_TITLE = 8
+
+# Metro areas, one bit each in the `location_mask` column.
+# Append only: the bit position is the list index and is baked into built indexes.
+LOCATION_BUCKETS = [
+    ("bangalore", ["bangalore", "bengaluru", "blr"]),
+    ("mumbai", ["mumbai", "bombay"]),
+    ("chennai", ["chennai", "madras"]),
+    ("kolkata", ["kolkata", "calcutta"]),
+    ("delhi ncr", ["delhi", "new delhi", "ncr", "gurgaon", "gurugram", "noida"]),
+    ("hyderabad", ["hyderabad", "hyd"]),
+    ("pune", ["pune"]),
+]
+
+# Extra columns appended to the id map's ("faiss_id", "oid") layout.
+# experience_min_years is -1 when the job doesn't state it.
+JOB_FEATURE_DTYPE = [
+    ("experience_min_years", "i1"),
+    ("flags", "u1"),
+    ("location_mask", "<u2"),
+    ("company_id", "<u4"),
+]
+
+
+def company_key(company: str) -> int:
+    """Stable 32-bit id for a company name (case/whitespace-insensitive); 0 means unknown."""
+    name = " ".join(str(company or "").lower().split())
+    if not name:
+        return 0
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=4).digest(), "little") or 1
+
+
+def location_mask(location: str) -> int:
+    """Bitmask of the LOCATION_BUCKETS mentioned in a location string."""
+    location = (location or "").lower()
+    mask = 0
+    for bit, (_, aliases) in enumerate(LOCATION_BUCKETS):
+        if any(alias in location for alias in aliases):
+            mask |= 1 << bit
+    return mask
+
+
+def title_flags(title: str) -> int:
+    """FLAG_* bits derived from a job title (case-insensitive)."""
+    title = (title or "").lower()
+    flags = 0
+    if any(kw in title for kw in SENIOR_TITLE_KEYWORDS):
+        flags |= FLAG_SENIOR_TITLE
+    if any(kw in title for kw in ENTRY_TITLE_KEYWORDS):
+        flags |= FLAG_ENTRY_TITLE
+    if any(kw in title for kw in MANAGEMENT_TITLE_KEYWORDS):
+        flags |= FLAG_MANAGEMENT_TITLE
+    return flags
+
+
+def job_feature_row(job: dict) -> tuple:
+    """Values for one job in JOB_FEATURE_DTYPE field order."""
+    location = (job.get("location") or "").lower()
+    flags = title_flags(job.get("title"))
+    if any(kw in location for kw in REMOTE_KEYWORDS):
+        flags |= FLAG_REMOTE
+
+    min_years = job.get("experience_min_years")
+    try:
+        min_years = max(0, min(int(min_years), 127)) if min_years is not None else -1
+    except (TypeError, ValueError):
+        min_years = -1
+
+    return (min_years, flags, location_mask(location), company_key(job.get("company")))
+
+
+def user_seniority(prefs: dict) -> tuple:
+    """(is_fresher, is_senior, is_mid_level) for a user's experience/seniority preferences."""
+    experience_level = (prefs.get("experience_level") or "").lower().strip()
+    seniority_level = (prefs.get("seniority_level") or "").lower().strip()
+    is_fresher = experience_level in ["fresher", "internship"] or "junior" in seniority_level
+    is_senior = experience_level in ["5-7 years", "7-10 years", "10+ years"] or \
+               any(x in seniority_level for x in ["senior", "staff", "principal", "architect"])
+    is_mid_level = experience_level in ["1-3 years", "3-5 years"] or "mid" in seniority_level
+    return is_fresher, is_senior, is_mid_level
+
+
+def search_filters_for_preferences(prefs: dict) -> dict:
+    """
+    The structured hard filters of pre_filter_jobs that can be answered from the
+    feature columns, in the form search_similar_jobs accepts.
+
+    Exclude keywords and must-have keywords need the full job text, so they
+    are still applied by pre_filter_jobs after the search.
+    """
+    experience_level = (prefs.get("experience_level") or "").lower().strip()
+    role_type = (prefs.get("role_type") or "").lower().strip()
+    is_fresher, is_senior, _ = user_seniority(prefs)
+
+    filters = {
+        "max_experience_years": USER_MAX_EXPERIENCE_YEARS.get(experience_level, DEFAULT_USER_MAX_EXPERIENCE_YEARS)
+                                + EXPERIENCE_TOLERANCE_YEARS,
+    }
+    # Freshers should NOT see senior jobs
+    if is_fresher:
+        filters["exclude_senior_titles"] = True
+    # Seniors should NOT see entry/fresher jobs (unless they're actually senior roles)
+    if is_senior:
+        filters["exclude_entry_titles"] = True
+    if "individual contributor" in role_type:
+        filters["exclude_management_titles"] = True
+    if "management" in role_type:
+        filters["management_titles_only"] = True
+    return filters
@@ -0,0 +1,109 @@
+"""
+Job Text Normalization for Tackleit v2.5
+
+Derived text fields stored on each job document under `normalized` when it is
+inserted (routes/jobs.create_job) or backfilled (scraper/backfill_job_fields.py):
+
+- title / description / location / company: lowercased copies used by the pre-filter
+- title_tokens: word tokens of the lowercased title
+- snippet: the truncated description that goes into the Gemini prompt
+- embedding_text: the text build_embeddings embeds for the job
+
+Readers only trust the subdocument when its version matches NORMALIZED_VERSION
+and recompute the values otherwise, so jobs that haven't been backfilled
+still work.
+
+Pure Python so scraper/build_embeddings.py can import it as well.
+"""
+
+import re
+
+# Bump when any derived field changes; the backfill recomputes older documents
+NORMALIZED_VERSION = 1
+
+# Description characters kept in the Gemini prompt / in the embedding text
+PROMPT_DESCRIPTION_CHARS = 250
+EMBEDDING_DESCRIPTION_CHARS = 500
+
+# Words, keeping tech spellings like "c++", "c#", "node.js" and "ci/cd" together
+_TOKEN_PATTERN = re.compile(r"[a-z0-9+#]+(?:[./-][a-z0-9+#]+)*")
+
+
+def create_job_text(job: dict) -> str:
+    """
+    Create a text representation of a job for embedding.
+    Combines title, company, location, and description into a single string.
+    """
+    parts = []
+
+    title = job.get("title", "")
+    if title:
+        parts.append(f"{title}")
+
+    company = job.get("company", "")
+    if company:
+        parts.append(f"at {company}")
+
+    location = job.get("location", "")
+    if location:
+        parts.append(f"in {location}")
+
+    description = job.get("description", "")
+    if description:
+        # Truncate description to keep embedding focused
+        parts.append(f". {description[:EMBEDDING_DESCRIPTION_CHARS]}")
+
+    return " ".join(parts) if parts else "Job listing"
+
+
+def normalize_job(job: dict) -> dict:
+    """Derived fields for a job document (the value stored under `normalized`)."""
+    title = (job.get("title") or "").lower()
+    description = job.get("description") or ""
+    return {
+        "version": NORMALIZED_VERSION,
+        "title": title,
+        "description": description.lower(),
+        "location": (job.get("location") or "").lower(),
+        "company": " ".join(str(job.get("company") or "").lower().split()),
+        "title_tokens": _TOKEN_PATTERN.findall(title),
+        "snippet": description[:PROMPT_DESCRIPTION_CHARS] + "..." if description else None,
+        "embedding_text": create_job_text(job),
+    }
+
+
+def normalized(job: dict):
+    """The job's stored `normalized` fields, or None if missing or from an older version."""
+    fields = job.get("normalized")
+    if fields and fields.get("version") == NORMALIZED_VERSION:
+        return fields
+    return None
+
+
+def lowercase_fields(job: dict) -> tuple:
+    """(title, description, location) lowercased, from the job's normalized fields when stored."""
+    fields = normalized(job)
+    if fields is not None:
+        return fields["title"], fields["description"], fields["location"]
+    return (
+        (job.get("title") or "").lower(),
+        (job.get("description") or "").lower(),
+        (job.get("location") or "").lower(),
+    )
+
+
+def prompt_snippet(job: dict):
+    """Truncated description for the Gemini prompt (None if the job has no description)."""
+    fields = normalized(job)
+    if fields is not None:
+        return fields.get("snippet")
+    description = job.get("description")
+    return description[:PROMPT_DESCRIPTION_CHARS] + "..." if description else None
+
+
+def embedding_text(job: dict) -> str:
+    """create_job_text for a job, from the stored field when present."""
+    fields = normalized(job)
+    if fields is not None:
+        return fields["embedding_text"]
+    return create_job_text(job)
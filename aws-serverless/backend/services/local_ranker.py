@@ -0,0 +1,165 @@
+"""
+Local Recommendation Ranker for Tackleit v2.5
+
+Deterministic ranking of pre-filtered jobs in milliseconds, without an LLM.
+A calibrated heuristic over three signals:
+- relevance: `_prefilter_score`, reaching 1.0 at PREFILTER_SCORE_SCALE
+- similarity: `_vector_similarity`, 1.0 for the best FAISS hit down towards 0
+  for the last (neutral for jobs from the full-scan fallback)
+- taste: the user's load_taste_signals; liked/saved companies and liked title
+  keywords push a job up, disliked ones push it down
+
+    match_score = 45 + 35 * relevance + 15 * similarity + 10 * taste
+
+clamped to 30-95, roughly the range Gemini's scores fall in. At most
+MAX_PER_COMPANY jobs per company are picked while others are left, and every
+reason names the signals that matched.
+
+LOCAL_RANKER_MODE decides when it replaces Gemini's ranking:
+- "fallback" (default): Gemini failed, or returned too few jobs (top-up)
+- "hedge": also when Gemini hasn't answered within LOCAL_RANKER_HEDGE_SECONDS
+- "primary": always; Gemini isn't called
+"""
+
+import os
+from dotenv import load_dotenv
+
+from services import job_features
+from services.job_text import lowercase_fields
+from services.matching import cities_from_locations, city_aliases, expand_roles
+
+load_dotenv()
+
+LOCAL_RANKER_MODE = os.getenv("LOCAL_RANKER_MODE", "fallback").lower()
+LOCAL_RANKER_HEDGE_SECONDS = float(os.getenv("LOCAL_RANKER_HEDGE_SECONDS", "25"))
+
+# Pre-filter score counted as a full match (role + location + several skills)
+PREFILTER_SCORE_SCALE = 25
+NEUTRAL_SIMILARITY = 0.5
+MIN_MATCH_SCORE = 30
+MAX_MATCH_SCORE = 95
+MAX_PER_COMPANY = 2
+
+
+def _user_context(prefs: dict, resume: dict = None) -> dict:
+    """Lowercased preference lists the ranker matches against, computed once per ranking."""
+    preferred_locations = [loc.lower().strip() for loc in prefs.get("location", [])]
+    work_arrangements = [wa.lower().strip() for wa in prefs.get("work_arrangement", [])]
+    roles = [role.lower().strip() for role in prefs.get("role", [])]
+    return {
+        "roles": roles,
+        "expanded_roles": expand_roles(roles, resume),
+        # (match key, display name) so reasons keep the user's spelling
+        "skills": [(tech.lower().strip(), tech.strip()) for tech in prefs.get("tech_stack", [])],
+        "cities": [(city, city_aliases(city)) for city in cities_from_locations(preferred_locations)],
+        "wants_remote": any("remote" in loc for loc in preferred_locations + work_arrangements),
+    }
+
+
+def _taste_context(taste: dict) -> dict:
+    if not taste:
+        return {}
+    return {
+        "liked_companies": {" ".join(c.lower().split()) for c in taste.get("positive_companies", {})},
+        "disliked_companies": {" ".join(c.lower().split()) for c in taste.get("disliked_companies", {})},
+        "liked_keywords": list(taste.get("liked_keywords", {})),
+        "disliked_keywords": list(taste.get("disliked_keywords", {})),
+    }
+
+
+def _score_job(job: dict, context: dict, taste: dict) -> tuple:
+    """(match_score, reasons) for one job."""
+    title, description, location = lowercase_fields(job)
+    reasons = []
+
+    role = next((r for r in context["roles"] if r and r in title), None) or \
+        next((r for r in context["expanded_roles"] if r and r in title), None)
+    if role:
+        reasons.append(f"title matches your target role ({role})")
+
+    skills = [name for key, name in context["skills"] if key and (key in title or key in description)]
+    if skills:
+        reasons.append(f"mentions {', '.join(skills[:3])}")
+
+    city = next((city for city, aliases in context["cities"] if any(a in location for a in aliases)), None)
+    if city:
+        reasons.append(f"located in {city.title()}")
+    elif context["wants_remote"] and any(kw in location for kw in job_features.REMOTE_KEYWORDS):
+        reasons.append("remote, as you prefer")
+
+    taste_score = 0.0
+    if taste:
+        company = " ".join(str(job.get("company", "")).lower().split())
+        if company in taste["liked_companies"]:
+            taste_score += 0.6
+            reasons.append("a company you've liked or saved before")
+        if company in taste["disliked_companies"]:
+            taste_score -= 1.0
+        liked_keywords = [kw for kw in taste["liked_keywords"] if kw in title]
+        if liked_keywords:
+            taste_score += min(0.2 * len(liked_keywords), 0.4)
+            reasons.append(f"similar to roles you liked ({', '.join(liked_keywords[:2])})")
+        taste_score -= 0.3 * sum(1 for kw in taste["disliked_keywords"] if kw in title)
+        taste_score = max(-1.0, min(taste_score, 1.0))
+
+    relevance = min(job.get("_prefilter_score", 0) / PREFILTER_SCORE_SCALE, 1.0)
+    similarity = job.get("_vector_similarity", NEUTRAL_SIMILARITY)
+    score = round(45 + 35 * relevance + 15 * similarity + 10 * taste_score)
+    return max(MIN_MATCH_SCORE, min(score, MAX_MATCH_SCORE)), reasons
+
+
+def rank_jobs(jobs: list, prefs: dict, resume: dict = None, taste: dict = None, limit: int = 15,
+              exclude_urls: set = None) -> list:
+    """
+    Rank pre-filtered jobs locally.
+
+    Args:
+        jobs: Pre-filtered jobs (with `_prefilter_score`, optionally `_vector_similarity`)
+        prefs: User preference dict
+        resume: Optional parsed resume data
+        taste: Optional load_taste_signals output
+        limit: Number of recommendations to return
+        exclude_urls: job_urls already recommended (for topping up Gemini's picks)
+
+    Returns:
+        RecommendedJob dicts, best first
+    """
+    context = _user_context(prefs, resume)
+    taste_context = _taste_context(taste)
+    exclude_urls = exclude_urls or set()
+    default_reason = f"This role matches your preference for {', '.join(prefs.get('role', ['this field'])[:2])} positions."
+
+    scored = []
+    for job in jobs:
+        if job.get("job_url") in exclude_urls:
+            continue
+        match_score, reasons = _score_job(job, context, taste_context)
+        scored.append((match_score, job, reasons))
+    scored.sort(key=lambda entry: entry[0], reverse=True)  # stable: ties keep pre-filter order
+
+    # Company variety first, then fill up from whatever is left
+    picked = []
+    per_company = {}
+    for entry in scored:
+        company = str(entry[1].get("company", "")).lower()
+        if per_company.get(company, 0) < MAX_PER_COMPANY:
+            per_company[company] = per_company.get(company, 0) + 1
+            picked.append(entry)
+        if len(picked) >= limit:
+            break
+    if len(picked) < limit:
+        picked_ids = {id(entry[1]) for entry in picked}
+        picked += [entry for entry in scored if id(entry[1]) not in picked_ids][:limit - len(picked)]
+        picked.sort(key=lambda entry: entry[0], reverse=True)
+
+    return [
+        {
+            "title": job.get("title") or "",
+            "company": str(job.get("company", "")),
+            "location": job.get("location") or "",
+            "match_score": match_score,
+            "reason": ("Matches your profile: " + "; ".join(reasons) + ".") if reasons else default_reason,
+            "job_url": job.get("job_url"),
+        }
+        for match_score, job, reasons in picked
+    ]
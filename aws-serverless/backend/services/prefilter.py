@@ -0,0 +1,464 @@
+"""
+Job Pre-filter Engine for Tackleit v2.5
+
+Narrows the candidate jobs down to the most relevant ~100 before they are sent
+to Gemini, using a tiered approach for QUALITY over quantity:
+
+Tier 1: Hard Filters (mandatory exclusions)
+Tier 2: Relevance Filters (at least one must match)
+Tier 3: Quality Scoring (rank by relevance)
+
+Instead of looping over jobs in Python, the job list is laid out as a JobMatrix:
+one lowercased corpus string per field (title, description, location,
+title + description) plus flag columns (senior / entry / management title,
+remote, minimum experience). Each keyword test yields a boolean column, and
+the tiers are NumPy operations over those columns.
+
+All keywords a request needs on a field (roles, skills, city aliases,
+exclude / must-have keywords, ...) are gathered up front. Large pattern sets
+(expanded role synonyms and their words, typically) are compiled into one
+Aho-Corasick automaton (pyahocorasick, cached per pattern set) and found in a
+single pass over that field's corpus; small ones, or everything when
+pyahocorasick isn't installed, use one str.find scan per keyword. Role
+synonyms, city aliases and job type keywords come precompiled from
+services/matching.py, with role expansion memoized per preference tuple.
+
+Keyword columns are memoized per matrix, and matrices are cached per job list,
+so re-scoring the same candidates doesn't rebuild them. For the
+full-collection fallback, StreamingPreFilter scores a cursor chunk by chunk
+and only holds on to the best jobs.
+
+Scores and ordering are identical to the original per-job loop
+(`_prefilter_score`), since every keyword test keeps plain substring semantics.
+"""
+
+import bisect
+import heapq
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+    print("WARNING: pyahocorasick not installed. Pre-filter will scan job text once per keyword.")
+
+from services import job_features, job_text
+from services.matching import expand_roles, role_words, cities_from_locations, city_aliases, job_type_keywords
+
+PREFILTER_LIMIT = 100
+# Job lists whose matrices are kept
+_MATRIX_CACHE_SIZE = 4
+# Keyword columns kept per matrix before the memo is reset
+_TERM_CACHE_MAX = 1024
+# Compiled automata kept, keyed by their pattern set
+_AUTOMATON_CACHE_SIZE = 64
+# An automaton pass costs about as much as ~40 str.find scans (find is SIMD-accelerated),
+# so smaller pattern sets are scanned term by term
+_AUTOMATON_MIN_PATTERNS = 40
+
+_matrix_cache = OrderedDict()
+_automaton_cache = OrderedDict()
+
+
+def _compile_patterns(patterns: tuple):
+    """Aho-Corasick automaton whose values are indexes into `patterns`, cached per pattern set."""
+    automaton = _automaton_cache.get(patterns)
+    if automaton is None:
+        automaton = ahocorasick.Automaton()
+        for idx, pattern in enumerate(patterns):
+            automaton.add_word(pattern, idx)
+        automaton.make_automaton()
+        _automaton_cache[patterns] = automaton
+        while len(_automaton_cache) > _AUTOMATON_CACHE_SIZE:
+            _automaton_cache.popitem(last=False)
+    else:
+        _automaton_cache.move_to_end(patterns)
+    return automaton
+
+
+class _Corpus:
+    """One text field of every job, joined with NUL separators for substring scans."""
+
+    def __init__(self, texts: list):
+        self._size = len(texts)
+        self._text = "\x00".join(texts)
+        self._starts = []
+        offset = 0
+        for text in texts:
+            self._starts.append(offset)
+            offset += len(text) + 1
+        self._starts_array = np.array(self._starts, dtype=np.int64)
+
+    def contains(self, term: str) -> np.ndarray:
+        """Boolean column: `term in text` for every job."""
+        hits = np.zeros(self._size, dtype=bool)
+        if not term:
+            hits[:] = True  # "" is a substring of everything
+            return hits
+        text, starts = self._text, self._starts
+        pos = text.find(term)
+        while pos != -1:
+            doc = bisect.bisect_right(starts, pos) - 1
+            hits[doc] = True
+            if doc + 1 >= self._size:
+                break
+            # One hit per job is enough: resume the scan at the next job
+            pos = text.find(term, starts[doc + 1])
+        return hits
+
+    def contains_many(self, terms) -> dict:
+        """Columns for several terms, found in a single Aho-Corasick pass over the corpus."""
+        terms = set(terms)
+        columns = {}
+        if "" in terms:
+            columns[""] = self.contains("")
+        patterns = tuple(sorted(term for term in terms if term))
+        if not AHOCORASICK_AVAILABLE or len(patterns) < _AUTOMATON_MIN_PATTERNS:
+            for term in patterns:
+                columns[term] = self.contains(term)
+            return columns
+
+        hits = np.zeros((len(patterns), self._size), dtype=bool)
+        matches = np.array(list(_compile_patterns(patterns).iter(self._text)), dtype=np.int64).reshape(-1, 2)
+        if len(matches):
+            # Patterns never contain the NUL separator, so a match's end position identifies its job
+            docs = np.searchsorted(self._starts_array, matches[:, 0], side="right") - 1
+            hits[matches[:, 1], docs] = True
+        for idx, pattern in enumerate(patterns):
+            columns[pattern] = hits[idx]
+        return columns
+
+
+def _as_years(value) -> float:
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class JobMatrix:
+    """Columnar view of a job list: per-field corpora plus precomputed flag columns."""
+
+    def __init__(self, jobs: list):
+        self.size = len(jobs)
+        titles, descriptions, locations = [], [], []
+        for job in jobs:
+            title, description, location = job_text.lowercase_fields(job)
+            titles.append(title)
+            descriptions.append(description)
+            locations.append(location)
+        self._corpora = {
+            "title": _Corpus(titles),
+            "description": _Corpus(descriptions),
+            "location": _Corpus(locations),
+            "full_text": _Corpus([f"{title} {description}" for title, description in zip(titles, descriptions)]),
+        }
+        self._terms = {}
+
+        self.prefetch("title", job_features.SENIOR_TITLE_KEYWORDS + job_features.ENTRY_TITLE_KEYWORDS
+                      + job_features.MANAGEMENT_TITLE_KEYWORDS)
+        self.prefetch("location", job_features.REMOTE_KEYWORDS)
+        self.is_senior_job = self.any_in("title", job_features.SENIOR_TITLE_KEYWORDS)
+        self.is_entry_job = self.any_in("title", job_features.ENTRY_TITLE_KEYWORDS)
+        self.is_management_job = self.any_in("title", job_features.MANAGEMENT_TITLE_KEYWORDS)
+        self.is_remote_job = self.any_in("location", job_features.REMOTE_KEYWORDS)
+        # NaN where the job doesn't state it (never fails the experience filter)
+        self.experience_min_years = np.array([_as_years(job.get("experience_min_years")) for job in jobs], dtype=np.float64)
+
+    def prefetch(self, field: str, terms):
+        """Compute the columns of all not-yet-memoized terms on <field> in one corpus pass."""
+        missing = {term for term in terms if (field, term) not in self._terms}
+        if not missing:
+            return
+        if len(self._terms) + len(missing) > _TERM_CACHE_MAX:
+            self._terms.clear()
+        for term, column in self._corpora[field].contains_many(missing).items():
+            self._terms[(field, term)] = column
+
+    def contains(self, field: str, term: str) -> np.ndarray:
+        """Memoized `term in <field>` column."""
+        key = (field, term)
+        column = self._terms.get(key)
+        if column is None:
+            column = self._corpora[field].contains(term)
+            if len(self._terms) >= _TERM_CACHE_MAX:
+                self._terms.clear()
+            self._terms[key] = column
+        return column
+
+    def any_in(self, field: str, terms) -> np.ndarray:
+        """Column: any of the terms occurs in <field>."""
+        result = np.zeros(self.size, dtype=bool)
+        for term in terms:
+            result |= self.contains(field, term)
+        return result
+
+    def count_in(self, field: str, terms) -> np.ndarray:
+        """Column: how many of the terms occur in <field> (duplicates count twice)."""
+        result = np.zeros(self.size, dtype=np.int64)
+        for term in terms:
+            result += self.contains(field, term)
+        return result
+
+
+def _corpus_key(jobs: list) -> str:
+    """Identifies a job list by ids, field lengths and experience without hashing the full text."""
+    digest = hashlib.sha1()
+    for job in jobs:
+        # Normalized fields share the raw field names (and the raw description may not be fetched)
+        fields = job_text.normalized(job) or job
+        digest.update(
+            f"{job.get('_id')}:{len(fields.get('title') or '')}:{len(fields.get('description') or '')}:"
+            f"{len(fields.get('location') or '')}:{job.get('experience_min_years')};".encode("utf-8")
+        )
+    return digest.hexdigest()
+
+
+def get_job_matrix(jobs: list) -> JobMatrix:
+    """JobMatrix for a job list, reused while the same list keeps coming back."""
+    key = _corpus_key(jobs)
+    matrix = _matrix_cache.get(key)
+    if matrix is None:
+        matrix = JobMatrix(jobs)
+        _matrix_cache[key] = matrix
+        while len(_matrix_cache) > _MATRIX_CACHE_SIZE:
+            _matrix_cache.popitem(last=False)
+    else:
+        _matrix_cache.move_to_end(key)
+    return matrix
+
+
+def _empty_stats() -> dict:
+    return {"total": 0, "excluded": 0, "seniority_mismatch": 0, "role_type_mismatch": 0,
+            "no_relevance": 0, "must_have_missing": 0, "accepted": 0}
+
+
+def score_jobs(jobs: list, prefs: dict, resume: dict = None, cache: bool = True) -> tuple:
+    """
+    Run the three tiers over a job list without ranking or logging.
+
+    Args:
+        jobs: Candidate job documents
+        prefs: User preference dict
+        resume: Optional parsed resume data (adds its roles to the role match)
+        cache: Keep the job list's matrix for reuse (off for one-off stream chunks)
+
+    Returns:
+        tuple of (indexes of accepted jobs, score array over all jobs, stats dict).
+        Every accepted job gets `_prefilter_score` and `_relevance_matched`.
+    """
+    matrix = get_job_matrix(jobs) if cache else JobMatrix(jobs)
+
+    # === EXTRACT ALL PREFERENCES ===
+    preferred_locations = [loc.lower().strip() for loc in prefs.get("location", [])]
+    preferred_roles = [role.lower().strip() for role in prefs.get("role", [])]
+    tech_stack = [tech.lower().strip() for tech in prefs.get("tech_stack", [])]
+    exclude_keywords = [kw.lower().strip() for kw in prefs.get("exclude_keywords", [])]
+    must_have_keywords = [kw.lower().strip() for kw in prefs.get("must_have_keywords", [])]
+    job_types = [jt.lower().strip() for jt in prefs.get("job_type", [])]
+    work_arrangements = [wa.lower().strip() for wa in prefs.get("work_arrangement", [])]
+    experience_level = prefs.get("experience_level", "").lower().strip()
+    role_type = prefs.get("role_type", "").lower().strip()
+
+    # Primary skills (first 5) get higher weight
+    primary_skills = tech_stack[:5] if len(tech_stack) >= 5 else tech_stack
+    secondary_skills = tech_stack[5:] if len(tech_stack) > 5 else []
+
+    expanded_roles = expand_roles(preferred_roles, resume)
+
+    # Remote preference check
+    user_wants_remote = any("remote" in loc for loc in preferred_locations) or \
+                       any("remote" in wa for wa in work_arrangements)
+
+    # Experience level to seniority mapping
+    is_fresher, is_senior, is_mid_level = job_features.user_seniority(prefs)
+
+    preferred_cities = cities_from_locations(preferred_locations)
+    type_keywords = job_type_keywords(job_types)
+    expanded_role_words = role_words(expanded_roles)
+
+    # One automaton pass per field covers every keyword test of all three tiers
+    matrix.prefetch("title", exclude_keywords + must_have_keywords + expanded_roles + expanded_role_words)
+    matrix.prefetch("description", exclude_keywords + must_have_keywords)
+    matrix.prefetch("location", [alias for city in preferred_cities for alias in city_aliases(city)])
+    matrix.prefetch("full_text", tech_stack + type_keywords + (["hybrid"] if "hybrid" in work_arrangements else []))
+
+    stats = _empty_stats()
+    stats["total"] = matrix.size
+    # Jobs still in the running; each rejection is counted under the first filter it fails
+    alive = np.ones(matrix.size, dtype=bool)
+
+    def reject(mask, reason):
+        nonlocal alive
+        rejected = alive & mask
+        stats[reason] += int(rejected.sum())
+        alive &= ~rejected
+
+    # ============= TIER 1: HARD FILTERS =============
+
+    # 1. Exclude keywords check
+    if exclude_keywords:
+        reject(matrix.any_in("title", exclude_keywords) | matrix.any_in("description", exclude_keywords), "excluded")
+
+    # 2. Seniority mismatch check
+    # Freshers should NOT see senior jobs
+    if is_fresher:
+        reject(matrix.is_senior_job, "seniority_mismatch")
+    # Seniors should NOT see entry/fresher jobs (unless they're actually senior roles)
+    if is_senior:
+        reject(matrix.is_entry_job & ~matrix.is_senior_job, "seniority_mismatch")
+
+    # 2b. Experience years check (using scraped data)
+    user_max_years = job_features.USER_MAX_EXPERIENCE_YEARS.get(
+        experience_level, job_features.DEFAULT_USER_MAX_EXPERIENCE_YEARS
+    )
+    reject(matrix.experience_min_years > user_max_years + job_features.EXPERIENCE_TOLERANCE_YEARS, "seniority_mismatch")
+
+    # 3. Role type check - IC vs Management
+    if role_type:
+        if "individual contributor" in role_type:
+            reject(matrix.is_management_job, "role_type_mismatch")
+        # If user wants management roles, skip pure IC roles
+        if "management" in role_type:
+            reject(~matrix.is_management_job, "role_type_mismatch")
+
+    # 4. Must-have keywords (if specified)
+    if must_have_keywords:
+        has_must_have = matrix.any_in("title", must_have_keywords) | matrix.any_in("description", must_have_keywords)
+        reject(~has_must_have, "must_have_missing")
+
+    # ============= TIER 2: RELEVANCE FILTERS =============
+    # Job must match at least ONE of: location, role, or have 2+ tech skills
+
+    score = np.zeros(matrix.size, dtype=np.int64)
+
+    # Location match check (+5 points)
+    location_match = matrix.is_remote_job.copy() if user_wants_remote else np.zeros(matrix.size, dtype=bool)
+    for city in preferred_cities:
+        location_match |= matrix.any_in("location", city_aliases(city))
+    score += 5 * location_match
+    relevance_matched = location_match.copy()
+
+    # Role match check (+5 points for exact, +3 for synonym)
+    role_exact = matrix.any_in("title", expanded_roles)
+    role_partial = matrix.any_in("title", expanded_role_words)
+    score += np.where(role_exact, 5, np.where(role_partial, 3, 0))
+    relevance_matched |= role_exact | role_partial
+
+    # Tech stack match check
+    primary_matches = matrix.count_in("full_text", primary_skills)
+    secondary_matches = matrix.count_in("full_text", secondary_skills)
+    tech_score = (primary_matches * 3) + (secondary_matches * 1)
+    relevance_matched |= (primary_matches >= 2) | ((primary_matches >= 1) & (secondary_matches >= 2))
+    score += np.minimum(tech_score, 15)  # Cap tech score at 15
+
+    # If no relevance match at all, skip this job
+    reject(~relevance_matched, "no_relevance")
+
+    # ============= TIER 3: QUALITY SCORING =============
+
+    # Job type bonus (+2 points)
+    if job_types:
+        score += 2 * matrix.any_in("full_text", type_keywords)
+
+    # Work arrangement bonus (+2 points)
+    if work_arrangements:
+        arrangement_match = np.zeros(matrix.size, dtype=bool)
+        if "remote" in work_arrangements:
+            arrangement_match |= matrix.is_remote_job
+        if "hybrid" in work_arrangements:
+            arrangement_match |= matrix.contains("full_text", "hybrid")
+        if any(x in work_arrangements for x in ["on-site", "onsite"]):
+            arrangement_match |= ~matrix.is_remote_job
+        score += 2 * arrangement_match
+
+    # Seniority alignment bonus (+3 points)
+    seniority_match = np.zeros(matrix.size, dtype=bool)
+    if is_fresher:
+        seniority_match |= matrix.is_entry_job
+    if is_senior:
+        seniority_match |= matrix.is_senior_job
+    if is_mid_level:
+        seniority_match |= ~matrix.is_entry_job & ~matrix.is_senior_job
+    score += 3 * seniority_match
+
+    accepted = np.flatnonzero(alive)
+    stats["accepted"] = len(accepted)
+    for i in accepted:
+        jobs[i]["_prefilter_score"] = int(score[i])
+        jobs[i]["_relevance_matched"] = True
+    return accepted, score, stats
+
+
+def _top_accepted(accepted, score, limit: int):
+    """Accepted indexes by score (stable, so ties keep input order), cut to `limit`."""
+    return accepted[np.argsort(-score[accepted], kind="stable")][:limit]
+
+
+def _log_stats(stats: dict):
+    print(f"DEBUG PRE-FILTER STATS: {stats}")
+    print(f"DEBUG: Total jobs considered: {stats['total']}")
+    print(f"DEBUG: Excluded by keywords: {stats['excluded']}")
+    print(f"DEBUG: Seniority mismatch: {stats['seniority_mismatch']}")
+    print(f"DEBUG: Role type mismatch: {stats['role_type_mismatch']}")
+    print(f"DEBUG: Must-have missing: {stats['must_have_missing']}")
+    print(f"DEBUG: No relevance match: {stats['no_relevance']}")
+    print(f"DEBUG: Accepted jobs: {stats['accepted']}")
+
+
+def pre_filter_jobs(jobs: list, prefs: dict, resume: dict = None, limit: int = PREFILTER_LIMIT) -> list:
+    """
+    Filter and rank jobs for a user's preferences.
+
+    Returns:
+        The top `limit` accepted jobs, highest `_prefilter_score` first (ties keep
+        input order). Every accepted job gets `_prefilter_score` and `_relevance_matched`.
+    """
+    accepted, score, stats = score_jobs(jobs, prefs, resume)
+    _log_stats(stats)
+    return [jobs[i] for i in _top_accepted(accepted, score, limit)]
+
+
+class StreamingPreFilter:
+    """
+    pre_filter_jobs over a job stream (e.g. a MongoDB cursor) fed in chunks.
+
+    Only the best `limit` jobs seen so far are held, in a min-heap keyed by
+    (score, -arrival order), plus the first `pool_size` jobs for topping up a
+    short result, so peak memory doesn't grow with the collection. The result
+    is identical to pre_filter_jobs over the concatenated stream.
+    """
+
+    def __init__(self, prefs: dict, resume: dict = None, limit: int = PREFILTER_LIMIT, pool_size: int = 2 * PREFILTER_LIMIT):
+        self.prefs = prefs
+        self.resume = resume
+        self.limit = limit
+        self.pool_size = pool_size
+        self.total = 0
+        self.pool = []  # first jobs in arrival order
+        self.stats = _empty_stats()
+        self._heap = []
+
+    def add(self, jobs: list):
+        """Score one chunk and merge its best jobs into the heap."""
+        accepted, score, stats = score_jobs(jobs, self.prefs, self.resume, cache=False)
+        for key, value in stats.items():
+            self.stats[key] += value
+        # Only a chunk's own top `limit` can make the overall top `limit`
+        for i in _top_accepted(accepted, score, self.limit):
+            item = (int(score[i]), -(self.total + int(i)), jobs[i])
+            if len(self._heap) < self.limit:
+                heapq.heappush(self._heap, item)
+            elif item[:2] > self._heap[0][:2]:
+                heapq.heapreplace(self._heap, item)
+        if len(self.pool) < self.pool_size:
+            self.pool.extend(jobs[:self.pool_size - len(self.pool)])
+        self.total += len(jobs)
+
+    def result(self) -> list:
+        """Top jobs, best first, in the same order pre_filter_jobs would return them."""
+        _log_stats(self.stats)
+        return [job for _, _, job in sorted(self._heap, key=lambda item: item[:2], reverse=True)]
@@ -0,0 +1,148 @@
+"""
+Generation Progress Reporting for Tackleit v2.5
+
+A running generation reports its progress through a ProgressReporter instead of
+writing `generation_tasks` on every step:
+
+- the first report is written right away, later ones at most once every
+  PROGRESS_WRITE_INTERVAL_SECONDS (the latest state is written when the
+  interval is over, so the final step before a pause is never lost)
+- every report updates an in-process snapshot and wakes wait_for_change
+  waiters immediately, so status requests served by the process running the
+  task see progress before it reaches MongoDB
+
+Progress writes only apply while the task is `running`, so a late one never
+lands on top of the task's final (or re-queued) status; close() also drops a
+pending write.
+"""
+
+import os
+import asyncio
+import weakref
+from datetime import datetime
+from dotenv import load_dotenv
+
+from database import db
+
+load_dotenv()
+
+PROGRESS_WRITE_INTERVAL_SECONDS = float(os.getenv("PROGRESS_WRITE_INTERVAL_SECONDS", "2"))
+
+tasks_collection = db["generation_tasks"]
+
+_reporters = {}
+# Per-task change events; an entry lives as long as someone is waiting on it
+_events = weakref.WeakValueDictionary()
+
+
+def _now() -> datetime:
+    # MongoDB keeps milliseconds; snapshots match what a read back would return
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def notify(task_id: str):
+    """Wake everyone waiting for a change of this task."""
+    event = _events.pop(task_id, None)
+    if event is not None:
+        event.set()
+
+
+async def wait_for_change(task_id: str, timeout: float) -> bool:
+    """Wait until a reporter in this process reports (or finishes) the task. False on timeout."""
+    event = _events.get(task_id)
+    if event is None:
+        event = asyncio.Event()
+        _events[task_id] = event
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+def snapshot(task_id: str):
+    """Latest reported fields of a task running in this process, or None."""
+    reporter = _reporters.get(task_id)
+    return dict(reporter.state) if reporter else None
+
+
+class ProgressReporter:
+    def __init__(self, task_id: str, write_interval: float = PROGRESS_WRITE_INTERVAL_SECONDS):
+        self.task_id = task_id
+        self.write_interval = write_interval
+        self.state = {}
+        self.writes = 0
+        self._dirty = {}
+        self._written_at = None
+        self._flush_later = None
+
+    async def report(self, progress: int = None, message: str = None, **fields):
+        """Record progress / message (and any other task fields); written throttled."""
+        update = dict(fields)
+        if progress is not None:
+            update["progress"] = progress
+        if message is not None:
+            update["message"] = message
+        update["updated_at"] = _now()
+        self.state.update(update)
+        self._dirty.update(update)
+        notify(self.task_id)
+
+        loop = asyncio.get_running_loop()
+        if self._written_at is None or loop.time() - self._written_at >= self.write_interval:
+            await self.flush()
+        elif self._flush_later is None:
+            delay = self._written_at + self.write_interval - loop.time()
+            self._flush_later = asyncio.create_task(self._flush_after(delay))
+
+    async def _flush_after(self, delay: float):
+        await asyncio.sleep(delay)
+        self._flush_later = None
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"DEBUG: Progress write for task {self.task_id} failed: {e}")
+
+    async def flush(self):
+        """Write the fields reported since the last write."""
+        if not self._dirty:
+            return
+        update, self._dirty = self._dirty, {}
+        self._written_at = asyncio.get_running_loop().time()
+        self.writes += 1
+        await tasks_collection.update_one({"_id": self.task_id, "status": "running"}, {"$set": update})
+
+    def close(self):
+        """Stop reporting: drop any pending write and the in-process snapshot."""
+        if self._flush_later is not None:
+            self._flush_later.cancel()
+            self._flush_later = None
+        self._dirty = {}
+        if _reporters.get(self.task_id) is self:
+            del _reporters[self.task_id]
+        notify(self.task_id)
+
+
+def start(task_id: str) -> ProgressReporter:
+    """Reporter for a task this process starts running."""
+    reporter = _reporters.get(task_id)
+    if reporter is not None:
+        reporter.close()
+    reporter = ProgressReporter(task_id)
+    _reporters[task_id] = reporter
+    return reporter
+
+
+async def report(task_id: str, progress: int = None, message: str = None, **fields):
+    """Report through the task's reporter, or write directly if it has none in this process."""
+    reporter = _reporters.get(task_id)
+    if reporter is None:
+        update = dict(fields, updated_at=_now())
+        if progress is not None:
+            update["progress"] = progress
+        if message is not None:
+            update["message"] = message
+        await tasks_collection.update_one({"_id": task_id}, {"$set": update})
+        return
+    await reporter.report(progress, message, **fields)
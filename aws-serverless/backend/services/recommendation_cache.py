@@ -0,0 +1,70 @@
+"""
+Recommendation Result Cache for Tackleit v2.5
+
+Stores a generation's final ranked recommendations in the
+`recommendation_cache` collection under a fingerprint of everything that
+shaped them:
+- the profile text sent to Gemini (preferences, resume, taste profile)
+- the raw preferences and resume fields the search and pre-filter read
+- the ranking configuration (models, two-stage mode, prompt budget)
+- the job corpus version: the FAISS index upload date, or the newest job and
+  job count when there is no index
+
+When the scrapers rebuild the index the fingerprint changes, so stale entries
+are never read again; they expire through a TTL index.
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+from dotenv import load_dotenv
+
+from database import db
+
+load_dotenv()
+
+RECOMMENDATION_CACHE_ENABLED = os.getenv("RECOMMENDATION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RECOMMENDATION_CACHE_TTL_SECONDS = int(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", str(14 * 24 * 3600)))
+# Bump when ranking logic changes in a way the fingerprint inputs don't capture
+CACHE_VERSION = 1
+
+cache_collection = db["recommendation_cache"]
+_indexes_ready = False
+
+# Resume fields read by the search query, the role expansion and the prompt
+RESUME_FINGERPRINT_FIELDS = ("name", "roles", "skills", "experience_summary", "education")
+
+
+def fingerprint(inputs: dict) -> str:
+    """sha256 over the canonical JSON of the inputs, prefixed with CACHE_VERSION."""
+    payload = json.dumps({"v": CACHE_VERSION, **inputs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def resume_fields(resume_data: dict) -> dict:
+    if not resume_data:
+        return {}
+    return {field: resume_data.get(field) for field in RESUME_FINGERPRINT_FIELDS}
+
+
+async def get(key: str):
+    """Cached recommendation dicts for a fingerprint, or None."""
+    if not RECOMMENDATION_CACHE_ENABLED:
+        return None
+    entry = await cache_collection.find_one({"_id": key}, {"recommended_jobs": 1})
+    return entry["recommended_jobs"] if entry else None
+
+
+async def put(key: str, user_id: str, recommended_jobs: list):
+    global _indexes_ready
+    if not RECOMMENDATION_CACHE_ENABLED:
+        return
+    if not _indexes_ready:
+        await cache_collection.create_index("created_at", expireAfterSeconds=RECOMMENDATION_CACHE_TTL_SECONDS)
+        _indexes_ready = True
+    await cache_collection.replace_one(
+        {"_id": key},
+        {"user_id": user_id, "recommended_jobs": recommended_jobs, "created_at": datetime.utcnow()},
+        upsert=True,
+    )
@@ -0,0 +1,116 @@
+"""
+Generation Result Persistence for Tackleit v2.5
+
+save_generation writes everything a finished generation produces in one step:
+- the `recommendations` document (upsert)
+- the user's `job_applications` and `time_saved_minutes`
+- the task's final `complete` status and result
+
+The three writes run in one MongoDB transaction, so a task is never reported
+complete without its recommendations (or the reverse). On deployments without
+transactions (standalone mongod) the two data writes run concurrently and the
+task is marked complete after both succeeded.
+
+The Google Sheets export isn't part of it: export_to_sheet runs after the task
+is complete and records its outcome in the task result (`sheets_export`,
+`sheets_error`), so Google API latency never delays completion. A process
+that can be frozen or stopped once its tasks are done (the Lambda worker)
+calls wait_for_exports first.
+"""
+
+import asyncio
+from datetime import datetime
+from pymongo.errors import OperationFailure, ConfigurationError
+
+from database import db
+from services.google_sheets import write_to_sheet
+
+users_collection = db["users"]
+recommendations_collection = db["recommendations"]
+tasks_collection = db["generation_tasks"]
+
+# Transactions need a replica set; switched off after the first refusal
+_transactions_supported = True
+# Running exports, referenced so they aren't garbage collected mid-flight
+_pending_exports = set()
+
+
+def _is_transactions_unsupported(error: Exception) -> bool:
+    return isinstance(error, ConfigurationError) or (
+        isinstance(error, OperationFailure)
+        and (error.code == 20 or "Transaction numbers are only allowed" in str(error))
+    )
+
+
+async def _write_all(writes, session=None):
+    for collection, query, update, upsert in writes:
+        await collection.update_one(query, update, upsert=upsert, session=session)
+
+
+async def save_generation(task_id: str, user_id: str, user_object_id, recommended_jobs: list,
+                          time_saved_minutes: int, result: dict):
+    """
+    Persist a generation's recommendations and mark its task complete.
+
+    Args:
+        recommended_jobs: RecommendedJob dicts
+        time_saved_minutes: Added to the user's time_saved_minutes
+        result: The task's `result` field
+    """
+    global _transactions_supported
+    now = datetime.utcnow()
+    data_writes = [
+        (recommendations_collection, {"user_id": user_id},
+         {"$set": {"user_id": user_id, "recommended_jobs": recommended_jobs, "generated_at": now}}, True),
+        (users_collection, {"_id": user_object_id},
+         {"$set": {"job_applications": [{"job_details": job, "status": "recommended", "updated_at": now} for job in recommended_jobs]},
+          "$inc": {"time_saved_minutes": time_saved_minutes}}, False),
+    ]
+    task_write = (tasks_collection, {"_id": task_id},
+                  {"$set": {"status": "complete", "progress": 100, "message": "Done!", "result": result,
+                           "ranker": result.get("ranker"), "updated_at": now}}, False)
+
+    if _transactions_supported:
+        try:
+            async with await db.client.start_session() as session:
+                async def run(txn_session):
+                    await _write_all(data_writes + [task_write], session=txn_session)
+                await session.with_transaction(run)
+            return
+        except Exception as e:
+            if not _is_transactions_unsupported(e):
+                raise
+            _transactions_supported = False
+            print(f"DEBUG: MongoDB transactions unavailable, persisting generation results without one: {e}")
+
+    await asyncio.gather(*(_write_all([write]) for write in data_writes))
+    await _write_all([task_write])
+
+
+async def _export(task_id: str, user_id: str, recommended_jobs: list):
+    sheets_error = None
+    try:
+        if not await write_to_sheet(user_id, recommended_jobs):
+            sheets_error = f"Failed to write to Google Sheets for user {user_id}."
+    except Exception as e:
+        sheets_error = f"Failed to write to Google Sheets for user {user_id}: {e}"
+    await tasks_collection.update_one(
+        {"_id": task_id},
+        {"$set": {"result.sheets_export": "failed" if sheets_error else "complete",
+                  "result.sheets_error": sheets_error, "updated_at": datetime.utcnow()}},
+    )
+
+
+def export_to_sheet(task_id: str, user_id: str, recommended_jobs: list):
+    """Start the Google Sheets export of a completed generation in the background."""
+    export = asyncio.create_task(_export(task_id, user_id, recommended_jobs))
+    _pending_exports.add(export)
+    export.add_done_callback(_pending_exports.discard)
+
+
+async def wait_for_exports(timeout: float) -> int:
+    """Wait up to timeout seconds for running exports. Returns how many are still running."""
+    if not _pending_exports:
+        return 0
+    _, running = await asyncio.wait(set(_pending_exports), timeout=max(timeout, 0.001))
+    return len(running)
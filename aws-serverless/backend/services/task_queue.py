@@ -0,0 +1,272 @@
+"""
+Generation Task Queue for Tackleit v2.5
+
+Recommendation generations are queued as documents in `generation_tasks`, the
+same documents the status endpoint reports from:
+
+- pending: waiting to run, not before `run_after`
+- running: claimed by `lease_owner` until `lease_expires_at`; the runner
+  extends the lease with a heartbeat, so an expired lease means the process
+  running it died (Lambda freeze, worker restart) and the task can be reclaimed
+- complete / failed: final
+
+A user has at most one pending or running task, enforced by a unique partial
+index, so concurrent generate requests all get the same task.
+
+Failures are retried with exponential backoff up to TASK_MAX_ATTEMPTS times,
+except PermanentTaskError.
+
+GENERATION_MODE selects who runs tasks:
+- "inline" (default): the API process that queued the task starts it right away
+  (and reclaims it from the status endpoint if its lease expired)
+- "queue": the API only queues; `python worker.py` processes run them (on
+  Lambda, the scheduled worker function drains the queue, see drain)
+"""
+
+import os
+import uuid
+import socket
+import asyncio
+import traceback
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from dotenv import load_dotenv
+
+from database import db
+
+load_dotenv()
+
+GENERATION_MODE = os.getenv("GENERATION_MODE", "inline").lower()
+TASK_LEASE_SECONDS = int(os.getenv("TASK_LEASE_SECONDS", "120"))
+TASK_HEARTBEAT_SECONDS = max(TASK_LEASE_SECONDS // 4, 1)
+TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "3"))
+TASK_RETRY_BASE_SECONDS = int(os.getenv("TASK_RETRY_BASE_SECONDS", "30"))
+GENERATION_WORKER_CONCURRENCY = int(os.getenv("GENERATION_WORKER_CONCURRENCY", "2"))
+WORKER_POLL_SECONDS = 2
+ACTIVE_STATUSES = ["pending", "running"]
+
+tasks_collection = db["generation_tasks"]
+
+_LEASE_FIELDS = {"lease_owner": "", "lease_expires_at": ""}
+
+
+class PermanentTaskError(Exception):
+    """A failure that retrying won't fix (e.g. the user was deleted)."""
+
+
+def _process_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def ensure_indexes():
+    await tasks_collection.create_index([("status", 1), ("run_after", 1)])
+    await tasks_collection.create_index([("status", 1), ("lease_expires_at", 1)])
+    await tasks_collection.create_index([("user_id", 1), ("status", 1)])
+    # At most one pending or running task per user; enqueue relies on it
+    try:
+        await tasks_collection.create_index(
+            [("user_id", 1)], name="one_active_task_per_user", unique=True,
+            partialFilterExpression={"status": {"$in": ACTIVE_STATUSES}},
+        )
+    except OperationFailure as e:
+        # Users with duplicate active tasks from before the index (they finish on their own)
+        print(f"DEBUG: Could not create the one-active-task-per-user index: {e}")
+
+
+async def enqueue(user_id: str, source: str = None):
+    """
+    Create a pending generation task unless the user already has one pending or running.
+
+    Returns:
+        (task_id, created): the new task's id, or the active task's id and False
+    """
+    task_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    task = {
+        "_id": task_id,
+        "user_id": user_id,
+        "status": "pending",
+        "attempts": 0,
+        "run_after": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+    if source:
+        task["source"] = source
+    while True:
+        try:
+            await tasks_collection.insert_one(task)
+            return task_id, True
+        except DuplicateKeyError:
+            active = await find_active(user_id)
+            if active:
+                return active["_id"], False
+            # The active task finished between the insert and the lookup
+
+
+async def find_active(user_id: str):
+    """The user's pending or running task, if any."""
+    return await tasks_collection.find_one({"user_id": user_id, "status": {"$in": ACTIVE_STATUSES}})
+
+
+def dispatch(task_id: str, handler):
+    """In inline mode, start running a queued task in this process; no-op in queue mode."""
+    if GENERATION_MODE == "inline":
+        asyncio.create_task(_run_inline(task_id, handler))
+
+
+async def _claim(query: dict, worker_id: str):
+    now = datetime.utcnow()
+    claimable = {"$or": [
+        {"status": "pending", "run_after": {"$lte": now}},
+        {"status": "running", "lease_expires_at": {"$lt": now}},
+    ]}
+    task = await tasks_collection.find_one_and_update(
+        {**query, **claimable},
+        {"$set": {"status": "running", "lease_owner": worker_id,
+                  "lease_expires_at": now + timedelta(seconds=TASK_LEASE_SECONDS),
+                  "heartbeat_at": now, "updated_at": now},
+         "$inc": {"attempts": 1}},
+        sort=[("run_after", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+    if task and task["attempts"] > TASK_MAX_ATTEMPTS:
+        # Reclaimed after its last attempt died mid-run
+        await _finish_failed(task["_id"], "Generation was interrupted too many times. Please try again.")
+        return None
+    return task
+
+
+async def claim_task(task_id: str, worker_id: str):
+    """Claim one specific task if it is runnable (or its lease expired)."""
+    return await _claim({"_id": task_id}, worker_id)
+
+
+async def claim_next(worker_id: str):
+    """Claim the oldest runnable task, or None."""
+    return await _claim({}, worker_id)
+
+
+def lease_expired(task: dict) -> bool:
+    expires_at = task.get("lease_expires_at")
+    return task.get("status") == "running" and expires_at is not None and expires_at < datetime.utcnow()
+
+
+async def _heartbeat(task_id: str, worker_id: str):
+    while True:
+        await asyncio.sleep(TASK_HEARTBEAT_SECONDS)
+        now = datetime.utcnow()
+        try:
+            await tasks_collection.update_one(
+                {"_id": task_id, "lease_owner": worker_id},
+                {"$set": {"lease_expires_at": now + timedelta(seconds=TASK_LEASE_SECONDS), "heartbeat_at": now}},
+            )
+        except Exception as e:
+            print(f"DEBUG: Heartbeat for task {task_id} failed: {e}")
+
+
+async def _finish_failed(task_id: str, error: str):
+    await tasks_collection.update_one(
+        {"_id": task_id},
+        {"$set": {"status": "failed", "error": error, "updated_at": datetime.utcnow()}, "$unset": _LEASE_FIELDS},
+    )
+
+
+async def run_claimed(task: dict, worker_id: str, handler):
+    """
+    Run a claimed task with handler(user_id, task_id), heartbeating its lease.
+    The handler marks the task complete; on an exception the task is re-queued
+    with backoff or marked failed.
+
+    Returns:
+        datetime the task was re-queued for, or None
+    """
+    task_id = task["_id"]
+    heartbeat = asyncio.create_task(_heartbeat(task_id, worker_id))
+    try:
+        await handler(task["user_id"], task_id)
+        return None
+    except Exception as e:
+        traceback.print_exc()
+        attempts = task.get("attempts", 1)
+        if isinstance(e, PermanentTaskError) or attempts >= TASK_MAX_ATTEMPTS:
+            print(f"❌ Task {task_id} failed after {attempts} attempt(s): {e}")
+            await _finish_failed(task_id, str(e))
+            return None
+
+        retry_at = datetime.utcnow() + timedelta(seconds=TASK_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+        print(f"DEBUG: Task {task_id} attempt {attempts} failed, retrying at {retry_at}: {e}")
+        await tasks_collection.update_one(
+            {"_id": task_id, "lease_owner": worker_id},
+            {"$set": {"status": "pending", "run_after": retry_at, "error": str(e),
+                      "message": f"Retrying after an error (attempt {attempts + 1} of {TASK_MAX_ATTEMPTS})...",
+                      "updated_at": datetime.utcnow()},
+             "$unset": _LEASE_FIELDS},
+        )
+        return retry_at
+    finally:
+        heartbeat.cancel()
+
+
+async def _run_inline(task_id: str, handler):
+    worker_id = f"inline-{_process_id()}"
+    while True:
+        task = await claim_task(task_id, worker_id)
+        if task is None:
+            return  # finished, or claimed by someone else
+        retry_at = await run_claimed(task, worker_id, handler)
+        if retry_at is None:
+            return
+        await asyncio.sleep(max((retry_at - datetime.utcnow()).total_seconds(), 0))
+
+
+async def run_worker(handler, concurrency: int = GENERATION_WORKER_CONCURRENCY):
+    """Process queued tasks forever, running up to `concurrency` at a time."""
+    await ensure_indexes()
+    process_id = _process_id()
+
+    async def slot(index: int):
+        worker_id = f"{process_id}-{index}"
+        while True:
+            try:
+                task = await claim_next(worker_id)
+            except Exception as e:
+                print(f"DEBUG: Claiming a task failed: {e}")
+                task = None
+            if task is None:
+                await asyncio.sleep(WORKER_POLL_SECONDS)
+                continue
+            print(f"DEBUG: {worker_id} running task {task['_id']} (attempt {task['attempts']})")
+            await run_claimed(task, worker_id, handler)
+
+    print(f"✅ Generation worker {process_id} started with {concurrency} slot(s)")
+    await asyncio.gather(*(slot(i) for i in range(concurrency)))
+
+
+async def drain(handler, seconds: float, concurrency: int = GENERATION_WORKER_CONCURRENCY) -> int:
+    """
+    Run queued tasks until none is runnable, claiming no new task once `seconds`
+    have passed (for runners with a time limit, like a Lambda invocation).
+
+    Returns:
+        Number of tasks run
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + seconds
+    process_id = _process_id()
+    ran = 0
+
+    async def slot(index: int):
+        nonlocal ran
+        worker_id = f"{process_id}-{index}"
+        while loop.time() < deadline:
+            task = await claim_next(worker_id)
+            if task is None:
+                return
+            print(f"DEBUG: {worker_id} running task {task['_id']} (attempt {task['attempts']})")
+            await run_claimed(task, worker_id, handler)
+            ran += 1
+
+    await asyncio.gather(*(slot(i) for i in range(concurrency)))
+    return ran
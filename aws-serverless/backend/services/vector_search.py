@@ -8,8 +8,14 @@ Uses Gemini text-embedding-004 for embeddings (768-dimensional vectors).
 """
 
 import os
+import glob
 import json
+import time
+import asyncio
+import hashlib
+import math
 import tempfile
+import threading
 # Heavy imports moved inside for Lambda init speed
 _faiss = None
 _numpy = None
@@ -34,8 +40,9 @@ def _get_numpy():
 
 import google.generativeai as genai
 from database import db, client as mongo_client
-from gridfs import GridFS
-from pymongo import MongoClient
+from bson import ObjectId
+from services import embedding_cache, job_features
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -45,140 +52,464 @@ genai.configure(api_key=os.environ.get("GEMINI_API_KEY", ""))
 
 EMBEDDING_MODEL = "models/text-embedding-004"
 EMBEDDING_DIMENSION = 768
+EMBED_BATCH_SIZE = 100  # Gemini batch embedding limit
+
+# Memory-map the index from /tmp instead of copying it onto each worker's heap
+FAISS_MMAP = os.getenv("FAISS_MMAP", "true").lower() in ("1", "true", "yes")
+
+# Query-time overrides for ANN indexes; by default these come from the index's GridFS metadata
+FAISS_NPROBE = os.getenv("FAISS_NPROBE")
+FAISS_EF_SEARCH = os.getenv("FAISS_EF_SEARCH")
+
+# Seconds a cached index is trusted before GridFS is probed for a newer version.
+# 0 probes on every call; with the background refresher running this can be raised freely.
+FAISS_VERSION_CHECK_INTERVAL = float(os.getenv("FAISS_VERSION_CHECK_INTERVAL", "300"))
+# Poll-based refresher (started from main.py) — leave off on Lambda, where frozen containers can't poll
+FAISS_BACKGROUND_REFRESH = os.getenv("FAISS_BACKGROUND_REFRESH", "false").lower() in ("1", "true", "yes")
+FAISS_REFRESH_INTERVAL = float(os.getenv("FAISS_REFRESH_INTERVAL", "300"))
+
+# faiss_id_map.npy layout: rows sorted by faiss_id, each with the 12 raw bytes of the job's ObjectId.
+# Current builds append the job_features.JOB_FEATURE_DTYPE columns used for filtered search.
+ID_MAP_DTYPE = [("faiss_id", "<i8"), ("oid", "u1", (12,))]
+
+# Filtered HNSW searches fetch this many times the eligible-share-adjusted k per round
+FILTER_OVERSAMPLE = 2
 
 # Module-level cache for the FAISS index
 _cached_index = None
 _cached_id_map = None
 _cached_version = None
-
-# GridFS uses synchronous pymongo, so we need sync client
-_sync_mongo_uri = os.getenv("MONGO_URI", "")
-_sync_client = None
-_sync_db = None
-_sync_fs = None
-
-
-def _get_sync_gridfs():
-    """Get a synchronous GridFS instance (GridFS doesn't support motor/async)."""
-    global _sync_client, _sync_db, _sync_fs
-    if _sync_fs is None:
-        _sync_client = MongoClient(_sync_mongo_uri)
-        _sync_db = _sync_client["jobfinder"]
-        _sync_fs = GridFS(_sync_db)
-    return _sync_fs
+_cached_search_params = {}
+_last_version_check = 0.0
+# Last probe found no index in GridFS; trusted like a cached index until the TTL expires
+_index_missing = False
+# Guards the module-level cache; indexes are activated from a worker thread
+_index_lock = threading.Lock()
+_async_index_lock = asyncio.Lock()
 
 
 def embed_text(text: str):
     """
     Embed a single text string using Gemini text-embedding-004.
+    Served from the embedding cache when the same query was embedded before.
     """
-    np = _get_numpy()
-    result = genai.embed_content(
-        model=EMBEDDING_MODEL,
-        content=text,
-        task_type="retrieval_query"
-    )
-    return np.array(result['embedding'], dtype=np.float32)
+    return embed_texts_batch([text], task_type="retrieval_query")[0]
 
 
 def embed_texts_batch(texts: list, task_type: str = "retrieval_document"):
     """
     Embed multiple texts in a batch using Gemini.
+    Only texts missing from the embedding cache are sent to the API.
     """
     np = _get_numpy()
-    result = genai.embed_content(
-        model=EMBEDDING_MODEL,
-        content=texts,
-        task_type=task_type
+    keys = [embedding_cache.make_key(EMBEDDING_MODEL, task_type, text) for text in texts]
+    vectors = embedding_cache.get_many(keys)
+    
+    # One API call per EMBED_BATCH_SIZE distinct uncached texts
+    missing = list({key: i for i, key in enumerate(keys) if key not in vectors}.values())
+    for start in range(0, len(missing), EMBED_BATCH_SIZE):
+        chunk = missing[start:start + EMBED_BATCH_SIZE]
+        result = genai.embed_content(
+            model=EMBEDDING_MODEL,
+            content=[texts[i] for i in chunk],
+            task_type=task_type
+        )
+        fresh = {keys[i]: np.asarray(vec, dtype=np.float32).tobytes() for i, vec in zip(chunk, result['embedding'])}
+        embedding_cache.put_many(fresh, EMBEDDING_MODEL, task_type)
+        vectors.update(fresh)
+    
+    return np.vstack([np.frombuffer(vectors[key], dtype=np.float32) for key in keys])
+
+
+def _index_io_flags(index_spec: str) -> int:
+    """
+    faiss.read_index flags for the mmap-backed load mode.
+    
+    IVF indexes use IO_FLAG_MMAP, which maps their inverted lists straight from
+    disk; everything else uses IO_FLAG_MMAP_IFC (faiss >= 1.10), which maps the
+    codes of flat-code indexes. faiss rejects the two combined on IVF indexes.
+    """
+    faiss = _get_faiss()
+    mmap_flag = getattr(faiss, "IO_FLAG_MMAP", 0)
+    if not index_spec.startswith("IVF"):
+        mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", mmap_flag)
+    return getattr(faiss, "IO_FLAG_READ_ONLY", 0) | mmap_flag
+
+
+def _read_index(path: str, index_spec: str = "Flat"):
+    """Read a FAISS index from disk, memory-mapped when FAISS_MMAP is enabled."""
+    faiss = _get_faiss()
+    if FAISS_MMAP:
+        try:
+            return faiss.read_index(path, _index_io_flags(index_spec))
+        except RuntimeError as e:
+            print(f"DEBUG: mmap load of FAISS index failed ({e}), falling back to heap load")
+    return faiss.read_index(path)
+
+
+def _tmp_paths(version: str) -> tuple:
+    """
+    /tmp paths for a given index version.
+    
+    Files are named after the version so a new upload never overwrites an index
+    that another worker on the same host still has memory-mapped.
+    """
+    tag = hashlib.sha1(version.encode("utf-8")).hexdigest()[:12]
+    tmp_dir = tempfile.gettempdir()
+    return (
+        os.path.join(tmp_dir, f"faiss_index_{tag}.bin"),
+        os.path.join(tmp_dir, f"faiss_id_map_{tag}.npy"),
     )
-    return np.array(result['embedding'], dtype=np.float32)
 
 
-def load_index():
+async def _latest_file(filename: str):
+    """fs.files document of the newest upload of filename (a build uploads before deleting the old one)."""
+    return await db["fs.files"].find_one({"filename": filename}, sort=[("uploadDate", -1)])
+
+
+async def _download_to_async(bucket: AsyncIOMotorGridFSBucket, file_id, path: str):
+    """Stream a GridFS file to disk through a Motor bucket, then atomically move it into place."""
+    part_path = f"{path}.part.{os.getpid()}"
+    grid_out = await bucket.open_download_stream(file_id)
+    with open(part_path, "wb") as f:
+        while True:
+            chunk = await grid_out.readchunk()
+            if not chunk:
+                break
+            f.write(chunk)
+    os.replace(part_path, path)
+
+
+def _id_map_filename(metadata: dict) -> str:
+    """Indexes built before the binary id map still ship faiss_id_map.json."""
+    return "faiss_id_map.npy" if (metadata or {}).get("id_map_format") == "npy" else "faiss_id_map.json"
+
+
+def _convert_json_id_map(json_path: str, npy_path: str):
+    """Rewrite a legacy {"faiss_id": "job_id"} JSON map as a sorted ID_MAP_DTYPE array."""
+    np = _get_numpy()
+    with open(json_path, "r") as f:
+        mapping = json.load(f)
+    id_map = np.zeros(len(mapping), dtype=ID_MAP_DTYPE)
+    for row, (faiss_id, job_id) in enumerate(sorted((int(k), v) for k, v in mapping.items())):
+        id_map[row]["faiss_id"] = faiss_id
+        id_map[row]["oid"] = np.frombuffer(ObjectId(job_id).binary, dtype=np.uint8)
+    part_path = f"{npy_path}.part.{os.getpid()}"
+    with open(part_path, "wb") as f:
+        np.save(f, id_map)
+    os.replace(part_path, npy_path)
+    os.remove(json_path)
+
+
+def _lookup_job_ids(id_map, faiss_ids) -> list:
+    """
+    Map FAISS result ids to job ObjectIds with one vectorized binary search.
+    Order is preserved; -1 (empty slots) and unknown ids are skipped.
+    """
+    np = _get_numpy()
+    if len(id_map) == 0:
+        return []
+    faiss_ids = np.asarray(faiss_ids, dtype=np.int64)
+    keys = id_map["faiss_id"]
+    positions = np.minimum(np.searchsorted(keys, faiss_ids), len(keys) - 1)
+    found = (faiss_ids >= 0) & (keys[positions] == faiss_ids)
+    return [ObjectId(oid.tobytes()) for oid in id_map["oid"][positions[found]]]
+
+
+def _remove_stale_tmp_files(keep: tuple):
+    """Drop /tmp copies of older index versions (mapped pages stay valid after unlink)."""
+    tmp_dir = tempfile.gettempdir()
+    for pattern in ("faiss_index_*.bin", "faiss_id_map_*.npy", "faiss_id_map_*.json"):
+        for path in glob.glob(os.path.join(tmp_dir, pattern)):
+            if path not in keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def _apply_search_params(index, metadata: dict) -> dict:
+    """
+    Set nprobe / efSearch on an ANN index to the values build_embeddings recorded
+    in the GridFS metadata (or the FAISS_NPROBE / FAISS_EF_SEARCH overrides).
+    No-op for exact Flat indexes.
+    """
+    faiss = _get_faiss()
+    params = dict(metadata.get("search_params") or {})
+    if FAISS_NPROBE:
+        params["nprobe"] = int(FAISS_NPROBE)
+    if FAISS_EF_SEARCH:
+        params["efSearch"] = int(FAISS_EF_SEARCH)
+    
+    space = faiss.ParameterSpace()
+    for name, value in list(params.items()):
+        try:
+            space.set_index_parameter(index, name, value)
+        except RuntimeError as e:
+            print(f"DEBUG: Could not set {name}={value} on {metadata.get('index_spec', 'index')}: {e}")
+            params.pop(name)
+    return params
+
+
+def _activate_index(version: str, index_path: str, map_path: str, metadata: dict = None):
+    """Open the /tmp copies of an index version and make it the module-level cache."""
+    global _cached_index, _cached_id_map, _cached_version, _cached_search_params
+    np = _get_numpy()
+    
+    with _index_lock:
+        if _cached_index is not None and _cached_version == version:
+            return _cached_index, _cached_id_map
+        
+        metadata = metadata or {}
+        index = _read_index(index_path, metadata.get("index_spec") or "Flat")
+        search_params = _apply_search_params(index, metadata)
+        # Memory-mapped like the index: no per-entry Python objects, shared page cache
+        id_map = np.load(map_path, mmap_mode="r")
+        
+        # Cache at module level
+        _cached_index = index
+        _cached_id_map = id_map
+        _cached_version = version
+        _cached_search_params = search_params
+    
+    print(f"DEBUG: FAISS index loaded — {metadata.get('index_spec', 'Flat')}, {index.ntotal} vectors, "
+          f"{len(id_map)} job mappings, params={search_params} (mmap={FAISS_MMAP})")
+    return index, id_map
+
+
+async def load_index_async(force_check: bool = False):
     """
     Load the FAISS index from MongoDB GridFS, with caching.
     
     Caching strategy:
     1. Check module-level cache (warmest — zero I/O)
-    2. Check /tmp filesystem cache (warm Lambda — no MongoDB call)
+    2. Check /tmp filesystem cache (warm Lambda — no MongoDB download)
     3. Download from GridFS (cold start — one MongoDB call)
     
+    The version probe and GridFS download go through Motor, and parsing /
+    mapping the index file runs in a worker thread. With FAISS_MMAP enabled
+    (the default) the index is memory-mapped from its /tmp copy instead of
+    being read onto the heap, so every worker on the host shares the same
+    page-cache pages and a warm restart doesn't re-parse it.
+    
+    Once an index is cached (or the probe found none in GridFS), the GridFS
+    version probe only runs every FAISS_VERSION_CHECK_INTERVAL seconds, so the
+    hot path does no network I/O.
+    
+    Args:
+        force_check: Probe GridFS for a newer version even if the TTL hasn't expired
+    
     Returns:
-        tuple of (faiss.Index, dict mapping faiss_position -> job_id_string)
+        tuple of (faiss.Index, ID_MAP_DTYPE array mapping faiss_id -> job ObjectId bytes)
         or (None, None) if no index exists
     """
-    global _cached_index, _cached_id_map, _cached_version
+    global _last_version_check, _index_missing
     
-    faiss = _get_faiss()
-    if faiss is None:
+    if _get_faiss() is None:
         print("DEBUG: FAISS is not available, cannot load index.")
         return None, None
-        
-    fs = _get_sync_gridfs()
-    
-    # Check if index exists in GridFS
-    index_file = _sync_db["fs.files"].find_one({"filename": "faiss_index.bin"})
-    if not index_file:
-        print("DEBUG: No FAISS index found in GridFS")
-        return None, None
     
-    current_version = str(index_file.get("uploadDate", ""))
-    
-    # 1. Module-level cache hit
-    if _cached_index is not None and _cached_version == current_version:
-        print("DEBUG: Using module-level cached FAISS index")
-        return _cached_index, _cached_id_map
-    
-    # 2. Check /tmp cache
-    tmp_index_path = os.path.join(tempfile.gettempdir(), "faiss_index.bin")
-    tmp_map_path = os.path.join(tempfile.gettempdir(), "faiss_id_map.json")
-    tmp_version_path = os.path.join(tempfile.gettempdir(), "faiss_version.txt")
-    
-    if os.path.exists(tmp_index_path) and os.path.exists(tmp_version_path):
-        with open(tmp_version_path, "r") as f:
-            cached_ver = f.read().strip()
-        if cached_ver == current_version:
+    if not force_check and time.monotonic() - _last_version_check < FAISS_VERSION_CHECK_INTERVAL:
+        if _index_missing:
+            return None, None
+        if _cached_index is not None:
+            return _cached_index, _cached_id_map
+    
+    async with _async_index_lock:
+        index_file = await _latest_file("faiss_index.bin")
+        _last_version_check = time.monotonic()
+        _index_missing = not index_file
+        if not index_file:
+            print("DEBUG: No FAISS index found in GridFS")
+            return None, None
+        
+        current_version = str(index_file.get("uploadDate", ""))
+        
+        if _cached_index is not None and _cached_version == current_version:
+            return _cached_index, _cached_id_map
+        
+        tmp_index_path, tmp_map_path = _tmp_paths(current_version)
+        if os.path.exists(tmp_index_path) and os.path.exists(tmp_map_path):
             print("DEBUG: Using /tmp cached FAISS index")
-            index = faiss.read_index(tmp_index_path)
-            with open(tmp_map_path, "r") as f:
-                id_map = json.load(f)
-            _cached_index = index
-            _cached_id_map = id_map
-            _cached_version = current_version
-            return index, id_map
-    
-    # 3. Download from GridFS (cold start)
-    print("DEBUG: Downloading FAISS index from GridFS...")
-    
-    # Download index binary
-    grid_out = fs.get_last_version("faiss_index.bin")
-    with open(tmp_index_path, "wb") as f:
-        f.write(grid_out.read())
-    
-    # Download ID map
-    grid_out_map = fs.get_last_version("faiss_id_map.json")  
-    with open(tmp_map_path, "wb") as f:
-        f.write(grid_out_map.read())
-    
-    # Save version marker
-    with open(tmp_version_path, "w") as f:
-        f.write(current_version)
-    
-    # Load into memory
-    index = faiss.read_index(tmp_index_path)
-    with open(tmp_map_path, "r") as f:
-        id_map = json.load(f)
-    
-    # Cache at module level
-    _cached_index = index
-    _cached_id_map = id_map
-    _cached_version = current_version
-    
-    print(f"DEBUG: FAISS index loaded — {index.ntotal} vectors, {len(id_map)} job mappings")
-    return index, id_map
+        else:
+            print("DEBUG: Downloading FAISS index from GridFS...")
+            bucket = AsyncIOMotorGridFSBucket(db)
+            metadata = index_file.get("metadata") or {}
+            await _download_to_async(bucket, index_file["_id"], tmp_index_path)
+            # The id map uploaded with this index; older builds didn't record it and kept one copy
+            map_file_id = metadata.get("id_map_file_id")
+            if map_file_id is None:
+                map_file_id = (await _latest_file(_id_map_filename(metadata)))["_id"]
+            if _id_map_filename(metadata).endswith(".json"):
+                await _download_to_async(bucket, map_file_id, f"{tmp_map_path}.json")
+                await asyncio.to_thread(_convert_json_id_map, f"{tmp_map_path}.json", tmp_map_path)
+            else:
+                await _download_to_async(bucket, map_file_id, tmp_map_path)
+            _remove_stale_tmp_files(keep=(tmp_index_path, tmp_map_path))
+        
+        return await asyncio.to_thread(
+            _activate_index, current_version, tmp_index_path, tmp_map_path, index_file.get("metadata")
+        )
+
+
+async def current_index_version():
+    """Version (GridFS upload date) of the index searches currently run against, or None without one."""
+    index, _ = await load_index_async()
+    return _cached_version if index is not None else None
+
+
+async def refresh_index_periodically(interval: float = FAISS_REFRESH_INTERVAL):
+    """
+    Poll GridFS for new index versions in the background so request-path
+    load_index_async calls are always served from the module-level cache.
+    Started from main.py when FAISS_BACKGROUND_REFRESH is enabled.
+    """
+    while True:
+        try:
+            await load_index_async(force_check=True)
+        except Exception as e:
+            print(f"DEBUG: Background FAISS refresh failed (non-fatal): {e}")
+        await asyncio.sleep(interval)
+
+
+def _filter_mask(id_map, filters: dict):
+    """
+    Boolean mask over id_map rows that pass the given search filters.
+    Returns None when there is nothing to filter, or the id map predates the
+    feature columns (the caller's Python pre-filter still applies either way).
+    """
+    if not filters:
+        return None
+    np = _get_numpy()
+    if "flags" not in (id_map.dtype.names or ()):
+        print("DEBUG: FAISS id map has no feature columns, searching without filters")
+        return None
+    
+    flags = id_map["flags"]
+    mask = np.ones(len(id_map), dtype=bool)
+    
+    max_years = filters.get("max_experience_years")
+    if max_years is not None:
+        # Jobs that don't state a minimum (-1) always pass
+        mask &= id_map["experience_min_years"] <= max_years
+    if filters.get("exclude_senior_titles"):
+        mask &= (flags & job_features.FLAG_SENIOR_TITLE) == 0
+    if filters.get("exclude_entry_titles"):
+        entry_only = ((flags & job_features.FLAG_ENTRY_TITLE) != 0) & ((flags & job_features.FLAG_SENIOR_TITLE) == 0)
+        mask &= ~entry_only
+    if filters.get("exclude_management_titles"):
+        mask &= (flags & job_features.FLAG_MANAGEMENT_TITLE) == 0
+    if filters.get("management_titles_only"):
+        mask &= (flags & job_features.FLAG_MANAGEMENT_TITLE) != 0
+    if filters.get("remote_only"):
+        mask &= (flags & job_features.FLAG_REMOTE) != 0
+    
+    locations = filters.get("locations")
+    if locations:
+        wanted = 0
+        for loc in locations:
+            wanted |= job_features.location_mask(loc)
+        in_location = (id_map["location_mask"] & wanted) != 0
+        if any("remote" in (loc or "").lower() for loc in locations):
+            in_location |= (flags & job_features.FLAG_REMOTE) != 0
+        mask &= in_location
+    
+    if filters.get("companies"):
+        mask &= np.isin(id_map["company_id"], [job_features.company_key(c) for c in filters["companies"]])
+    if filters.get("exclude_companies"):
+        mask &= ~np.isin(id_map["company_id"], [job_features.company_key(c) for c in filters["exclude_companies"]])
+    
+    return mask
+
+
+def _is_hnsw(index) -> bool:
+    faiss = _get_faiss()
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    return isinstance(base, faiss.IndexHNSW)
+
+
+def _selector_params(index, selector):
+    """SearchParameters restricting a search to the selector's ids, or None for HNSW."""
+    faiss = _get_faiss()
+    if _is_hnsw(index):
+        # HNSW stops expanding the graph early when most neighbours are filtered out
+        return None
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        ivf = None
+    if ivf is not None:
+        # IVF needs its own parameter type, which also carries nprobe (it doesn't fall back to the index's)
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def _oversampled_search(index, query_vectors, k: int, eligible_ids):
+    """
+    Filtered search for indexes that can't apply an IDSelector well: search
+    wider than k and drop ineligible hits, widening until every query has k
+    eligible results or the whole index has been searched.
+    """
+    faiss = _get_faiss()
+    np = _get_numpy()
+    n = len(query_vectors)
+    share = len(eligible_ids) / max(index.ntotal, 1)
+    fetch = min(index.ntotal, int(math.ceil(k / share)) * FILTER_OVERSAMPLE)
+    while True:
+        params = None
+        if _is_hnsw(index):
+            params = faiss.SearchParametersHNSW()
+            params.efSearch = max(fetch, _cached_search_params.get("efSearch") or 0)
+        distances, indices = index.search(query_vectors, fetch, params=params)
+        keep = np.isin(indices, eligible_ids)
+        if fetch >= index.ntotal or keep.sum(axis=1).min() >= k:
+            break
+        fetch = min(index.ntotal, fetch * 2)
+    
+    out_distances = np.full((n, k), -np.inf, dtype=np.float32)
+    out_indices = np.full((n, k), -1, dtype=np.int64)
+    for row in range(n):
+        hits = np.flatnonzero(keep[row])[:k]
+        out_distances[row, :len(hits)] = distances[row, hits]
+        out_indices[row, :len(hits)] = indices[row, hits]
+    return out_distances, out_indices
+
+
+def _search_index(index, query_vectors, top_k: int, eligible_ids=None):
+    """
+    Normalize query vectors and run the FAISS search (CPU-bound, called via a worker thread).
+    With eligible_ids, only those faiss ids can be returned.
+    """
+    faiss = _get_faiss()
+    np = _get_numpy()
+    # Normalize for cosine similarity (all index types use inner product)
+    faiss.normalize_L2(query_vectors)
+    candidates = index.ntotal if eligible_ids is None else len(eligible_ids)
+    actual_k = min(top_k, candidates)
+    if actual_k == 0:
+        empty = (len(query_vectors), 0)
+        return np.zeros(empty, dtype=np.float32), np.zeros(empty, dtype=np.int64)
+    
+    # HNSW can't return more neighbours than its search depth
+    ef_search = _cached_search_params.get("efSearch")
+    if ef_search is not None and ef_search < actual_k:
+        faiss.ParameterSpace().set_index_parameter(index, "efSearch", actual_k)
+        _cached_search_params["efSearch"] = actual_k
+    
+    if eligible_ids is None:
+        return index.search(query_vectors, actual_k)
+    
+    selector = faiss.IDSelectorBatch(eligible_ids)
+    params = _selector_params(index, selector)
+    if params is not None:
+        try:
+            return index.search(query_vectors, actual_k, params=params)
+        except RuntimeError as e:
+            print(f"DEBUG: IDSelector search not supported by this index ({e}), oversampling instead")
+    return _oversampled_search(index, query_vectors, actual_k, eligible_ids)
 
 
-async def search_similar_jobs(query_text: str, top_k: int = 200) -> list:
+async def search_similar_jobs(query_text: str, top_k: int = 200, filters: dict = None) -> list:
     """
     Search for the most semantically similar jobs to a query.
     
@@ -186,39 +517,82 @@ async def search_similar_jobs(query_text: str, top_k: int = 200) -> list:
         query_text: Natural language description of what the user is looking for
                     (built from preferences + resume data)
         top_k: Number of top results to return
+        filters: Optional structured filters applied inside the search, so all
+                 top_k results are eligible jobs (see job_features.search_filters_for_preferences):
+                 max_experience_years, exclude_senior_titles, exclude_entry_titles,
+                 exclude_management_titles, management_titles_only, remote_only,
+                 locations, companies, exclude_companies
         
     Returns:
-        List of MongoDB job _id strings, ordered by similarity (most similar first).
+        List of MongoDB job ObjectIds, ordered by similarity (most similar first),
+        ready to drop into a {"_id": {"$in": ...}} query.
         Returns empty list if no index is available.
-    """
-    index, id_map = load_index()
     
-    if index is None or id_map is None:
-        print("DEBUG: No FAISS index available, falling back to full scan")
-        return []
+    Nothing here blocks the event loop: the index is loaded through Motor, and
+    the Gemini embedding call and the FAISS search run in worker threads.
+    """
+    results = await search_similar_jobs_batch([query_text], top_k=top_k, filters=[filters])
+    result_ids = results[0]
     
-    # Embed the query
-    query_vector = embed_text(query_text)
-    query_vector = query_vector.reshape(1, -1)
+    print(f"DEBUG: Vector search returned {len(result_ids)} candidates from query: '{query_text[:80]}...'")
+    return result_ids
+
+
+async def search_similar_jobs_batch(query_texts: list, top_k: int = 200, filters=None) -> list:
+    """
+    Batch variant of search_similar_jobs for bulk work such as regenerating
+    recommendations for every user: all queries are embedded through one
+    embed_texts_batch call, and each distinct filter set gets one matrix
+    index.search over all of its queries.
     
-    # Normalize for cosine similarity (IndexFlatIP uses inner product)
-    faiss = _get_faiss()
-    faiss.normalize_L2(query_vector)
+    Args:
+        query_texts: One search query per user (see build_search_query)
+        top_k: Number of results per query
+        filters: None, one filters dict applied to every query, or a list with
+                 one filters dict (or None) per query
+        
+    Returns:
+        List of ObjectId lists aligned with query_texts, each ordered like
+        search_similar_jobs. All lists are empty if no index is available.
+    """
+    if not query_texts:
+        return []
     
-    # Search
-    actual_k = min(top_k, index.ntotal)
-    distances, indices = index.search(query_vector, actual_k)
+    index, id_map = await load_index_async()
     
-    # Map FAISS indices back to MongoDB job IDs
-    result_ids = []
-    for idx in indices[0]:
-        if idx >= 0:  # FAISS returns -1 for empty slots
-            str_idx = str(idx)
-            if str_idx in id_map:
-                result_ids.append(id_map[str_idx])
+    if index is None or id_map is None:
+        print("DEBUG: No FAISS index available, falling back to full scan")
+        return [[] for _ in query_texts]
+    
+    per_query_filters = filters if isinstance(filters, list) else [filters] * len(query_texts)
+    
+    # Embed every query in one go (cached queries don't hit the API)
+    query_vectors = await asyncio.to_thread(embed_texts_batch, list(query_texts), "retrieval_query")
+    
+    # Queries with identical filters share one eligible-id set and one search call
+    groups = {}
+    for row, query_filters in enumerate(per_query_filters):
+        groups.setdefault(json.dumps(query_filters or {}, sort_keys=True, default=str), []).append(row)
+    
+    results = [[] for _ in query_texts]
+    for rows in groups.values():
+        # Resolve filters to the faiss ids of eligible jobs
+        eligible_ids = None
+        mask = _filter_mask(id_map, per_query_filters[rows[0]])
+        if mask is not None:
+            eligible_ids = id_map["faiss_id"][mask]
+            print(f"DEBUG: Vector search filters leave {len(eligible_ids)}/{len(id_map)} jobs eligible")
+        
+        # Search (fancy indexing copies, so normalizing in place is safe)
+        distances, indices = await asyncio.to_thread(_search_index, index, query_vectors[rows], top_k, eligible_ids)
+        
+        # Map FAISS ids back to MongoDB job ObjectIds
+        for row, row_ids in zip(rows, indices):
+            results[row] = _lookup_job_ids(id_map, row_ids)
     
-    print(f"DEBUG: Vector search returned {len(result_ids)} candidates from query: '{query_text[:80]}...'")
-    return result_ids
+    if len(query_texts) > 1:
+        print(f"DEBUG: Batch vector search ran {len(query_texts)} queries in {len(groups)} filter groups")
+    return results
 
 
 def build_search_query(preferences: dict, resume_data: dict = None) -> str:
@@ -0,0 +1,41 @@
+"""
+Recommendation generation worker for the Lambda deployment.
+
+serverless.yml invokes handler on a schedule. Each invocation runs queued
+generation tasks (see services/task_queue.py) until none is left, and claims
+no new task once less than WORKER_TASK_RESERVE_SECONDS of the invocation
+remain, so a task it starts can finish before the Lambda timeout. This is what
+runs tasks with GENERATION_MODE=queue; in inline mode it picks up tasks whose
+API invocation was frozen or timed out mid-run.
+
+Before returning, the handler waits (up to WORKER_EXPORT_WAIT_SECONDS) for the
+Google Sheets exports its tasks started, since Lambda freezes the container
+as soon as the handler returns.
+"""
+
+import os
+import asyncio
+from dotenv import load_dotenv
+from routes.recommendations import _run_recommendation_generation
+from services.task_queue import drain
+from services.result_store import wait_for_exports
+
+load_dotenv()
+
+WORKER_TASK_RESERVE_SECONDS = int(os.getenv("WORKER_TASK_RESERVE_SECONDS", "180"))
+WORKER_EXPORT_WAIT_SECONDS = int(os.getenv("WORKER_EXPORT_WAIT_SECONDS", "60"))
+
+# Motor binds to the loop it first runs on; warm invocations reuse it
+_loop = asyncio.new_event_loop()
+
+
+def handler(event, context):
+    budget = context.get_remaining_time_in_millis() / 1000 - WORKER_TASK_RESERVE_SECONDS
+    tasks_run = _loop.run_until_complete(drain(_run_recommendation_generation, max(budget, 0)))
+    # Leave a few seconds of the invocation to return in
+    export_wait = min(WORKER_EXPORT_WAIT_SECONDS, context.get_remaining_time_in_millis() / 1000 - 5)
+    unfinished = _loop.run_until_complete(wait_for_exports(export_wait))
+    if unfinished:
+        print(f"WARNING: {unfinished} Google Sheets export(s) still running as the worker invocation ends")
+    print(f"DEBUG: Generation worker invocation ran {tasks_run} task(s)")
+    return {"tasks_run": tasks_run}
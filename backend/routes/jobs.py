@@ -1,7 +1,17 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from typing import Optional
+from datetime import datetime
 from models import Job
 from database import db
 from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+import re
+import json
+import base64
+from services.job_text import normalize_job
 import logging
 
 # Setup logging
@@ -11,12 +21,42 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 jobs_collection = db["jobs"]
 
+# Derived text fields are for internal readers only, not API responses
+PUBLIC_PROJECTION = {"normalized": 0}
+
+
+# Strings from "http://" up to (not including) "https:/0" cover every http(s) URL,
+# which are what bulk ingest upserts on (plus bare prefixes like "https:"); placeholders
+# like "Not available" stay out
+HTTP_URL_RANGE = {"$gte": "http://", "$lt": "https:/0"}
+
+
+async def ensure_indexes():
+    # Keyset pagination by date_scraped
+    await jobs_collection.create_index([("date_scraped", -1), ("_id", -1)])
+    # Bulk ingest upserts by job_url; unique, so concurrent ingests of one URL can't both insert it
+    try:
+        await jobs_collection.create_index(
+            "job_url", name="unique_http_job_url", unique=True,
+            partialFilterExpression={"job_url": HTTP_URL_RANGE},
+        )
+    except OperationFailure as e:
+        # Jobs stored twice under one URL from before the index; upserts still match one of them
+        logger.warning(f"Could not create the unique job_url index: {e}")
+        await jobs_collection.create_index("job_url")
+        return
+    # The plain job_url index is superseded by the unique one
+    try:
+        await jobs_collection.drop_index("job_url_1")
+    except OperationFailure:
+        pass  # already dropped
+
+
 @router.post("")
 async def create_job(request: Request):
-    # Log raw request body to see what's actually being sent
     try:
         job_data = await request.json()
-        logger.info(f"Received job data: {job_data}")
+        logger.debug(f"Received job data: {job_data}")
     except Exception as e:
         logger.error(f"Could not parse request JSON: {e}")
         raise HTTPException(status_code=400, detail="Invalid JSON format.")
@@ -25,26 +65,286 @@ async def create_job(request: Request):
     try:
         job = Job(**job_data)
         job_dict = job.dict()
+        # Lowercased text, prompt snippet and embedding text, computed once here instead of on every read
+        job_dict["normalized"] = normalize_job(job_dict)
         
         result = await jobs_collection.insert_one(job_dict)
-        created_job = await jobs_collection.find_one({"_id": result.inserted_id})
-        
-        logger.info(f"Successfully inserted job with ID: {result.inserted_id}")
-        
-        created_job["_id"] = str(created_job["_id"])
-        return created_job
+        logger.debug(f"Successfully inserted job with ID: {result.inserted_id}")
+
+        # insert_one set job_dict["_id"]; echo the document back without a second round trip
+        job_dict.pop("normalized")
+        job_dict["_id"] = str(result.inserted_id)
+        return job_dict
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="A job with this job_url already exists.")
     except Exception as e:
         # This will catch Pydantic validation errors and any other exceptions
         logger.error(f"Validation or Database Error: {e}", exc_info=True)
         raise HTTPException(status_code=422, detail=f"Failed to process job data: {e}")
 
+# --- Bulk ingest: upsert by job_url ---
+BULK_WRITE_BATCH_SIZE = 500
+# Validation / write errors echoed back per request
+MAX_REPORTED_ERRORS = 20
+
+
+def _new_bulk_report() -> dict:
+    return {"received": 0, "inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0,
+            "invalid": 0, "failed": 0, "errors": []}
+
+
+def _report_error(report: dict, index: int, error):
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"index": index, "error": str(error)})
+
+
+async def _write_job_batch(batch: list, report: dict):
+    """
+    Validate and write (index, job data) pairs with one unordered bulk_write.
+    Jobs with an http(s) job_url are upserted on it (the last copy of a URL in
+    the batch wins); jobs without one (or with a placeholder such as
+    "Not available") are inserted.
+    """
+    operations = {}
+    for index, job_data in batch:
+        try:
+            job_dict = Job(**job_data).dict()
+        except Exception as e:
+            report["invalid"] += 1
+            _report_error(report, index, e)
+            continue
+        job_dict["normalized"] = normalize_job(job_dict)
+        job_url = job_dict.get("job_url") or ""
+        if not job_url.startswith(("http://", "https://")):
+            operations[("index", index)] = (index, InsertOne(job_dict))
+            continue
+        if ("url", job_url) in operations:
+            report["duplicates"] += 1
+        operations[("url", job_url)] = (index, UpdateOne({"job_url": job_url}, {"$set": job_dict}, upsert=True))
+    if not operations:
+        return
+
+    indexes = [index for index, _ in operations.values()]
+    try:
+        result = await jobs_collection.bulk_write([op for _, op in operations.values()], ordered=False)
+        details = result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        for error in details.get("writeErrors", []):
+            report["failed"] += 1
+            _report_error(report, indexes[error["index"]], error.get("errmsg"))
+    report["inserted"] += details.get("nInserted", 0) + details.get("nUpserted", 0)
+    report["updated"] += details.get("nModified", 0)
+    report["unchanged"] += details.get("nMatched", 0) - details.get("nModified", 0)
+
+
+async def _ndjson_items(request: Request):
+    """Parsed lines of an NDJSON body, read as it streams in (unparseable lines give None)."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+    if buffer.strip():
+        yield _parse_line(buffer)
+
+
+def _parse_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+@router.post("/bulk")
+async def create_jobs_bulk(request: Request):
+    """
+    Ingest many jobs in one request: a JSON array, or NDJSON (one job per line,
+    Content-Type application/x-ndjson) which is written in batches as it
+    streams in. Jobs are upserted by job_url, so re-scraped jobs update the
+    existing document instead of adding a duplicate.
+
+    Returns counts: received, inserted, updated, unchanged, duplicates (same
+    job_url repeated within a batch), invalid, failed, plus the first errors
+    by item index.
+    """
+    report = _new_bulk_report()
+    batch = []
+
+    if "ndjson" in request.headers.get("content-type", ""):
+        index = 0
+        async for job_data in _ndjson_items(request):
+            report["received"] += 1
+            if not isinstance(job_data, dict):
+                report["invalid"] += 1
+                _report_error(report, index, "Invalid JSON object")
+            else:
+                batch.append((index, job_data))
+            index += 1
+            if len(batch) >= BULK_WRITE_BATCH_SIZE:
+                await _write_job_batch(batch, report)
+                batch = []
+    else:
+        try:
+            items = await request.json()
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid JSON format.")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of jobs.")
+        report["received"] = len(items)
+        for index, job_data in enumerate(items):
+            if not isinstance(job_data, dict):
+                report["invalid"] += 1
+                _report_error(report, index, "Invalid JSON object")
+                continue
+            batch.append((index, job_data))
+            if len(batch) >= BULK_WRITE_BATCH_SIZE:
+                await _write_job_batch(batch, report)
+                batch = []
+
+    if batch:
+        await _write_job_batch(batch, report)
+    report["errors"].sort(key=lambda error: error["index"])
+    logger.info(f"Bulk job ingest: {({k: v for k, v in report.items() if k != 'errors'})}")
+    return report
+
+
+# --- Listing: keyset pagination, field selection, filters ---
+# Orders jobs can be listed in: (field, direction). Ties on date_scraped are broken by _id.
+LIST_ORDERS = {"_id": ("_id", 1), "date_scraped": ("date_scraped", -1)}
+LISTABLE_FIELDS = set(Job.model_fields) | {"_id"}
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NDJSON_BATCH_SIZE = 500
+
+
+def _encode_cursor(job: dict, order: str) -> str:
+    key = {"id": str(job["_id"])}
+    if order == "date_scraped":
+        key["d"] = job["date_scraped"].isoformat() if job.get("date_scraped") else None
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def _after_cursor(cursor: str, order: str) -> dict:
+    """Query for the jobs after `cursor` in the given order."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        last_id = ObjectId(key["id"])
+        last_date = datetime.fromisoformat(key["d"]) if order == "date_scraped" and key.get("d") else None
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if order == "_id":
+        return {"_id": {"$gt": last_id}}
+    if last_date is None:
+        # Jobs without date_scraped sort last; page through those by _id
+        return {"date_scraped": None, "_id": {"$lt": last_id}}
+    return {"$or": [
+        {"date_scraped": {"$lt": last_date}},
+        {"date_scraped": last_date, "_id": {"$lt": last_id}},
+        {"date_scraped": None},
+    ]}
+
+
+def _list_query(company, location, min_experience, max_experience) -> dict:
+    query = {}
+    if company:
+        query["company"] = {"$regex": f"^{re.escape(company.strip())}$", "$options": "i"}
+    if location:
+        query["location"] = {"$regex": re.escape(location.strip()), "$options": "i"}
+    experience = {}
+    if min_experience is not None:
+        experience["$gte"] = min_experience
+    if max_experience is not None:
+        experience["$lte"] = max_experience
+    if experience:
+        query["experience_min_years"] = experience
+    return query
+
+
+def _list_projection(fields, order: str):
+    """Projection for the requested fields (all public fields by default), plus the sort key."""
+    if not fields:
+        return PUBLIC_PROJECTION, None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in LISTABLE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    projection = {field: 1 for field in requested}
+    projection[order] = 1
+    drop = [order] if order not in requested and order != "_id" else []
+    if "_id" not in requested:
+        drop.append("_id")
+    return projection, drop
+
+
+def _public_job(job: dict, drop) -> dict:
+    job["_id"] = str(job["_id"])
+    for field in drop or ():
+        job.pop(field, None)
+    return job
+
+
 @router.get("")
-async def read_jobs():
-    jobs = []
-    async for job in jobs_collection.find():
-        job["_id"] = str(job["_id"])
-        jobs.append(job)
-    return jobs
+async def read_jobs(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    order: str = "_id",
+    fields: Optional[str] = None,
+    company: Optional[str] = None,
+    location: Optional[str] = None,
+    min_experience: Optional[int] = None,
+    max_experience: Optional[int] = None,
+    format: str = "json",
+):
+    """
+    List jobs a page at a time.
+
+    - order: "_id" (oldest first, default) or "date_scraped" (newest first)
+    - cursor: the X-Next-Cursor of the previous page; absent on the last page
+    - fields: comma-separated fields to return (default: all public fields)
+    - company (exact, case-insensitive), location (contains), min_experience /
+      max_experience (bounds on experience_min_years)
+    - limit: page size (at most MAX_PAGE_SIZE); a request with neither `limit`
+      nor `cursor` gets every matching job in one unpaginated response, as
+      before paging existed
+    - format=ndjson: stream the matching jobs as one JSON object per line,
+      from `cursor` on; unlimited unless `limit` is given
+    """
+    if order not in LIST_ORDERS:
+        raise HTTPException(status_code=400, detail=f"order must be one of: {', '.join(LIST_ORDERS)}")
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be json or ndjson")
+
+    query = _list_query(company, location, min_experience, max_experience)
+    if cursor:
+        query = {"$and": [query, _after_cursor(cursor, order)]} if query else _after_cursor(cursor, order)
+    projection, drop = _list_projection(fields, order)
+    sort_field, direction = LIST_ORDERS[order]
+    sort = [(sort_field, direction)] + ([("_id", direction)] if sort_field != "_id" else [])
+
+    if format == "ndjson":
+        job_cursor = jobs_collection.find(query, projection, sort=sort, batch_size=NDJSON_BATCH_SIZE, limit=limit or 0)
+
+        async def lines():
+            async for job in job_cursor:
+                yield json.dumps(jsonable_encoder(_public_job(job, drop)), ensure_ascii=False) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    if limit is None and not cursor:
+        jobs = await jobs_collection.find(query, projection, sort=sort).to_list(length=None)
+        return [_public_job(job, drop) for job in jobs]
+
+    limit = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    # One extra job tells whether there is a next page
+    page = await jobs_collection.find(query, projection, sort=sort, limit=limit + 1).to_list(length=limit + 1)
+    if len(page) > limit:
+        page = page[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(page[-1], order)
+    return [_public_job(job, drop) for job in page]
 
 @router.get("/{job_id}")
 async def read_job(job_id: str):
@@ -53,7 +353,7 @@ async def read_job(job_id: str):
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid ObjectId format")
 
-    job = await jobs_collection.find_one({"_id": oid})
+    job = await jobs_collection.find_one({"_id": oid}, PUBLIC_PROJECTION)
     if job:
         job["_id"] = str(job["_id"])
         return job
@@ -1,17 +1,32 @@
 from fastapi import APIRouter, HTTPException, Depends, Request, BackgroundTasks, Response
+from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from bson import ObjectId
 from database import db
 from models import RecommendedJob
+from pydantic import ValidationError
 import google.generativeai as genai
 from datetime import datetime
 from dotenv import load_dotenv
 import os
 import json
-import uuid
 import asyncio
-from services.google_sheets import write_to_sheet
-from services.vector_search import search_similar_jobs, build_search_query
-from services.taste_profile import build_taste_profile
+import time
+from services.vector_search import search_similar_jobs, build_search_query, current_index_version
+from services.taste_profile import load_taste_signals, format_taste_profile
+from services.local_ranker import LOCAL_RANKER_MODE, LOCAL_RANKER_HEDGE_SECONDS, rank_jobs
+from services import job_features, task_queue, recommendation_cache, result_store
+from services import progress as progress_reports
+from services.task_queue import GENERATION_MODE, PermanentTaskError
+from services.llm_limiter import llm_limiter, PRIORITY_PRO, PRIORITY_FREE
+from services.prefilter import pre_filter_jobs, StreamingPreFilter
+from services.job_text import NORMALIZED_VERSION
+from services.prompt_builder import (
+    GEMINI_TWO_STAGE, GEMINI_SHORTLIST_MODEL, GEMINI_SHORTLIST_SIZE, PROMPT_TOKEN_BUDGET,
+    assign_job_ids, build_ranking_prompt, build_shortlist_prompt, select_shortlist,
+    parse_json_array, resolve_recommendation, resolve_recommendations, estimate_tokens,
+    JsonArrayStream,
+)
 from utils import is_pro_user
 from dependencies import get_current_user, limiter
 from encryption import decrypt_field
@@ -29,6 +44,32 @@ recommendations_collection = db["recommendations"]
 jobs_collection = db["jobs"]
 tasks_collection = db["generation_tasks"]
 
+# Fields the pre-filter, the prompt and the fallback recommendations read from a job.
+# The raw description is only fetched for jobs without (current) normalized fields.
+CANDIDATE_PROJECTION = {
+    "title": 1, "company": 1, "location": 1, "job_url": 1, "experience_min_years": 1,
+    "normalized.version": 1, "normalized.title": 1, "normalized.description": 1,
+    "normalized.location": 1, "normalized.snippet": 1,
+    "description": {"$cond": [{"$eq": ["$normalized.version", NORMALIZED_VERSION]}, "$$REMOVE", "$description"]},
+}
+# Jobs scored per chunk when streaming the whole collection through the pre-filter
+PREFILTER_STREAM_CHUNK = 1000
+# Fewer picks than this get topped up from the local ranking
+MIN_RECOMMENDATIONS = 10
+
+# Task fields the status endpoints return (plus what they check)
+STATUS_PROJECTION = {
+    "user_id": 1, "status": 1, "progress": 1, "message": 1, "created_at": 1, "updated_at": 1,
+    "result": 1, "error": 1, "lease_expires_at": 1,
+}
+FINAL_TASK_STATUSES = ("complete", "failed")
+# Longest a long-poll status request is held open
+STATUS_MAX_WAIT_SECONDS = 25
+# How often a waiting status request re-reads a task running in another process
+STATUS_POLL_SECONDS = 2
+# An event stream with no change sends a keep-alive comment this often
+SSE_KEEPALIVE_SECONDS = 15
+
 # --- Gemini Configuration ---
 genai.configure(api_key=os.environ["GEMINI_API_KEY"])
 GEMINI_MODEL_NAME = "gemini-flash-latest"  # Keep original working model
@@ -39,7 +80,10 @@ GENERATION_CONFIG = {
     "max_output_tokens": 8192,  # Increased to prevent JSON truncation
     "response_mime_type": "application/json",
 }
+# Stream the ranking response and keep each recommendation as soon as it is complete
+GEMINI_STREAMING = os.getenv("GEMINI_STREAMING", "true").lower() in ("1", "true", "yes")
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from google.api_core.exceptions import ResourceExhausted
 SAFETY_SETTINGS = {
     HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
     HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
@@ -47,94 +91,324 @@ SAFETY_SETTINGS = {
     HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
 }
 
-# --- Helper: Build Prompt ---
-def build_prompt(user_profile, jobs, job_count: int):
-    """Build the prompt for the AI model.
-    
-    Args:
-        user_profile: User profile string with preferences and resume data
-        jobs: List of pre-filtered jobs (already filtered for relevance)
-        job_count: Number of jobs in the pre-filtered list
+# --- Helper: Gemini Call ---
+async def generate_with_retries(model, prompt: str, task_id: str, stage: str, max_retries: int = 2,
+                                priority: int = PRIORITY_FREE):
     """
-    # Include prefilter score in job data for AI context
-    for job in jobs:
-        if "description" in job and job["description"]:
-            job["description"] = job["description"][:250] + "..."
-    jobs_data = [
-        {
-            "title": job.get("title"), 
-            "company": str(job.get("company", "")),
-            "location": job.get("location"),
-            "description": job.get("description", "No description"), 
-            "job_url": job.get("job_url"),
-            "prefilter_relevance": job.get("_prefilter_score", 0),  # Include our relevance score
-        } for job in jobs
-    ]
-    jobs_json = json.dumps(jobs_data, indent=2)
-    
-    # Calculate job counts based on available pool
-    # For 100 pre-filtered jobs, aim for 10-20 recommendations
-    min_jobs = min(10, max(8, job_count // 10))
-    max_jobs = min(20, job_count // 5)
-
-    return f"""You are a job-matching expert. Your task is to SELECT THE BEST matching jobs from this PRE-FILTERED pool.
-
-IMPORTANT: These {job_count} jobs have ALREADY been filtered for basic relevance (location, role, tech stack). 
-Your job is to RANK and SELECT the TOP {min_jobs}-{max_jobs} best matches.
-
-# CANDIDATE PROFILE
-{user_profile}
-
-# PRE-FILTERED JOBS (Already filtered for relevance)
-Each job includes a "prefilter_relevance" score (higher = better initial match)
-{jobs_json}
-
-# YOUR SCORING RULES (0-100)
-Use this scoring to rank and select the best jobs:
-- Role/Title alignment: +35 pts (exact role match or very similar)
-- Skills overlap: +30 pts (multiple tech stack skills mentioned)
-- Location match: +20 pts (city match or Remote if user wants remote)
-- Experience alignment: +10 pts (seniority level matches)
-- Job type match: +5 pts (Full-time, Internship, etc.)
-
-# OUTPUT REQUIREMENTS
-1. MUST return between {min_jobs} and {max_jobs} jobs as a JSON array
-2. Select jobs with highest combined score (your score + prefilter_relevance)
-3. Prefer variety: Maximum 2 jobs from the same company
-4. Sort by match_score descending
-5. For each job, provide a specific reason why it matches (mention skills, role, location)
-
-# TIPS FOR SELECTION
-- All these jobs are already somewhat relevant - focus on the BEST fits
-- Higher prefilter_relevance generally means better match
-- Give preference to jobs where the title closely matches candidate's desired role
-- If candidate is a Fresher, prioritize entry-level and internship roles
-
-Return ONLY a valid JSON array. No markdown, no backticks, no explanation text.
-
-[
-  {{
-    "title": "Exact job title from the list",
-    "company": "Exact company name from the list",
-    "location": "Exact location from the list",
-    "match_score": 85,
-    "reason": "Specific reason: role matches, tech stack includes X/Y/Z, location preferred",
-    "job_url": "Exact URL from the list"
-  }}
-]
-"""
+    Call Gemini through the LLM limiter, retrying empty responses and API errors.
+    Every attempt's prompt size, token usage, queue wait and latency is logged
+    and pushed to the task document's `llm_calls`.
+    """
+    response = None
+    for attempt in range(max_retries):
+        started = time.monotonic()
+        queue_wait_ms = None
+        try:
+            async with llm_limiter.slot(priority) as queue_wait_ms:
+                started = time.monotonic()
+                response = await llm_limiter.to_thread(model.generate_content, prompt)
+            llm_limiter.report_success()
+            await record_llm_call(task_id, stage, model, prompt, started, response=response, queue_wait_ms=queue_wait_ms)
+            if response.candidates and response.candidates[0].content.parts:
+                break
+            print(f"DEBUG: Attempt {attempt+1} - Empty response, retrying...")
+            await asyncio.sleep(2)  # Wait before retry
+        except Exception as api_error:
+            print(f"DEBUG: Attempt {attempt+1} - API error: {api_error}")
+            await record_llm_call(task_id, stage, model, prompt, started, error=str(api_error), queue_wait_ms=queue_wait_ms)
+            if attempt < max_retries - 1:
+                await _backoff_after_error(api_error)
+            else:
+                raise api_error
+
+    if not response or not response.candidates or not response.candidates[0].content.parts:
+        feedback = response.prompt_feedback if response and hasattr(response, 'prompt_feedback') else 'No feedback available'
+        raise Exception(f"AI content filtering triggered after {max_retries} attempts. Feedback: {feedback}")
+    return response
+
+
+async def _backoff_after_error(api_error: Exception):
+    if isinstance(api_error, ResourceExhausted):
+        # 429: the limiter pauses every caller; the retry waits for its next slot
+        llm_limiter.report_rate_limited()
+    else:
+        await asyncio.sleep(2)
+
+
+async def record_llm_call(task_id: str, stage: str, model, prompt: str, started: float, response=None, error: str = None,
+                          first_item_ms: int = None, queue_wait_ms: int = None):
+    usage = getattr(response, "usage_metadata", None)
+    metrics = {
+        "stage": stage,
+        "model": model.model_name,
+        "prompt_chars": len(prompt),
+        "estimated_prompt_tokens": estimate_tokens(prompt),
+        "prompt_tokens": getattr(usage, "prompt_token_count", None),
+        "output_tokens": getattr(usage, "candidates_token_count", None),
+        "latency_ms": int((time.monotonic() - started) * 1000),
+        "first_item_ms": first_item_ms,
+        "queue_wait_ms": queue_wait_ms,
+        "error": error,
+        "at": datetime.utcnow(),
+    }
+    print(f"DEBUG: Gemini {stage} call: {metrics['prompt_chars']} chars, "
+          f"~{metrics['estimated_prompt_tokens']} tokens est, {metrics['prompt_tokens']} prompt / "
+          f"{metrics['output_tokens']} output tokens, {metrics['latency_ms']} ms, waited {queue_wait_ms} ms")
+    if queue_wait_ms and queue_wait_ms > 1000:
+        print(f"DEBUG: LLM limiter: {llm_limiter.stats()}")
+    await tasks_collection.update_one({"_id": task_id}, {"$push": {"llm_calls": metrics}})
+
+
+async def stream_recommendations(model, prompt: str, task_id: str, jobs_by_id: dict, expected: int, max_retries: int = 2,
+                                 priority: int = PRIORITY_FREE) -> list:
+    """
+    Stream the ranking response from Gemini.
+
+    Each array item becomes a RecommendedJob as soon as it is complete, and the
+    task's progress moves from 60 towards 85 as they arrive. A response cut off
+    mid-array still yields every complete item; a response that isn't a
+    streamable array is parsed whole with parse_json_array.
+    """
+    response = None
+    for attempt in range(max_retries):
+        started = time.monotonic()
+        parser = JsonArrayStream()
+        raw_text = ""
+        recommended = []
+        seen = set()
+        first_item_ms = None
+        queue_wait_ms = None
+        response = None
+        try:
+            async with llm_limiter.slot(priority) as queue_wait_ms:
+                started = time.monotonic()
+                response = await model.generate_content_async(prompt, stream=True)
+                async for chunk in response:
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        continue  # chunk without text parts (finish reason / safety metadata)
+                    raw_text += text
+                    for item in parser.feed(text):
+                        data = resolve_recommendation(item, jobs_by_id)
+                        key = data and (data.get("job_url") or data.get("title"))
+                        if not key or key in seen:
+                            continue
+                        try:
+                            recommended.append(RecommendedJob(**data))
+                        except ValidationError as item_error:
+                            print(f"DEBUG: Skipping invalid recommendation: {item_error}")
+                            continue
+                        seen.add(key)
+                        if first_item_ms is None:
+                            first_item_ms = int((time.monotonic() - started) * 1000)
+                        progress = 60 + min(25, 25 * len(recommended) // max(expected, 1))
+                        await progress_reports.report(task_id, progress, f"Ranking jobs... {len(recommended)} matches so far")
+            llm_limiter.report_success()
+        except Exception as api_error:
+            print(f"DEBUG: Attempt {attempt+1} - API error: {api_error}")
+            await record_llm_call(task_id, "rank", model, prompt, started, error=str(api_error),
+                                  first_item_ms=first_item_ms, queue_wait_ms=queue_wait_ms)
+            if recommended:
+                print(f"DEBUG: Stream interrupted, keeping {len(recommended)} complete recommendations")
+                return recommended
+            if attempt < max_retries - 1:
+                await _backoff_after_error(api_error)
+                continue
+            raise api_error
+
+        await record_llm_call(task_id, "rank", model, prompt, started, response=response,
+                              first_item_ms=first_item_ms, queue_wait_ms=queue_wait_ms)
+        if not recommended and raw_text.strip():
+            try:
+                data = resolve_recommendations(parse_json_array(raw_text), jobs_by_id)
+                recommended = [RecommendedJob(**job) for job in data]
+            except (ValueError, ValidationError) as parse_error:
+                print(f"DEBUG: Attempt {attempt+1} - Unusable response: {parse_error}")
+        if recommended:
+            return recommended
+        print(f"DEBUG: Attempt {attempt+1} - Empty response, retrying...")
+        await asyncio.sleep(2)  # Wait before retry
+
+    feedback = response.prompt_feedback if response and hasattr(response, 'prompt_feedback') else 'No feedback available'
+    raise Exception(f"AI content filtering triggered after {max_retries} attempts. Feedback: {feedback}")
+
+
+# --- Helper: Ranking ---
+async def _corpus_version() -> str:
+    """Version of the jobs a generation ranks: the FAISS index, or the collection itself without one."""
+    index_version = await current_index_version()
+    if index_version:
+        return f"faiss:{index_version}"
+    latest = await jobs_collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    count = await jobs_collection.estimated_document_count()
+    return f"jobs:{latest['_id'] if latest else ''}:{count}"
+
+
+async def _rank_jobs(task_id: str, user: dict, preferences: dict, resume_data: dict, user_profile_string: str,
+                     taste_signals: dict = None) -> tuple:
+    """
+    Vector search, pre-filter and ranking for one generation.
+
+    Returns:
+        tuple of (RecommendedJob list, ranker: "gemini" or "local")
+    """
+    # --- VECTOR SEARCH: Fetch candidates using FAISS ---
+    await progress_reports.report(task_id, 30, "Searching for matching jobs...")
+
+    # Build a search query from user preferences + resume
+    search_query = build_search_query(preferences, resume_data)
+    print(f"DEBUG: Vector search query: '{search_query[:100]}...'")
+
+    # Try vector search first, fall back to full scan if no index.
+    # Structured hard filters (experience, seniority, IC/management) run inside the search
+    # so the 300 slots aren't spent on jobs pre_filter_jobs would reject anyway.
+    candidate_job_ids = await search_similar_jobs(
+        search_query, top_k=300, filters=job_features.search_filters_for_preferences(preferences)
+    )
+
+    if candidate_job_ids:
+        # Fetch only the candidate jobs from MongoDB (search already returns ObjectIds)
+        all_jobs = await jobs_collection.find(
+            {"_id": {"$in": candidate_job_ids}}, CANDIDATE_PROJECTION
+        ).to_list(length=300)
+        print(f"DEBUG: Vector search returned {len(all_jobs)} candidate jobs")
+
+        if not all_jobs:
+            raise PermanentTaskError("No jobs found in the database")
+
+        print(f"DEBUG: Working with {len(all_jobs)} jobs for pre-filtering")
+
+        # Search rank as a 0-1 similarity for the local ranker
+        search_rank = {job_id: rank for rank, job_id in enumerate(candidate_job_ids)}
+        for job in all_jobs:
+            job["_vector_similarity"] = 1 - search_rank.get(job["_id"], len(candidate_job_ids)) / len(candidate_job_ids)
+
+        # Apply pre-filtering
+        jobs = pre_filter_jobs(all_jobs, preferences, resume_data)
+        general_pool, total_jobs = all_jobs, len(all_jobs)
+    else:
+        # Fallback: No FAISS index yet, stream the whole collection through the pre-filter
+        # chunk by chunk, holding only the best jobs instead of every document
+        print("DEBUG: No FAISS index available, falling back to full collection scan")
+        stream = StreamingPreFilter(preferences, resume_data)
+        chunk = []
+        async for job in jobs_collection.find({}, CANDIDATE_PROJECTION, batch_size=PREFILTER_STREAM_CHUNK):
+            chunk.append(job)
+            if len(chunk) >= PREFILTER_STREAM_CHUNK:
+                stream.add(chunk)
+                chunk = []
+        if chunk:
+            stream.add(chunk)
+
+        if stream.total == 0:
+            raise PermanentTaskError("No jobs found in the database")
+
+        jobs = stream.result()
+        general_pool, total_jobs = stream.pool, stream.total
+
+    print(f"DEBUG: Pre-filtered to {len(jobs)} relevant jobs from {total_jobs} total")
+
+    # If pre-filter returns too few jobs, use broader criteria
+    if len(jobs) < 50 and total_jobs > 50:
+        print(f"DEBUG: Pre-filter returned only {len(jobs)} jobs, adding more from general pool")
+        # Add top jobs from general pool that weren't already included
+        existing_urls = {j.get("job_url") for j in jobs}
+        for job in general_pool:
+            if job.get("job_url") not in existing_urls:
+                job["_prefilter_score"] = 0
+                jobs.append(job)
+            if len(jobs) >= 100:
+                break
+        print(f"DEBUG: Expanded job pool to {len(jobs)} jobs")
+
+    await progress_reports.report(task_id, 60, "Generating AI recommendations...")
+
+    # --- RANKING: Gemini, with the local ranker as primary path, hedge or fallback ---
+    ranker = "gemini"
+    recommended_jobs = []
+    if LOCAL_RANKER_MODE == "primary":
+        ranker = "local"
+    else:
+        try:
+            gemini_ranking = _rank_with_gemini(task_id, user, jobs, user_profile_string)
+            if LOCAL_RANKER_MODE == "hedge":
+                # On timeout a Gemini call already running keeps its limiter slot until it returns
+                recommended_jobs = await asyncio.wait_for(gemini_ranking, LOCAL_RANKER_HEDGE_SECONDS)
+            else:
+                recommended_jobs = await gemini_ranking
+        except asyncio.TimeoutError:
+            print(f"DEBUG: Gemini didn't answer within {LOCAL_RANKER_HEDGE_SECONDS}s, using the local ranking")
+            ranker = "local"
+        except Exception as gemini_error:
+            print(f"DEBUG: Gemini ranking failed, using the local ranking: {gemini_error}")
+            ranker = "local"
+
+    if ranker == "local":
+        limit = max(MIN_RECOMMENDATIONS, min(20, len(jobs) // 5))
+        recommended_jobs = [RecommendedJob(**job) for job in rank_jobs(jobs, preferences, resume_data, taste_signals, limit)]
+
+    # FALLBACK: If AI returned too few recommendations, top up from the local ranking
+    if len(recommended_jobs) < MIN_RECOMMENDATIONS and len(jobs) > len(recommended_jobs):
+        print(f"DEBUG: AI only returned {len(recommended_jobs)} recommendations, adding fallback jobs")
+        recommended_urls = {job.job_url for job in recommended_jobs if job.job_url}
+        top_up = rank_jobs(jobs, preferences, resume_data, taste_signals,
+                           MIN_RECOMMENDATIONS - len(recommended_jobs), exclude_urls=recommended_urls)
+        recommended_jobs.extend(RecommendedJob(**job) for job in top_up)
+        print(f"DEBUG: After fallback, now have {len(recommended_jobs)} recommendations")
+
+    return recommended_jobs, ranker
+
+
+async def _rank_with_gemini(task_id: str, user: dict, jobs: list, user_profile_string: str) -> list:
+    """Gemini's ranking of the pre-filtered jobs (optional shortlist stage, then the packed ranking prompt)."""
+    jobs_by_id = assign_job_ids(jobs)
+    # Pro users' Gemini calls are admitted first when the limiter is busy
+    llm_priority = PRIORITY_PRO if is_pro_user(user) else PRIORITY_FREE
+
+    # Optional stage 1: a cheaper model shortlists from titles before the full ranking
+    if GEMINI_TWO_STAGE and len(jobs_by_id) > GEMINI_SHORTLIST_SIZE:
+        shortlist_model = genai.GenerativeModel(model_name=GEMINI_SHORTLIST_MODEL, generation_config=GENERATION_CONFIG, safety_settings=SAFETY_SETTINGS)
+        try:
+            response = await generate_with_retries(
+                shortlist_model, build_shortlist_prompt(user_profile_string, jobs_by_id, GEMINI_SHORTLIST_SIZE), task_id, "shortlist",
+                priority=llm_priority
+            )
+            jobs_by_id = select_shortlist(parse_json_array(response.text), jobs_by_id, GEMINI_SHORTLIST_SIZE)
+            print(f"DEBUG: Shortlisted {len(jobs_by_id)} jobs for ranking")
+        except Exception as shortlist_error:
+            # Non-fatal: rank the full pool instead
+            print(f"DEBUG: Shortlist stage failed, ranking all {len(jobs_by_id)} jobs: {shortlist_error}")
+
+    prompt, jobs_by_id, packing = build_ranking_prompt(user_profile_string, jobs_by_id, len(jobs))
+    print(f"DEBUG: Packed {packing['jobs_packed']}/{packing['jobs_offered']} jobs into prompt "
+          f"({packing['description_chars']} description chars each, ~{packing['estimated_tokens']} tokens)")
+    model = genai.GenerativeModel(model_name=GEMINI_MODEL_NAME, generation_config=GENERATION_CONFIG, safety_settings=SAFETY_SETTINGS)
+    if GEMINI_STREAMING:
+        recommended_jobs = await stream_recommendations(model, prompt, task_id, jobs_by_id, packing["picks_requested"],
+                                                        priority=llm_priority)
+    else:
+        response = await generate_with_retries(model, prompt, task_id, "rank", priority=llm_priority)
+
+        recommended_jobs_data = parse_json_array(response.text)
+        if not isinstance(recommended_jobs_data, list) or len(recommended_jobs_data) == 0:
+            raise ValueError("AI response is not a valid list of jobs.")
 
+        recommended_jobs = [RecommendedJob(**job) for job in resolve_recommendations(recommended_jobs_data, jobs_by_id)]
+
+    return recommended_jobs
 
 
 # --- Background Task ---
 async def _run_recommendation_generation(user_id: str, task_id: str):
     print(f"DEBUG: Starting recommendation generation v3 for task {task_id}")
-    await tasks_collection.update_one({"_id": task_id}, {"$set": {"status": "running", "progress": 10, "message": "Preparing your data...", "updated_at": datetime.utcnow()}})
+    reporter = progress_reports.start(task_id)
     try:
+        await reporter.report(10, "Preparing your data...")
         user_object_id = ObjectId(user_id)
         user = await users_collection.find_one({"_id": user_object_id})
         if not user:
-            raise Exception("User not found")
+            raise PermanentTaskError("User not found")
 
         user_profile_parts = []
         resume_data = await resumes_collection.find_one({"user_id": user_object_id})
@@ -170,16 +444,18 @@ async def _run_recommendation_generation(user_id: str, task_id: str):
                 user_profile_parts.append(f"PRIORITIZE jobs containing: {', '.join(preferences['must_have_keywords'])}")
 
         if not user_profile_parts:
-            raise Exception("User has no resume data or preferences set.")
+            raise PermanentTaskError("User has no resume data or preferences set.")
 
         user_profile_string = "\n".join(user_profile_parts)
         
         # --- TASTE PROFILE (Pro users only) ---
         taste_profile_text = ""
+        taste_signals = {}
         if is_pro_user(user):
-            await tasks_collection.update_one({"_id": task_id}, {"$set": {"progress": 25, "message": "Analyzing your preferences...", "updated_at": datetime.utcnow()}})
+            await reporter.report(25, "Analyzing your preferences...")
             try:
-                taste_profile_text = await build_taste_profile(user_id)
+                taste_signals = await load_taste_signals(user_id)
+                taste_profile_text = format_taste_profile(taste_signals)
                 if taste_profile_text:
                     print(f"DEBUG: Built taste profile ({len(taste_profile_text)} chars)")
                     user_profile_string += "\n\n" + taste_profile_text
@@ -188,402 +464,34 @@ async def _run_recommendation_generation(user_id: str, task_id: str):
             except Exception as tp_error:
                 print(f"DEBUG: Taste profile build failed (non-fatal): {tp_error}")
         
-        # --- VECTOR SEARCH: Fetch candidates using FAISS ---
-        await tasks_collection.update_one({"_id": task_id}, {"$set": {"progress": 30, "message": "Searching for matching jobs...", "updated_at": datetime.utcnow()}})
-        
-        # Build a search query from user preferences + resume
-        search_query = build_search_query(preferences, resume_data)
-        print(f"DEBUG: Vector search query: '{search_query[:100]}...'")
-        
-        # Try vector search first, fall back to full scan if no index
-        candidate_job_ids = await search_similar_jobs(search_query, top_k=300)
-        
-        if candidate_job_ids:
-            # Fetch only the candidate jobs from MongoDB
-            from bson import ObjectId as BsonObjId
-            object_ids = []
-            for jid in candidate_job_ids:
-                try:
-                    object_ids.append(BsonObjId(jid))
-                except Exception:
-                    pass
-            all_jobs = await jobs_collection.find({"_id": {"$in": object_ids}}).to_list(length=300)
-            print(f"DEBUG: Vector search returned {len(all_jobs)} candidate jobs")
-        else:
-            # Fallback: No FAISS index yet, load all jobs (original behavior)
-            print("DEBUG: No FAISS index available, falling back to full collection scan")
-            all_jobs = await jobs_collection.find({}).to_list(length=None)
-        
-        if not all_jobs:
-            raise Exception("No jobs found in the database")
-        
-        print(f"DEBUG: Working with {len(all_jobs)} jobs for pre-filtering")
-        
-        # Pre-filter jobs based on user preferences - QUALITY-FOCUSED VERSION
-        def pre_filter_jobs(jobs, prefs, resume):
-            """
-            Filter jobs using a tiered approach for QUALITY over quantity.
-            
-            Tier 1: Hard Filters (mandatory exclusions)
-            Tier 2: Relevance Filters (at least one must match)
-            Tier 3: Quality Scoring (rank by relevance)
-            
-            Returns top 100 most relevant jobs.
-            """
-            
-            # === ROLE SYNONYMS MAPPING ===
-            # Maps user-selected roles to related job title keywords
-            ROLE_SYNONYMS = {
-                "software engineer": ["software engineer", "software developer", "sde", "developer", "programmer", "coder"],
-                "frontend developer": ["frontend developer", "front end developer", "frontend engineer", "front-end developer", "ui developer", "react developer", "angular developer", "vue developer", "web developer", "javascript developer"],
-                "backend developer": ["backend developer", "back end developer", "backend engineer", "back-end developer", "server developer", "api developer", "node developer", "java developer", "python developer", "golang developer"],
-                "fullstack developer": ["fullstack developer", "full stack developer", "full-stack developer", "fullstack engineer", "mern developer", "mean developer", "web developer"],
-                "mobile app developer": ["mobile developer", "ios developer", "android developer", "react native developer", "flutter developer", "mobile app developer", "mobile engineer", "app developer"],
-                "data scientist": ["data scientist", "data science", "machine learning", "ml engineer", "ai engineer", "data analyst", "analytics"],
-                "machine learning engineer": ["machine learning engineer", "ml engineer", "ai engineer", "deep learning", "nlp engineer", "ai/ml"],
-                "ai engineer": ["ai engineer", "artificial intelligence", "machine learning", "deep learning", "llm engineer", "generative ai"],
-                "data analyst": ["data analyst", "business analyst", "analytics", "bi analyst", "reporting analyst"],
-                "data engineer": ["data engineer", "etl developer", "data pipeline", "big data", "spark developer", "data platform"],
-                "devops engineer": ["devops engineer", "devops", "platform engineer", "infrastructure engineer", "cloud engineer", "sre", "site reliability"],
-                "cloud engineer": ["cloud engineer", "aws engineer", "azure engineer", "gcp engineer", "cloud architect", "cloud developer"],
-                "site reliability engineer (sre)": ["sre", "site reliability", "reliability engineer", "platform engineer", "infrastructure"],
-                "qa engineer": ["qa engineer", "quality assurance", "test engineer", "tester", "quality engineer", "qe"],
-                "test automation engineer": ["automation engineer", "test automation", "sdet", "automation tester", "qa automation"],
-                "ui/ux designer": ["ui designer", "ux designer", "ui/ux", "product designer", "visual designer", "interaction designer"],
-                "product designer": ["product designer", "ux designer", "design lead", "senior designer"],
-                "ux researcher": ["ux researcher", "user researcher", "design researcher", "usability"],
-                "product manager": ["product manager", "pm", "product owner", "product lead"],
-                "technical product manager": ["technical product manager", "tpm", "technical pm", "product manager"],
-                "cybersecurity analyst": ["security analyst", "cybersecurity", "infosec", "security engineer", "soc analyst"],
-                "security engineer": ["security engineer", "appsec", "application security", "infosec engineer", "devsecops"],
-                "database administrator": ["dba", "database administrator", "database engineer", "db admin"],
-                "systems administrator": ["systems administrator", "sysadmin", "system administrator", "it admin"],
-                "business analyst": ["business analyst", "ba", "functional analyst", "requirements analyst"],
-                "scrum master": ["scrum master", "agile coach", "agile master"],
-                "project manager": ["project manager", "program manager", "delivery manager", "project lead"],
-            }
-            
-            # === EXTRACT ALL PREFERENCES ===
-            preferred_locations = [loc.lower().strip() for loc in prefs.get("location", [])]
-            preferred_roles = [role.lower().strip() for role in prefs.get("role", [])]
-            tech_stack = [tech.lower().strip() for tech in prefs.get("tech_stack", [])]
-            exclude_keywords = [kw.lower().strip() for kw in prefs.get("exclude_keywords", [])]
-            must_have_keywords = [kw.lower().strip() for kw in prefs.get("must_have_keywords", [])]
-            job_types = [jt.lower().strip() for jt in prefs.get("job_type", [])]
-            work_arrangements = [wa.lower().strip() for wa in prefs.get("work_arrangement", [])]
-            experience_level = prefs.get("experience_level", "").lower().strip()
-            seniority_level = prefs.get("seniority_level", "").lower().strip()
-            role_type = prefs.get("role_type", "").lower().strip()
-            
-            # Primary skills (first 5) get higher weight
-            primary_skills = tech_stack[:5] if len(tech_stack) >= 5 else tech_stack
-            secondary_skills = tech_stack[5:] if len(tech_stack) > 5 else []
-            
-            # Expand roles with synonyms
-            expanded_roles = set()
-            for role in preferred_roles:
-                expanded_roles.add(role)
-                if role in ROLE_SYNONYMS:
-                    expanded_roles.update(ROLE_SYNONYMS[role])
-                # Also add partial matches
-                for key, synonyms in ROLE_SYNONYMS.items():
-                    if role in key or key in role:
-                        expanded_roles.update(synonyms)
-            expanded_roles = list(expanded_roles)
-            
-            # Add roles from resume if available
-            if resume:
-                for r in resume.get("roles", []):
-                    r_lower = r.lower().strip()
-                    expanded_roles.append(r_lower)
-                    if r_lower in ROLE_SYNONYMS:
-                        expanded_roles.extend(ROLE_SYNONYMS[r_lower])
-            
-            # Remote preference check
-            user_wants_remote = any("remote" in loc for loc in preferred_locations) or \
-                               any("remote" in wa for wa in work_arrangements)
-            
-            # City aliases for location matching
-            city_aliases = {
-                "bangalore": ["bengaluru", "blr", "bangalore"],
-                "bengaluru": ["bangalore", "blr", "bengaluru"],
-                "mumbai": ["bombay", "mumbai"],
-                "chennai": ["madras", "chennai"],
-                "kolkata": ["calcutta", "kolkata"],
-                "delhi": ["new delhi", "ncr", "delhi", "delhi ncr"],
-                "delhi ncr": ["new delhi", "ncr", "delhi", "gurgaon", "gurugram", "noida"],
-                "hyderabad": ["hyd", "hyderabad"],
-                "pune": ["pune"],
-            }
-            
-            # Experience level to seniority mapping
-            is_fresher = experience_level in ["fresher", "internship"] or "junior" in seniority_level
-            is_senior = experience_level in ["5-7 years", "7-10 years", "10+ years"] or \
-                       any(x in seniority_level for x in ["senior", "staff", "principal", "architect"])
-            is_mid_level = experience_level in ["1-3 years", "3-5 years"] or "mid" in seniority_level
-            
-            filtered = []
-            stats = {"total": 0, "excluded": 0, "seniority_mismatch": 0, "role_type_mismatch": 0, 
-                    "no_relevance": 0, "must_have_missing": 0, "accepted": 0}
-            
-            for job in jobs:
-                stats["total"] += 1
-                title = (job.get("title") or "").lower()
-                location = (job.get("location") or "").lower()
-                description = (job.get("description") or "").lower()
-                full_text = f"{title} {description}"
-                
-                # ============= TIER 1: HARD FILTERS =============
-                
-                # 1. Exclude keywords check (HARD FILTER)
-                if exclude_keywords and any(kw in title or kw in description for kw in exclude_keywords):
-                    stats["excluded"] += 1
-                    continue
-                
-                # 2. Seniority mismatch check (HARD FILTER)
-                is_senior_job = any(kw in title for kw in ["senior", "sr.", "sr ", "lead", "principal", "staff", "architect", "director", "head"])
-                is_entry_job = any(kw in title for kw in ["fresher", "entry", "graduate", "intern", "trainee", "associate", "junior"])
-                is_management_job = any(kw in title for kw in ["manager", "head", "director", "vp", "team lead", "engineering manager"])
-                
-                # Freshers should NOT see senior jobs
-                if is_fresher and is_senior_job:
-                    stats["seniority_mismatch"] += 1
-                    continue
-                
-                # Seniors should NOT see entry/fresher jobs (unless they're actually senior roles)
-                if is_senior and is_entry_job and not is_senior_job:
-                    stats["seniority_mismatch"] += 1
-                    continue
-                
-                # 2b. Experience years check (HARD FILTER using scraped data)
-                # Map user experience level to maximum years they can apply for
-                user_exp_map = {
-                    "fresher": 1, "internship": 1, "1-3 years": 3, 
-                    "3-5 years": 5, "5-7 years": 7, "7-10 years": 10, "10+ years": 15
-                }
-                user_max_years = user_exp_map.get(experience_level, 5)  # Default to mid-level
-                
-                job_min_years = job.get("experience_min_years")
-                if job_min_years is not None:
-                    # Allow applying to jobs requiring up to 1 year more than user has
-                    if job_min_years > user_max_years + 1:
-                        stats["seniority_mismatch"] += 1
-                        continue
-                
-                # 3. Role type check - IC vs Management (HARD FILTER)
-                if role_type:
-                    if "individual contributor" in role_type and is_management_job:
-                        stats["role_type_mismatch"] += 1
-                        continue
-                    # If user wants management roles, skip pure IC roles
-                    if "management" in role_type and not is_management_job:
-                        stats["role_type_mismatch"] += 1
-                        continue
-                
-                # 4. Must-have keywords (HARD FILTER if specified)
-                if must_have_keywords:
-                    has_must_have = any(kw in title or kw in description for kw in must_have_keywords)
-                    if not has_must_have:
-                        stats["must_have_missing"] += 1
-                        continue
-                
-                # ============= TIER 2: RELEVANCE FILTERS =============
-                # Job must match at least ONE of: location, role, or have 2+ tech skills
-                
-                score = 0
-                relevance_matched = False
-                
-                # Location match check (+5 points)
-                remote_keywords = ["remote", "work from home", "wfh", "anywhere", "distributed", "remote-first"]
-                is_remote_job = any(kw in location for kw in remote_keywords)
-                
-                if user_wants_remote and is_remote_job:
-                    score += 5
-                    relevance_matched = True
-                elif preferred_locations:
-                    for loc in preferred_locations:
-                        city = loc.replace("remote", "").replace("(", "").replace(")", "").replace("india", "").replace("global", "").strip()
-                        if city:
-                            aliases = city_aliases.get(city, [city])
-                            if any(alias in location for alias in aliases):
-                                score += 5
-                                relevance_matched = True
-                                break
-                
-                # Role match check (+5 points for exact, +3 for synonym)
-                role_match_score = 0
-                for role in expanded_roles:
-                    if role in title:
-                        role_match_score = max(role_match_score, 5)
-                        relevance_matched = True
-                    elif any(word in title for word in role.split()):
-                        role_match_score = max(role_match_score, 3)
-                        relevance_matched = True
-                score += role_match_score
-                
-                # Tech stack match check
-                primary_matches = sum(1 for tech in primary_skills if tech in full_text)
-                secondary_matches = sum(1 for tech in secondary_skills if tech in full_text)
-                tech_score = (primary_matches * 3) + (secondary_matches * 1)
-                
-                if primary_matches >= 2 or (primary_matches >= 1 and secondary_matches >= 2):
-                    relevance_matched = True
-                
-                score += min(tech_score, 15)  # Cap tech score at 15
-                
-                # If no relevance match at all, skip this job
-                if not relevance_matched:
-                    stats["no_relevance"] += 1
-                    continue
-                
-                # ============= TIER 3: QUALITY SCORING =============
-                
-                # Job type bonus (+2 points)
-                if job_types:
-                    job_type_keywords = {
-                        "full-time": ["full-time", "full time", "permanent", "fte"],
-                        "part-time": ["part-time", "part time"],
-                        "contract": ["contract", "contractor", "c2c", "freelance"],
-                        "internship": ["intern", "internship", "trainee"]
-                    }
-                    for jt in job_types:
-                        keywords = job_type_keywords.get(jt, [jt])
-                        if any(kw in full_text for kw in keywords):
-                            score += 2
-                            break
-                
-                # Work arrangement bonus (+2 points)
-                if work_arrangements:
-                    if "remote" in work_arrangements and is_remote_job:
-                        score += 2
-                    elif "hybrid" in work_arrangements and "hybrid" in full_text:
-                        score += 2
-                    elif any(x in work_arrangements for x in ["on-site", "onsite"]) and not is_remote_job:
-                        score += 2
-                
-                # Seniority alignment bonus (+3 points)
-                if is_fresher and is_entry_job:
-                    score += 3
-                elif is_senior and is_senior_job:
-                    score += 3
-                elif is_mid_level and not is_entry_job and not is_senior_job:
-                    score += 3
-                
-                # Add job to filtered list
-                job["_prefilter_score"] = score
-                job["_relevance_matched"] = True
-                filtered.append(job)
-                stats["accepted"] += 1
-            
-            # Log filtering stats
-            print(f"DEBUG PRE-FILTER STATS: {stats}")
-            print(f"DEBUG: Total jobs considered: {stats['total']}")
-            print(f"DEBUG: Excluded by keywords: {stats['excluded']}")
-            print(f"DEBUG: Seniority mismatch: {stats['seniority_mismatch']}")
-            print(f"DEBUG: Role type mismatch: {stats['role_type_mismatch']}")
-            print(f"DEBUG: Must-have missing: {stats['must_have_missing']}")
-            print(f"DEBUG: No relevance match: {stats['no_relevance']}")
-            print(f"DEBUG: Accepted jobs: {stats['accepted']}")
-            
-            # Sort by score and return top 100 most relevant jobs
-            filtered.sort(key=lambda x: x.get("_prefilter_score", 0), reverse=True)
-            
-            # Return top 100 jobs (quality over quantity)
-            return filtered[:100]
-        
-        # Apply pre-filtering
-        jobs = pre_filter_jobs(all_jobs, preferences, resume_data)
-        print(f"DEBUG: Pre-filtered to {len(jobs)} relevant jobs from {len(all_jobs)} total")
-        
-        # If pre-filter returns too few jobs, use broader criteria
-        if len(jobs) < 50 and len(all_jobs) > 50:
-            print(f"DEBUG: Pre-filter returned only {len(jobs)} jobs, adding more from general pool")
-            # Add top jobs from general pool that weren't already included
-            existing_urls = {j.get("job_url") for j in jobs}
-            for job in all_jobs:
-                if job.get("job_url") not in existing_urls:
-                    job["_prefilter_score"] = 0
-                    jobs.append(job)
-                if len(jobs) >= 100:
-                    break
-            print(f"DEBUG: Expanded job pool to {len(jobs)} jobs")
-
-        prompt = build_prompt(user_profile_string, jobs, len(jobs))
-        await tasks_collection.update_one({"_id": task_id}, {"$set": {"progress": 60, "message": "Generating AI recommendations...", "updated_at": datetime.utcnow()}})
-        model = genai.GenerativeModel(model_name=GEMINI_MODEL_NAME, generation_config=GENERATION_CONFIG, safety_settings=SAFETY_SETTINGS)
-        
-        # Retry logic for Gemini API
-        max_retries = 2
-        response = None
-        for attempt in range(max_retries):
-            try:
-                response = await asyncio.to_thread(model.generate_content, prompt)
-                if response.candidates and response.candidates[0].content.parts:
-                    break
-                print(f"DEBUG: Attempt {attempt+1} - Empty response, retrying...")
-                await asyncio.sleep(2)  # Wait before retry
-            except Exception as api_error:
-                print(f"DEBUG: Attempt {attempt+1} - API error: {api_error}")
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(2)
-                else:
-                    raise api_error
-
-        if not response or not response.candidates or not response.candidates[0].content.parts:
-            feedback = response.prompt_feedback if response and hasattr(response, 'prompt_feedback') else 'No feedback available'
-            raise Exception(f"AI content filtering triggered after {max_retries} attempts. Feedback: {feedback}")
-
-        raw_text = response.text.strip()
-        if raw_text.startswith("```"):
-            parts = raw_text.split("```")
-            cleaned_response_text = parts[1].lstrip("json").strip() if len(parts) >= 2 else raw_text
-        else:
-            cleaned_response_text = raw_text
-
+        # --- RESULT CACHE: same inputs and corpus version give the same ranking ---
+        cache_key = None
+        cached_jobs = None
         try:
-            recommended_jobs_data = json.loads(cleaned_response_text)
-        except json.JSONDecodeError:
-            import re
-            json_objects_str = re.findall(r'\{[^{}]*\}', cleaned_response_text)
-            if json_objects_str:
-                recommended_jobs_data = [json.loads(s) for s in json_objects_str]
-            else:
-                raise ValueError("Failed to parse or repair JSON response from AI.")
-
-        if not isinstance(recommended_jobs_data, list) or len(recommended_jobs_data) == 0:
-            raise ValueError("AI response is not a valid list of jobs.")
-
-        recommended_jobs = [RecommendedJob(**job) for job in recommended_jobs_data]
-        
-        # FALLBACK: If AI returned too few recommendations, supplement with pre-filtered jobs
-        MIN_RECOMMENDATIONS = 10
-        if len(recommended_jobs) < MIN_RECOMMENDATIONS and len(jobs) > len(recommended_jobs):
-            print(f"DEBUG: AI only returned {len(recommended_jobs)} recommendations, adding fallback jobs")
-            
-            # Get URLs of jobs already recommended
-            recommended_urls = {job.job_url for job in recommended_jobs if job.job_url}
-            
-            # Add pre-filtered jobs that weren't already recommended
-            for job_data in jobs:
-                if len(recommended_jobs) >= MIN_RECOMMENDATIONS:
-                    break
-                if job_data.get("job_url") not in recommended_urls:
-                    # Create fallback job with pre-filter score
-                    prefilter_score = job_data.get("_prefilter_score", 0)
-                    match_score = min(40 + (prefilter_score * 5), 80)  # Convert to 0-100 scale
-                    
-                    fallback_job = RecommendedJob(
-                        title=job_data.get("title", "Unknown Title"),
-                        company=str(job_data.get("company", "Unknown Company")),
-                        location=job_data.get("location", "Unknown Location"),
-                        match_score=match_score,
-                        reason=f"This role matches your preference for {', '.join(preferences.get('role', ['this field'])[:2])} positions.",
-                        job_url=job_data.get("job_url")
-                    )
-                    recommended_jobs.append(fallback_job)
-                    recommended_urls.add(job_data.get("job_url"))
-            
-            print(f"DEBUG: After fallback, now have {len(recommended_jobs)} recommendations")
+            cache_key = recommendation_cache.fingerprint({
+                "profile": user_profile_string,
+                "preferences": preferences,
+                "resume": recommendation_cache.resume_fields(resume_data),
+                "corpus": await _corpus_version(),
+                "ranking": [GEMINI_MODEL_NAME, GEMINI_TWO_STAGE, GEMINI_SHORTLIST_MODEL, GEMINI_SHORTLIST_SIZE, PROMPT_TOKEN_BUDGET,
+                            LOCAL_RANKER_MODE],
+            })
+            cached_jobs = await recommendation_cache.get(cache_key)
+        except Exception as cache_error:
+            print(f"DEBUG: Recommendation cache lookup failed (non-fatal): {cache_error}")
+
+        if cached_jobs is not None:
+            print(f"DEBUG: Recommendation cache hit ({len(cached_jobs)} jobs), skipping search and ranking")
+            recommended_jobs = [RecommendedJob(**job) for job in cached_jobs]
+            ranker = "cache"
+        else:
+            recommended_jobs, ranker = await _rank_jobs(task_id, user, preferences, resume_data, user_profile_string, taste_signals)
+            # A local ranking standing in for Gemini isn't cached, so the next run asks Gemini again
+            if cache_key and (ranker == "gemini" or LOCAL_RANKER_MODE == "primary"):
+                try:
+                    await recommendation_cache.put(cache_key, user_id, [job.dict() for job in recommended_jobs])
+                except Exception as cache_error:
+                    print(f"DEBUG: Recommendation cache write failed (non-fatal): {cache_error}")
 
         # Calculate time saved for this batch
         # Calculate time saved for this batch
@@ -601,37 +509,88 @@ async def _run_recommendation_generation(user_id: str, task_id: str):
         evaluation_time_saved = len(recommended_jobs) * 6
         total_batch_time_saved = search_time_saved + evaluation_time_saved
 
-        await tasks_collection.update_one({"_id": task_id}, {"$set": {"progress": 90, "message": "Syncing database...", "updated_at": datetime.utcnow()}})
+        job_dicts = [job.dict() for job in recommended_jobs]
+        export_sheet = is_pro_user(user) and user.get("sheets_enabled")
+        result = {"count": len(recommended_jobs), "sheets_error": None, "ranker": ranker}
+        if export_sheet:
+            result["sheets_export"] = "pending"
 
-        recommendation_data = {"user_id": user_id, "recommended_jobs": [job.dict() for job in recommended_jobs], "generated_at": datetime.utcnow()}
-        await recommendations_collection.update_one({"user_id": user_id}, {"$set": recommendation_data}, upsert=True)
+        # Recommendations, the user's job_applications and task completion in one step
+        await result_store.save_generation(task_id, user_id, user_object_id, job_dicts, total_batch_time_saved, result)
 
-        # Update user's job_applications and time_saved_minutes
-        await users_collection.update_one(
-            {"_id": user_object_id},
-            {"$set": {"job_applications": [{"job_details": job.dict(), "status": "recommended", "updated_at": datetime.utcnow()} for job in recommended_jobs]},
-             "$inc": {"time_saved_minutes": total_batch_time_saved}}
-        )
-
-        sheets_error = None
-        if is_pro_user(user) and user.get("sheets_enabled"):
-            success = await write_to_sheet(user_id, [job.dict() for job in recommended_jobs])
-            if not success:
-                sheets_error = f"Failed to write to Google Sheets for user {user_id}."
-        
-        await tasks_collection.update_one(
-            {"_id": task_id},
-            {"$set": {"status": "complete", "progress": 100, "message": "Done!", "result": {"count": len(recommended_jobs), "sheets_error": sheets_error}, "updated_at": datetime.utcnow()}}
-        )
+        # Off the critical path: the task is already complete
+        if export_sheet:
+            result_store.export_to_sheet(task_id, user_id, job_dicts)
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        # The task queue decides between a retry and marking the task failed
         print(f"❌ ERROR in background task {task_id} for user {user_id}: {e}")
-        await tasks_collection.update_one(
-            {"_id": task_id},
-            {"$set": {"status": "failed", "error": str(e), "updated_at": datetime.utcnow()}}
-        )
+        raise
+    finally:
+        reporter.close()
+
+
+async def start_generation_task(user_id: str, source: str = None) -> str:
+    """
+    Queue a recommendation generation; in inline mode it starts running in this process.
+    A user with a generation already pending or running gets that task's id instead.
+    """
+    task_id, created = await task_queue.enqueue(user_id, source)
+    if created:
+        task_queue.dispatch(task_id, _run_recommendation_generation)
+    return task_id
+
+# --- Helper: Task Status ---
+async def _load_task_status(task_id: str, user_id: str) -> dict:
+    task = await tasks_collection.find_one({"_id": task_id}, STATUS_PROJECTION)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    # Ensure user can only access their own tasks
+    if task.get("user_id") != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this task")
+
+    # Inline mode has no worker to pick up a task whose process died mid-run
+    if GENERATION_MODE == "inline" and task_queue.lease_expired(task):
+        task_queue.dispatch(task_id, _run_recommendation_generation)
+
+    # Progress reported in this process may not be written yet
+    live = progress_reports.snapshot(task_id)
+    if live and task["status"] == "running":
+        task.update(live)
+    return task
+
+
+async def _wait_for_status_change(task_id: str, user_id: str, since: str, timeout: float) -> dict:
+    """The task once its updated_at is no longer `since` (or it's final), or as it is after `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    task = await _load_task_status(task_id, user_id)
+    while task["status"] not in FINAL_TASK_STATUSES and task["updated_at"].isoformat() == since:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # A reporter in this process wakes us right away; a task running elsewhere is re-read every STATUS_POLL_SECONDS
+        changed = await progress_reports.wait_for_change(task_id, min(remaining, STATUS_POLL_SECONDS))
+        live = progress_reports.snapshot(task_id)
+        if changed and live and task["status"] == "running":
+            task = {**task, **live}
+        else:
+            task = await _load_task_status(task_id, user_id)
+    return task
+
+
+def _status_body(task: dict) -> dict:
+    return {
+        "task_id": task["_id"],
+        "status": task["status"],
+        "progress": task.get("progress", 0),
+        "message": task.get("message", ""),
+        "created_at": task["created_at"],
+        "updated_at": task["updated_at"],
+        "result": task.get("result"),
+        "error": task.get("error")
+    }
+
 
 # --- API Endpoints ---
 @router.post("/recommendations/start", status_code=202)
@@ -655,41 +614,49 @@ async def start_recommendation_generation(
                 detail=f"Recommendation limit reached. Next generation available in {limit_days - time_since.days} days."
             )
 
-    task_id = str(uuid.uuid4())
-    await tasks_collection.insert_one({
-        "_id": task_id,
-        "user_id": user_id,
-        "status": "pending",
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
-    })
-
-    # Use asyncio.create_task instead of BackgroundTasks for Lambda compatibility
-    # This runs in the same event loop and Lambda will wait for it
-    asyncio.create_task(_run_recommendation_generation(user_id, task_id))
+    task_id = await start_generation_task(user_id)
     
     return {"task_id": task_id, "message": "Recommendation generation started."}
 
 @router.get("/recommendations/status/{task_id}")
-async def get_recommendation_status(task_id: str, current_user: dict = Depends(get_current_user)):
-    task = await tasks_collection.find_one({"_id": task_id})
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
-    # Ensure user can only access their own tasks
-    if task.get("user_id") != current_user.get("_id"):
-        raise HTTPException(status_code=403, detail="Not authorized to view this task")
-        
-    return {
-        "task_id": task["_id"],
-        "status": task["status"],
-        "progress": task.get("progress", 0),
-        "message": task.get("message", ""),
-        "created_at": task["created_at"],
-        "updated_at": task["updated_at"],
-        "result": task.get("result"),
-        "error": task.get("error")
-    }
+async def get_recommendation_status(task_id: str, wait: float = 0, since: str = None,
+                                    current_user: dict = Depends(get_current_user)):
+    """
+    Generation task status. Long poll: with `since` (the updated_at of the last
+    status seen) and `wait` seconds, the request is held until the task changes.
+    """
+    user_id = current_user.get("_id")
+    if wait > 0 and since:
+        task = await _wait_for_status_change(task_id, user_id, since, min(wait, STATUS_MAX_WAIT_SECONDS))
+    else:
+        task = await _load_task_status(task_id, user_id)
+    return _status_body(task)
+
+
+@router.get("/recommendations/status/{task_id}/events")
+async def stream_recommendation_status(task_id: str, current_user: dict = Depends(get_current_user)):
+    """Server-sent events: the task status on every change, until it is complete or failed."""
+    user_id = current_user.get("_id")
+    task = await _load_task_status(task_id, user_id)
+
+    async def events():
+        current = task
+        last_sent = None
+        while True:
+            stamp = current["updated_at"].isoformat()
+            if stamp != last_sent:
+                yield f"data: {json.dumps(jsonable_encoder(_status_body(current)))}\n\n"
+                last_sent = stamp
+            else:
+                yield ": keep-alive\n\n"
+            if current["status"] in FINAL_TASK_STATUSES:
+                return
+            current = await _wait_for_status_change(task_id, user_id, stamp, SSE_KEEPALIVE_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @router.post("/recommendations/demo")
 @limiter.limit("2/day")
 async def generate_demo_recommendations(request: Request):
@@ -0,0 +1,195 @@
+"""
+Gemini Admission Control for Tackleit v2.5
+
+Every Gemini call made by recommendation generation goes through
+`llm_limiter.slot(priority)`:
+
+- at most LLM_MAX_CONCURRENCY calls in flight per process
+- a token bucket refilled at LLM_REQUESTS_PER_MINUTE (size it to the provider
+  quota), with a burst of LLM_MAX_CONCURRENCY
+- waiting calls are admitted by priority (Pro users first), then FIFO
+- blocking SDK calls run through to_thread, so a caller that gives up (a
+  hedge timeout) doesn't free the slot while the call is still running
+- a 429 from the provider (report_rate_limited) pauses admissions with an
+  exponential backoff that shrinks again on successful calls
+- optionally, LLM_GLOBAL_REQUESTS_PER_MINUTE caps calls per minute across all
+  processes with a per-minute counter document in MongoDB
+
+stats() reports queue depth and counters for logging.
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import contextvars
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from dotenv import load_dotenv
+
+from database import db
+
+load_dotenv()
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+LLM_GLOBAL_REQUESTS_PER_MINUTE = int(os.getenv("LLM_GLOBAL_REQUESTS_PER_MINUTE", "0"))  # 0 = no cross-process cap
+LLM_BACKOFF_INITIAL_SECONDS = 2.0
+LLM_BACKOFF_MAX_SECONDS = 60.0
+
+PRIORITY_PRO = 0
+PRIORITY_FREE = 1
+
+rate_limits_collection = db["llm_rate_limits"]
+
+# The slot() held by the running task: {"holders": n}, where the slot body and each
+# to_thread call running under it count as one holder
+_current_slot = contextvars.ContextVar("llm_slot", default=None)
+
+
+class LLMLimiter:
+    def __init__(self, max_concurrency: int, requests_per_minute: float, global_requests_per_minute: int = 0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate = max(requests_per_minute, 1) / 60.0
+        self.capacity = float(self.max_concurrency)
+        self.global_requests_per_minute = global_requests_per_minute
+        self.tokens = self.capacity
+        self.active = 0
+        self.admitted_total = 0
+        self.rate_limited_total = 0
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._backoff = 0.0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._timer = None
+        self._global_index_ready = False
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _wake_in(self, delay: float):
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def _dispatch(self):
+        """Admit waiters while there is a free slot, a token, and no 429 pause."""
+        self._refill()
+        while self._waiters and self.active < self.max_concurrency:
+            if self._waiters[0][2].done():
+                heapq.heappop(self._waiters)  # cancelled while waiting
+                continue
+            now = time.monotonic()
+            if now < self._paused_until:
+                self._wake_in(self._paused_until - now)
+                return
+            if self.tokens < 1:
+                self._wake_in((1 - self.tokens) / self.rate)
+                return
+            _, _, future = heapq.heappop(self._waiters)
+            self.tokens -= 1
+            self.active += 1
+            self.admitted_total += 1
+            future.set_result(None)
+
+    def _release(self):
+        self.active -= 1
+        self._dispatch()
+
+    async def _reserve_global(self):
+        """Count this call against the cross-process per-minute cap, waiting for the next minute if it is full."""
+        if not self._global_index_ready:
+            await rate_limits_collection.create_index("expires_at", expireAfterSeconds=0)
+            self._global_index_ready = True
+        while True:
+            now = time.time()
+            window = int(now // 60)
+            counter = await rate_limits_collection.find_one_and_update(
+                {"_id": f"gemini:{window}"},
+                {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": datetime.utcnow() + timedelta(minutes=5)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            if counter["count"] <= self.global_requests_per_minute:
+                return
+            await asyncio.sleep((window + 1) * 60 - now)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_FREE):
+        """Hold one admitted LLM call. Yields the milliseconds spent waiting."""
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # admitted just as the caller was cancelled
+            raise
+        held = {"holders": 1}
+        token = _current_slot.set(held)
+        try:
+            if self.global_requests_per_minute:
+                await self._reserve_global()
+            yield int((time.monotonic() - started) * 1000)
+        finally:
+            _current_slot.reset(token)
+            self._drop_holder(held)
+
+    def _drop_holder(self, held: dict):
+        held["holders"] -= 1
+        if held["holders"] == 0:
+            self._release()
+
+    def to_thread(self, func, *args):
+        """
+        Run a blocking call in a worker thread from inside slot(). A thread can't be
+        cancelled, so if the caller is, the slot stays taken until the thread returns.
+        """
+        call = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        held = _current_slot.get()
+        if held is not None:
+            held["holders"] += 1
+        call.add_done_callback(lambda done: self._thread_done(done, held))
+        return asyncio.shield(call)
+
+    def _thread_done(self, call, held):
+        if not call.cancelled():
+            call.exception()  # retrieved here in case the caller stopped waiting
+        if held is not None:
+            self._drop_holder(held)
+
+    def report_rate_limited(self):
+        """The provider answered 429: pause admissions, backing off further on repeats."""
+        self.rate_limited_total += 1
+        self._backoff = min(max(self._backoff * 2, LLM_BACKOFF_INITIAL_SECONDS), LLM_BACKOFF_MAX_SECONDS)
+        self._paused_until = max(self._paused_until, time.monotonic() + self._backoff)
+        self.tokens = 0.0
+        print(f"DEBUG: Gemini rate limited, pausing LLM calls for {self._backoff:.0f}s")
+
+    def report_success(self):
+        self._backoff = self._backoff / 2 if self._backoff > LLM_BACKOFF_INITIAL_SECONDS else 0.0
+
+    def stats(self) -> dict:
+        waiting = [entry for entry in self._waiters if not entry[2].done()]
+        return {
+            "active": self.active,
+            "waiting": len(waiting),
+            "waiting_pro": sum(1 for entry in waiting if entry[0] == PRIORITY_PRO),
+            "tokens": round(self.tokens, 2),
+            "paused_for_s": round(max(self._paused_until - time.monotonic(), 0.0), 1),
+            "admitted_total": self.admitted_total,
+            "rate_limited_total": self.rate_limited_total,
+        }
+
+
+llm_limiter = LLMLimiter(LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE, LLM_GLOBAL_REQUESTS_PER_MINUTE)
@@ -0,0 +1,181 @@
+"""
+Preference Matching Tables for Tackleit v2.5
+
+The role synonym, city alias and job type keyword tables used by the pre-filter
+and the local ranker, compiled once at import:
+
+- ROLE_GRAPH: every known role key mapped to all synonyms it expands to,
+  including those of keys it partially matches ("developer" ⊂ "web developer"),
+  so a known role needs no scan over ROLE_SYNONYMS
+- expand_roles: memoized per (preferred roles, resume roles) tuple; roles
+  outside the tables are scanned once and then cached too
+
+Pure Python with no project imports, so it can be imported (and benchmarked)
+on its own:
+
+    python -m services.matching
+"""
+
+from functools import lru_cache
+
+# Distinct role / resume-role tuples kept by the expand_roles memo
+_EXPANSION_CACHE_SIZE = 4096
+
+# === ROLE SYNONYMS MAPPING ===
+# Maps user-selected roles to related job title keywords
+ROLE_SYNONYMS = {
+    "software engineer": ["software engineer", "software developer", "sde", "developer", "programmer", "coder"],
+    "frontend developer": ["frontend developer", "front end developer", "frontend engineer", "front-end developer", "ui developer", "react developer", "angular developer", "vue developer", "web developer", "javascript developer"],
+    "backend developer": ["backend developer", "back end developer", "backend engineer", "back-end developer", "server developer", "api developer", "node developer", "java developer", "python developer", "golang developer"],
+    "fullstack developer": ["fullstack developer", "full stack developer", "full-stack developer", "fullstack engineer", "mern developer", "mean developer", "web developer"],
+    "mobile app developer": ["mobile developer", "ios developer", "android developer", "react native developer", "flutter developer", "mobile app developer", "mobile engineer", "app developer"],
+    "data scientist": ["data scientist", "data science", "machine learning", "ml engineer", "ai engineer", "data analyst", "analytics"],
+    "machine learning engineer": ["machine learning engineer", "ml engineer", "ai engineer", "deep learning", "nlp engineer", "ai/ml"],
+    "ai engineer": ["ai engineer", "artificial intelligence", "machine learning", "deep learning", "llm engineer", "generative ai"],
+    "data analyst": ["data analyst", "business analyst", "analytics", "bi analyst", "reporting analyst"],
+    "data engineer": ["data engineer", "etl developer", "data pipeline", "big data", "spark developer", "data platform"],
+    "devops engineer": ["devops engineer", "devops", "platform engineer", "infrastructure engineer", "cloud engineer", "sre", "site reliability"],
+    "cloud engineer": ["cloud engineer", "aws engineer", "azure engineer", "gcp engineer", "cloud architect", "cloud developer"],
+    "site reliability engineer (sre)": ["sre", "site reliability", "reliability engineer", "platform engineer", "infrastructure"],
+    "qa engineer": ["qa engineer", "quality assurance", "test engineer", "tester", "quality engineer", "qe"],
+    "test automation engineer": ["automation engineer", "test automation", "sdet", "automation tester", "qa automation"],
+    "ui/ux designer": ["ui designer", "ux designer", "ui/ux", "product designer", "visual designer", "interaction designer"],
+    "product designer": ["product designer", "ux designer", "design lead", "senior designer"],
+    "ux researcher": ["ux researcher", "user researcher", "design researcher", "usability"],
+    "product manager": ["product manager", "pm", "product owner", "product lead"],
+    "technical product manager": ["technical product manager", "tpm", "technical pm", "product manager"],
+    "cybersecurity analyst": ["security analyst", "cybersecurity", "infosec", "security engineer", "soc analyst"],
+    "security engineer": ["security engineer", "appsec", "application security", "infosec engineer", "devsecops"],
+    "database administrator": ["dba", "database administrator", "database engineer", "db admin"],
+    "systems administrator": ["systems administrator", "sysadmin", "system administrator", "it admin"],
+    "business analyst": ["business analyst", "ba", "functional analyst", "requirements analyst"],
+    "scrum master": ["scrum master", "agile coach", "agile master"],
+    "project manager": ["project manager", "program manager", "delivery manager", "project lead"],
+}
+
+# City aliases for location matching
+CITY_ALIASES = {
+    "bangalore": ["bengaluru", "blr", "bangalore"],
+    "bengaluru": ["bangalore", "blr", "bengaluru"],
+    "mumbai": ["bombay", "mumbai"],
+    "chennai": ["madras", "chennai"],
+    "kolkata": ["calcutta", "kolkata"],
+    "delhi": ["new delhi", "ncr", "delhi", "delhi ncr"],
+    "delhi ncr": ["new delhi", "ncr", "delhi", "gurgaon", "gurugram", "noida"],
+    "hyderabad": ["hyd", "hyderabad"],
+    "pune": ["pune"],
+}
+
+JOB_TYPE_KEYWORDS = {
+    "full-time": ["full-time", "full time", "permanent", "fte"],
+    "part-time": ["part-time", "part time"],
+    "contract": ["contract", "contractor", "c2c", "freelance"],
+    "internship": ["intern", "internship", "trainee"]
+}
+
+
+def _scan_synonyms(role: str) -> tuple:
+    """Synonyms of every key the role matches exactly or partially, in table order."""
+    expanded = {}
+    for key, synonyms in ROLE_SYNONYMS.items():
+        if role in key or key in role:
+            expanded.update(dict.fromkeys(synonyms))
+    return tuple(expanded)
+
+
+ROLE_GRAPH = {key: _scan_synonyms(key) for key in ROLE_SYNONYMS}
+
+
+@lru_cache(maxsize=_EXPANSION_CACHE_SIZE)
+def _role_expansion(role: str) -> tuple:
+    """A preferred role followed by its synonyms."""
+    synonyms = ROLE_GRAPH.get(role)
+    if synonyms is None:
+        synonyms = _scan_synonyms(role)
+    return tuple(dict.fromkeys((role,) + synonyms))
+
+
+@lru_cache(maxsize=_EXPANSION_CACHE_SIZE)
+def _expand(roles: tuple, resume_roles: tuple) -> tuple:
+    expanded = {}
+    for role in roles:
+        expanded.update(dict.fromkeys(_role_expansion(role)))
+    # Resume roles only add their own exact-key synonyms
+    for role in resume_roles:
+        expanded[role] = None
+        expanded.update(dict.fromkeys(ROLE_SYNONYMS.get(role, [])))
+    return tuple(expanded)
+
+
+def _resume_roles(resume: dict) -> tuple:
+    if not resume:
+        return ()
+    return tuple(r.lower().strip() for r in resume.get("roles", []) if isinstance(r, str))
+
+
+def expand_roles(preferred_roles: list, resume: dict = None) -> list:
+    """Preferred roles plus their synonyms (and roles from the resume), without duplicates."""
+    return list(_expand(tuple(preferred_roles), _resume_roles(resume)))
+
+
+@lru_cache(maxsize=_EXPANSION_CACHE_SIZE)
+def _words(roles: tuple) -> tuple:
+    return tuple(dict.fromkeys(word for role in roles for word in role.split()))
+
+
+def role_words(expanded_roles: list) -> list:
+    """Distinct words of the expanded roles (the pre-filter's partial title match)."""
+    return list(_words(tuple(expanded_roles)))
+
+
+def cities_from_locations(preferred_locations: list) -> list:
+    """Cities from lowercased preferred locations ("remote (india)" has none)."""
+    preferred_cities = []
+    for loc in preferred_locations:
+        city = loc.replace("remote", "").replace("(", "").replace(")", "").replace("india", "").replace("global", "").strip()
+        if city:
+            preferred_cities.append(city)
+    return preferred_cities
+
+
+def city_aliases(city: str) -> list:
+    return CITY_ALIASES.get(city, [city])
+
+
+def job_type_keywords(job_types: list) -> list:
+    return [kw for jt in job_types for kw in JOB_TYPE_KEYWORDS.get(jt, [jt])]
+
+
+def cache_info() -> dict:
+    return {"roles": _role_expansion.cache_info()._asdict(), "expansions": _expand.cache_info()._asdict()}
+
+
+def _benchmark(repeat: int = 20000):
+    import time
+
+    cases = [
+        ["software engineer"],
+        ["frontend developer", "fullstack developer"],
+        ["data scientist", "machine learning engineer", "ai engineer"],
+        ["devops engineer", "platform engineer"],
+        ["react developer"],
+    ]
+    resume = {"roles": ["Backend Developer", "Python Developer"]}
+
+    def uncached(roles):
+        _role_expansion.cache_clear()
+        _expand.cache_clear()
+        return expand_roles(roles, resume)
+
+    for label, run in (("cold", uncached), ("memoized", lambda roles: expand_roles(roles, resume))):
+        started = time.perf_counter()
+        for i in range(repeat):
+            run(cases[i % len(cases)])
+        per_call_us = (time.perf_counter() - started) / repeat * 1e6
+        print(f"expand_roles ({label}): {per_call_us:.2f} µs/call")
+    print(f"Role graph: {len(ROLE_GRAPH)} keys, {sum(len(v) for v in ROLE_GRAPH.values())} edges")
+    print(f"Cache: {cache_info()}")
+
+
+if __name__ == "__main__":
+    _benchmark()
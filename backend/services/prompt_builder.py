@@ -0,0 +1,343 @@
+"""
+Gemini Prompt Builder for Tackleit v2.5
+
+Packs the pre-filtered jobs into the recommendation prompt against an explicit
+token budget (PROMPT_TOKEN_BUDGET):
+- compact JSON rows: short keys, no indentation
+- short job ids ("j1", "j2", ...) instead of URLs; the model answers with ids
+  and resolve_recommendations maps them back to title / company / location / URL
+- descriptions cut just short enough for the prompt to fit, and the
+  lowest-ranked jobs dropped only if even rows without descriptions don't
+
+Also builds the stage-1 prompt of the optional two-stage mode (GEMINI_TWO_STAGE):
+a cheaper model shortlists the most promising jobs from title / company /
+location alone, and only the shortlist goes to the main model with descriptions.
+"""
+
+import os
+import re
+import json
+from dotenv import load_dotenv
+
+from services.job_text import PROMPT_DESCRIPTION_CHARS, prompt_snippet
+
+load_dotenv()
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "8000"))
+# Rough size of a Gemini token for English text and JSON (avoids a count_tokens round trip)
+CHARS_PER_TOKEN = 4
+# Never squeeze the job list below this, whatever the rest of the prompt costs
+MIN_JOBS_TOKEN_BUDGET = 1000
+
+GEMINI_TWO_STAGE = os.getenv("GEMINI_TWO_STAGE", "false").lower() in ("1", "true", "yes")
+GEMINI_SHORTLIST_MODEL = os.getenv("GEMINI_SHORTLIST_MODEL", "gemini-flash-lite-latest")
+GEMINI_SHORTLIST_SIZE = int(os.getenv("GEMINI_SHORTLIST_SIZE", "40"))
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def assign_job_ids(jobs: list) -> dict:
+    """Short prompt ids for jobs, in their (pre-filter ranked) order."""
+    return {f"j{i + 1}": job for i, job in enumerate(jobs)}
+
+
+def _job_row(job_id: str, job: dict, description: str = None) -> dict:
+    row = {
+        "id": job_id,
+        "t": job.get("title"),
+        "c": str(job.get("company", "")),
+        "l": job.get("location"),
+        "p": job.get("_prefilter_score", 0),
+    }
+    if description:
+        row["d"] = description
+    return row
+
+
+def _dumps(rows: list) -> str:
+    return json.dumps(rows, separators=(",", ":"), ensure_ascii=False)
+
+
+def pack_jobs(jobs_by_id: dict, budget_tokens: int) -> tuple:
+    """
+    Serialize jobs as compact rows within budget_tokens.
+
+    Returns:
+        tuple of (jobs JSON, ids that made it in, description characters kept per job)
+    """
+    ids = list(jobs_by_id)
+    # Snippets are the first PROMPT_DESCRIPTION_CHARS characters followed by "..."
+    descriptions = {job_id: (prompt_snippet(job) or "").removesuffix("...") for job_id, job in jobs_by_id.items()}
+
+    def render(count: int, chars: int) -> str:
+        rows = []
+        for job_id in ids[:count]:
+            text = descriptions[job_id][:chars]
+            rows.append(_job_row(job_id, jobs_by_id[job_id], text + "..." if text else None))
+        return _dumps(rows)
+
+    def fits(count: int, chars: int) -> bool:
+        return estimate_tokens(render(count, chars)) <= budget_tokens
+
+    # Drop the lowest-ranked jobs only if rows without descriptions can't all fit
+    count = len(ids)
+    if not fits(count, 0):
+        low, high = 1, count
+        while low < high:
+            mid = (low + high + 1) // 2
+            if fits(mid, 0):
+                low = mid
+            else:
+                high = mid - 1
+        count = low
+
+    # Longest description cut that still fits
+    low, high = 0, PROMPT_DESCRIPTION_CHARS
+    while low < high:
+        mid = (low + high + 1) // 2
+        if fits(count, mid):
+            low = mid
+        else:
+            high = mid - 1
+
+    return render(count, low), ids[:count], low
+
+
+def build_ranking_prompt(user_profile: str, jobs_by_id: dict, pool_size: int) -> tuple:
+    """
+    Build the main recommendation prompt.
+
+    Args:
+        user_profile: User profile string with preferences and resume data
+        jobs_by_id: Pre-filtered jobs keyed by assign_job_ids ids
+        pool_size: Size of the pre-filtered pool (sets how many picks to ask for)
+
+    Returns:
+        tuple of (prompt, jobs_by_id limited to the jobs in the prompt, packing stats dict)
+    """
+    # Calculate job counts based on available pool
+    # For 100 pre-filtered jobs, aim for 10-20 recommendations
+    min_jobs = min(10, max(8, pool_size // 10))
+    max_jobs = min(20, pool_size // 5)
+
+    def render(jobs_json: str, job_count: int) -> str:
+        return f"""You are a job-matching expert. Your task is to SELECT THE BEST matching jobs from this PRE-FILTERED pool.
+
+IMPORTANT: These {job_count} jobs have ALREADY been filtered for basic relevance (location, role, tech stack).
+Your job is to RANK and SELECT the TOP {min_jobs}-{max_jobs} best matches.
+
+# CANDIDATE PROFILE
+{user_profile}
+
+# PRE-FILTERED JOBS (Already filtered for relevance)
+Compact JSON, one object per job: id = job id, t = title, c = company, l = location,
+d = description excerpt, p = prefilter relevance score (higher = better initial match)
+{jobs_json}
+
+# YOUR SCORING RULES (0-100)
+Use this scoring to rank and select the best jobs:
+- Role/Title alignment: +35 pts (exact role match or very similar)
+- Skills overlap: +30 pts (multiple tech stack skills mentioned)
+- Location match: +20 pts (city match or Remote if user wants remote)
+- Experience alignment: +10 pts (seniority level matches)
+- Job type match: +5 pts (Full-time, Internship, etc.)
+
+# OUTPUT REQUIREMENTS
+1. MUST return between {min_jobs} and {max_jobs} jobs as a JSON array
+2. Select jobs with highest combined score (your score + p)
+3. Prefer variety: Maximum 2 jobs from the same company
+4. Sort by match_score descending
+5. For each job, provide a specific reason why it matches (mention skills, role, location)
+6. Identify each job ONLY by its exact "id" from the list
+
+# TIPS FOR SELECTION
+- All these jobs are already somewhat relevant - focus on the BEST fits
+- Higher p generally means better match
+- Give preference to jobs where the title closely matches candidate's desired role
+- If candidate is a Fresher, prioritize entry-level and internship roles
+
+Return ONLY a valid JSON array. No markdown, no backticks, no explanation text.
+
+[
+  {{
+    "id": "j1",
+    "match_score": 85,
+    "reason": "Specific reason: role matches, tech stack includes X/Y/Z, location preferred"
+  }}
+]
+"""
+
+    overhead = estimate_tokens(render("", len(jobs_by_id)))
+    jobs_budget = max(PROMPT_TOKEN_BUDGET - overhead, MIN_JOBS_TOKEN_BUDGET)
+    jobs_json, packed_ids, description_chars = pack_jobs(jobs_by_id, jobs_budget)
+
+    prompt = render(jobs_json, len(packed_ids))
+    stats = {
+        "picks_requested": max_jobs,
+        "jobs_offered": len(jobs_by_id),
+        "jobs_packed": len(packed_ids),
+        "description_chars": description_chars,
+        "prompt_chars": len(prompt),
+        "estimated_tokens": estimate_tokens(prompt),
+    }
+    return prompt, {job_id: jobs_by_id[job_id] for job_id in packed_ids}, stats
+
+
+def build_shortlist_prompt(user_profile: str, jobs_by_id: dict, shortlist_size: int) -> str:
+    """Stage-1 prompt: pick the most promising ids without reading descriptions."""
+    jobs_json = _dumps([_job_row(job_id, job) for job_id, job in jobs_by_id.items()])
+    return f"""You are a job-matching expert. Shortlist the {shortlist_size} jobs that best fit this candidate.
+
+# CANDIDATE PROFILE
+{user_profile}
+
+# JOBS
+Compact JSON, one object per job: id = job id, t = title, c = company, l = location,
+p = prefilter relevance score (higher = better initial match)
+{jobs_json}
+
+Judge role/title fit first, then location and seniority. Prefer variety across companies.
+Return ONLY a JSON array of the {shortlist_size} chosen ids, best first, e.g. ["j4", "j1"]. No other text.
+"""
+
+
+def select_shortlist(chosen_ids: list, jobs_by_id: dict, shortlist_size: int) -> dict:
+    """
+    Jobs picked by the stage-1 model, topped up from the pre-filter ranking if it
+    returned too few valid ids. Kept in pre-filter order, under their original ids.
+    """
+    selected = []
+    for job_id in chosen_ids:
+        job_id = str(job_id).strip()
+        if job_id in jobs_by_id and job_id not in selected:
+            selected.append(job_id)
+    selected = set(selected[:shortlist_size])
+    for job_id in jobs_by_id:
+        if len(selected) >= shortlist_size:
+            break
+        selected.add(job_id)
+    return {job_id: job for job_id, job in jobs_by_id.items() if job_id in selected}
+
+
+def parse_json_array(raw_text: str) -> list:
+    """Parse the model's JSON array, tolerating markdown fences and truncated output."""
+    raw_text = raw_text.strip()
+    if raw_text.startswith("```"):
+        parts = raw_text.split("```")
+        cleaned_response_text = parts[1].lstrip("json").strip() if len(parts) >= 2 else raw_text
+    else:
+        cleaned_response_text = raw_text
+
+    try:
+        return json.loads(cleaned_response_text)
+    except json.JSONDecodeError:
+        json_objects_str = re.findall(r'\{[^{}]*\}', cleaned_response_text)
+        if json_objects_str:
+            return [json.loads(s) for s in json_objects_str]
+        raise ValueError("Failed to parse or repair JSON response from AI.")
+
+
+def resolve_recommendation(item, jobs_by_id: dict):
+    """
+    RecommendedJob fields for one of the model's {"id", "match_score", "reason"}
+    picks, taken from the job data. Items that spell out the job fields
+    themselves are passed through unchanged; anything else gives None.
+    """
+    if not isinstance(item, dict):
+        return None
+    job = jobs_by_id.get(str(item.get("id", "")).strip())
+    if job is None:
+        return item if item.get("title") else None
+    return {
+        "title": job.get("title") or "",
+        "company": str(job.get("company", "")),
+        "location": job.get("location") or "",
+        "match_score": item.get("match_score"),
+        "reason": item.get("reason"),
+        "job_url": job.get("job_url"),
+    }
+
+
+def resolve_recommendations(items: list, jobs_by_id: dict) -> list:
+    """resolve_recommendation over a whole response, dropping repeated ids."""
+    resolved = []
+    seen = set()
+    for item in items:
+        data = resolve_recommendation(item, jobs_by_id)
+        if data is None:
+            continue
+        job_id = str(item.get("id", "")).strip()
+        if job_id in jobs_by_id:
+            if job_id in seen:
+                continue
+            seen.add(job_id)
+        resolved.append(data)
+    return resolved
+
+
+class JsonArrayStream:
+    """
+    Incremental parser for a streamed top-level JSON array of objects/strings.
+
+    feed() returns the elements completed by each chunk, so they can be used
+    before the response finishes; an element cut off by a truncated response
+    is never returned. Text before the opening "[" (e.g. a markdown fence)
+    is skipped.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0  # 1 inside the top-level array
+        self._in_string = False
+        self._escaped = False
+        self._item_start = None
+        self.done = False
+
+    def feed(self, text: str) -> list:
+        self._buffer += text
+        buffer = self._buffer
+        items = []
+        i = self._pos
+        while i < len(buffer) and not self.done:
+            ch = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._item_start is not None:
+                        items.append(buffer[self._item_start:i + 1])
+                        self._item_start = None
+            elif self._depth == 0:
+                if ch == "[":
+                    self._depth = 1
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._item_start = i
+            elif ch in "{[":
+                if self._depth == 1:
+                    self._item_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._item_start is not None:
+                    items.append(buffer[self._item_start:i + 1])
+                    self._item_start = None
+                elif self._depth == 0:
+                    self.done = True
+            i += 1
+        self._pos = i
+
+        parsed = []
+        for item in items:
+            try:
+                parsed.append(json.loads(item))
+            except json.JSONDecodeError:
+                continue
+        return parsed
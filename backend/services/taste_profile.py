@@ -23,6 +23,21 @@ async def build_taste_profile(user_id: str) -> str:
     """
     Build a user's taste profile from their interaction history.
     
+    Args:
+        user_id: The user's ID string
+        
+    Returns:
+        A formatted string (10-15 lines) summarizing learned preferences,
+        ready to inject into the Gemini prompt. Returns empty string if
+        insufficient data.
+    """
+    return format_taste_profile(await load_taste_signals(user_id))
+
+
+async def load_taste_signals(user_id: str) -> dict:
+    """
+    Aggregate a user's interaction history into taste signals.
+    
     Analyzes:
     - Thumbs up/down feedback on job cards
     - Jobs saved vs ignored
@@ -34,8 +49,8 @@ async def build_taste_profile(user_id: str) -> str:
         user_id: The user's ID string
         
     Returns:
-        A formatted string (10-15 lines) summarizing learned preferences,
-        ready to inject into the Gemini prompt. Returns empty string if
+        Dict of signal counts (see below), shared by the Gemini prompt
+        (format_taste_profile) and the local ranker. Empty dict if
         insufficient data.
     """
     # Gather all feedback for this user
@@ -43,7 +58,7 @@ async def build_taste_profile(user_id: str) -> str:
     feedback_records = await feedback_cursor.to_list(length=500)
     
     if not feedback_records:
-        return ""
+        return {}
     
     # Get user's job applications for save/apply patterns
     try:
@@ -73,18 +88,40 @@ async def build_taste_profile(user_id: str) -> str:
     # Minimum data threshold - need at least 3 signals to be meaningful
     total_signals = len(liked_jobs) + len(disliked_jobs) + len(saved_jobs) + len(applied_jobs)
     if total_signals < 3:
+        return {}
+    
+    return {
+        "liked_count": len(liked_jobs),
+        "disliked_count": len(disliked_jobs),
+        "saved_count": len(saved_jobs),
+        "applied_count": len(applied_jobs),
+        "positive_companies": _merge_counts(
+            _extract_field(liked_jobs, "company"),
+            _extract_field_from_apps(saved_jobs, "company"),
+            _extract_field_from_apps(applied_jobs, "company"),
+        ),
+        "disliked_companies": _extract_field(disliked_jobs, "company"),
+        # Common keywords from liked/disliked titles
+        "liked_keywords": _extract_title_keywords(liked_jobs),
+        "disliked_keywords": _extract_title_keywords(disliked_jobs),
+        "positive_locations": _merge_counts(
+            _extract_field(liked_jobs, "location"),
+            _extract_field_from_apps(saved_jobs, "location"),
+        ),
+    }
+
+
+def format_taste_profile(signals: dict) -> str:
+    """Summarize load_taste_signals output for the Gemini prompt ("" if there's nothing meaningful)."""
+    if not signals:
         return ""
     
     # --- Extract Patterns ---
     profile_lines = ["LEARNED PREFERENCES (from your activity):"]
     
     # Company preferences
-    liked_companies = _extract_field(liked_jobs, "company")
-    disliked_companies = _extract_field(disliked_jobs, "company")
-    saved_companies = _extract_field_from_apps(saved_jobs, "company")
-    applied_companies = _extract_field_from_apps(applied_jobs, "company")
-    
-    positive_companies = _merge_counts(liked_companies, saved_companies, applied_companies)
+    positive_companies = signals["positive_companies"]
+    disliked_companies = signals["disliked_companies"]
     
     if positive_companies:
         top_positive = sorted(positive_companies.items(), key=lambda x: x[1], reverse=True)[:3]
@@ -98,13 +135,9 @@ async def build_taste_profile(user_id: str) -> str:
             f"- Avoided companies: {', '.join(f'{c} ({n}x)' for c, n in top_negative)}"
         )
     
-    # Role/title patterns  
-    liked_titles = _extract_field(liked_jobs, "title")
-    disliked_titles = _extract_field(disliked_jobs, "title")
-    
-    # Extract common keywords from liked/disliked titles
-    liked_keywords = _extract_title_keywords(liked_jobs)
-    disliked_keywords = _extract_title_keywords(disliked_jobs)
+    # Role/title patterns
+    liked_keywords = signals["liked_keywords"]
+    disliked_keywords = signals["disliked_keywords"]
     
     if liked_keywords:
         top_liked_kw = sorted(liked_keywords.items(), key=lambda x: x[1], reverse=True)[:5]
@@ -119,9 +152,7 @@ async def build_taste_profile(user_id: str) -> str:
         )
     
     # Location patterns
-    liked_locations = _extract_field(liked_jobs, "location")
-    saved_locations = _extract_field_from_apps(saved_jobs, "location")
-    positive_locations = _merge_counts(liked_locations, saved_locations)
+    positive_locations = signals["positive_locations"]
     
     if positive_locations:
         top_locations = sorted(positive_locations.items(), key=lambda x: x[1], reverse=True)[:3]
@@ -134,18 +165,20 @@ async def build_taste_profile(user_id: str) -> str:
             profile_lines.append(f"- Prefers on-site roles in: {', '.join(f'{l}' for l, _ in top_locations[:2])}")
     
     # Save vs ignore ratio
-    if len(saved_jobs) + len(applied_jobs) > 0:
+    saved_count, applied_count = signals["saved_count"], signals["applied_count"]
+    if saved_count + applied_count > 0:
         action_summary = []
-        if applied_jobs:
-            action_summary.append(f"applied to {len(applied_jobs)}")
-        if saved_jobs:
-            action_summary.append(f"saved {len(saved_jobs)}")
+        if applied_count:
+            action_summary.append(f"applied to {applied_count}")
+        if saved_count:
+            action_summary.append(f"saved {saved_count}")
         profile_lines.append(f"- Action pattern: {', '.join(action_summary)} jobs")
     
     # Summary stats
-    if liked_jobs or disliked_jobs:
+    liked_count, disliked_count = signals["liked_count"], signals["disliked_count"]
+    if liked_count or disliked_count:
         profile_lines.append(
-            f"- Feedback signals: {len(liked_jobs)} liked, {len(disliked_jobs)} disliked"
+            f"- Feedback signals: {liked_count} liked, {disliked_count} disliked"
         )
     
     # Only return if we have meaningful insights (at least 2 pattern lines beyond the header)
@@ -0,0 +1,12 @@
+"""
+Test setup for the backend services.
+
+Run from backend/:
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from routes.jobs import LIST_ORDERS, _after_cursor, _encode_cursor
+
+
+def test_id_cursor_round_trip():
+    job = {"_id": ObjectId(), "date_scraped": datetime(2025, 3, 1, 12, 30)}
+    assert _after_cursor(_encode_cursor(job, "_id"), "_id") == {"_id": {"$gt": job["_id"]}}
+
+
+def test_date_cursor_round_trip():
+    scraped = datetime(2025, 3, 1, 12, 30, 15, 250000)
+    job = {"_id": ObjectId(), "date_scraped": scraped}
+    assert _after_cursor(_encode_cursor(job, "date_scraped"), "date_scraped") == {"$or": [
+        {"date_scraped": {"$lt": scraped}},
+        {"date_scraped": scraped, "_id": {"$lt": job["_id"]}},
+        {"date_scraped": None},
+    ]}
+
+
+@pytest.mark.parametrize("job", [{"date_scraped": None}, {}])
+def test_date_cursor_round_trip_without_date_scraped(job):
+    job = {"_id": ObjectId(), **job}
+    cursor = _encode_cursor(job, "date_scraped")
+    assert _after_cursor(cursor, "date_scraped") == {"date_scraped": None, "_id": {"$lt": job["_id"]}}
+
+
+def test_cursor_is_url_safe():
+    job = {"_id": ObjectId(), "date_scraped": datetime(2025, 3, 1)}
+    for order in LIST_ORDERS:
+        cursor = _encode_cursor(job, order)
+        assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+@pytest.mark.parametrize("cursor", ["", "zz", "bm90IGpzb24", "eyJpZCI6ICJub3BlIn0"])
+def test_invalid_cursor_is_rejected(cursor):
+    for order in LIST_ORDERS:
+        with pytest.raises(HTTPException) as error:
+            _after_cursor(cursor, order)
+        assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("order", list(LIST_ORDERS))
+def test_paging_visits_every_job_once(order):
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient()["jobfinder"]["jobs"]
+    start = datetime(2025, 1, 1)
+    jobs = []
+    for i in range(60):
+        job = {"_id": ObjectId(), "title": f"Job {i}"}
+        if i % 7 == 3:
+            pass  # never scraped with a date
+        elif i % 11 == 5:
+            job["date_scraped"] = None
+        else:
+            # Several jobs share a timestamp, so ties are broken by _id
+            job["date_scraped"] = start + timedelta(hours=i // 4)
+        jobs.append(job)
+    collection.insert_many(jobs)
+
+    sort_field, direction = LIST_ORDERS[order]
+    sort = [(sort_field, direction)] + ([("_id", direction)] if sort_field != "_id" else [])
+    expected = [job["_id"] for job in collection.find({}, sort=sort)]
+
+    seen = []
+    query = {}
+    while True:
+        page = list(collection.find(query, sort=sort, limit=8))
+        seen += [job["_id"] for job in page]
+        if len(page) < 8:
+            break
+        query = _after_cursor(_encode_cursor(page[-1], order), order)
+    assert seen == expected
+    assert len(set(seen)) == len(jobs)
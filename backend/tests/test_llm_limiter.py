@@ -0,0 +1,204 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services import llm_limiter as limiter_module
+from services.llm_limiter import LLMLimiter, PRIORITY_FREE, PRIORITY_PRO
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _hold(limiter, name, admitted, release, priority=PRIORITY_FREE):
+    async with limiter.slot(priority):
+        admitted.append(name)
+        await release.wait()
+
+
+def test_waiters_are_admitted_pro_first_then_fifo():
+    async def scenario():
+        limiter = LLMLimiter(max_concurrency=1, requests_per_minute=6000)
+        admitted = []
+        release = {name: asyncio.Event() for name in ("busy", "free1", "free2", "pro1", "pro2")}
+        tasks = [asyncio.create_task(_hold(limiter, "busy", admitted, release["busy"]))]
+        await asyncio.sleep(0)
+        for name, priority in (("free1", PRIORITY_FREE), ("pro1", PRIORITY_PRO),
+                               ("free2", PRIORITY_FREE), ("pro2", PRIORITY_PRO)):
+            tasks.append(asyncio.create_task(_hold(limiter, name, admitted, release[name], priority)))
+            await asyncio.sleep(0)
+        assert limiter.stats()["waiting"] == 4
+        assert limiter.stats()["waiting_pro"] == 2
+
+        # Release whoever holds the slot, one at a time
+        while len(admitted) < len(release):
+            release[admitted[-1]].set()
+            await asyncio.sleep(0.01)
+        release[admitted[-1]].set()
+        await asyncio.gather(*tasks)
+        return admitted, limiter
+
+    admitted, limiter = _run(scenario())
+    assert admitted == ["busy", "pro1", "pro2", "free1", "free2"]
+    assert limiter.active == 0
+    assert limiter.admitted_total == 5
+
+
+def test_concurrency_is_capped():
+    async def scenario():
+        limiter = LLMLimiter(max_concurrency=2, requests_per_minute=6000)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.active)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        return peak, limiter
+
+    peak, limiter = _run(scenario())
+    assert peak == 2
+    assert limiter.active == 0
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        limiter = LLMLimiter(max_concurrency=1, requests_per_minute=6000)
+        admitted = []
+        release = asyncio.Event()
+        busy = asyncio.create_task(_hold(limiter, "busy", admitted, release))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(_hold(limiter, "cancelled", admitted, release, PRIORITY_PRO))
+        waiting = asyncio.create_task(_hold(limiter, "waiting", admitted, release))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        release.set()
+        await asyncio.gather(busy, waiting)
+        return admitted, limiter
+
+    admitted, limiter = _run(scenario())
+    assert admitted == ["busy", "waiting"]
+    assert limiter.active == 0
+
+
+@pytest.fixture
+def short_backoff(monkeypatch):
+    monkeypatch.setattr(limiter_module, "LLM_BACKOFF_INITIAL_SECONDS", 0.05)
+    monkeypatch.setattr(limiter_module, "LLM_BACKOFF_MAX_SECONDS", 0.2)
+
+
+def test_rate_limit_backoff_doubles_up_to_the_cap_and_shrinks_on_success(short_backoff):
+    limiter = LLMLimiter(max_concurrency=4, requests_per_minute=6000)
+    backoffs = []
+    for _ in range(4):
+        limiter.report_rate_limited()
+        backoffs.append(limiter._backoff)
+    assert backoffs == [0.05, 0.1, 0.2, 0.2]
+    assert limiter.rate_limited_total == 4
+    assert limiter.tokens == 0
+
+    limiter.report_success()
+    assert limiter._backoff == 0.1
+    limiter.report_success()
+    limiter.report_success()
+    assert limiter._backoff == 0.0
+
+
+def test_rate_limit_pauses_admissions(short_backoff):
+    async def scenario():
+        limiter = LLMLimiter(max_concurrency=4, requests_per_minute=6000)
+        limiter.report_rate_limited()
+        started = time.monotonic()
+        async with limiter.slot() as queue_wait_ms:
+            waited = time.monotonic() - started
+        return waited, queue_wait_ms
+
+    waited, queue_wait_ms = _run(scenario())
+    assert waited >= 0.05
+    assert queue_wait_ms >= 50
+
+
+def test_token_bucket_spaces_out_calls_beyond_the_burst():
+    async def scenario():
+        # Burst of 2, then one call every 50 ms
+        limiter = LLMLimiter(max_concurrency=2, requests_per_minute=1200)
+        admitted_at = []
+        started = time.monotonic()
+
+        async def call():
+            async with limiter.slot():
+                admitted_at.append(time.monotonic() - started)
+
+        await asyncio.gather(*(call() for _ in range(4)))
+        return sorted(admitted_at)
+
+    admitted_at = _run(scenario())
+    assert admitted_at[1] < 0.03
+    assert admitted_at[2] >= 0.04
+    assert admitted_at[3] >= 0.09
+
+
+def test_thread_call_keeps_its_slot_after_the_caller_gives_up():
+    async def scenario():
+        limiter = LLMLimiter(max_concurrency=1, requests_per_minute=6000)
+
+        async def call():
+            async with limiter.slot():
+                return await limiter.to_thread(time.sleep, 0.2)
+
+        # Like the local ranker hedge: stop waiting for a call that is still running
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(call(), 0.05)
+        assert limiter.active == 1
+
+        started = time.monotonic()
+        async with limiter.slot():
+            waited = time.monotonic() - started
+        return waited, limiter
+
+    waited, limiter = _run(scenario())
+    assert waited >= 0.1
+    assert limiter.active == 0
+
+
+def test_thread_call_errors_reach_the_caller_and_free_the_slot():
+    async def scenario():
+        limiter = LLMLimiter(max_concurrency=1, requests_per_minute=6000)
+        async with limiter.slot():
+            with pytest.raises(ZeroDivisionError):
+                await limiter.to_thread(lambda: 1 / 0)
+        return limiter
+
+    assert _run(scenario()).active == 0
+
+
+def test_thread_calls_use_the_full_concurrency():
+    async def scenario():
+        limiter = LLMLimiter(max_concurrency=4, requests_per_minute=6000)
+        running = peak = 0
+        lock = threading.Lock()
+
+        def work():
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+
+        async def call():
+            async with limiter.slot():
+                await limiter.to_thread(work)
+                assert limiter.active <= limiter.max_concurrency
+
+        await asyncio.gather(*(call() for _ in range(8)))
+        return peak, limiter
+
+    peak, limiter = _run(scenario())
+    assert peak == 4
+    assert limiter.active == 0
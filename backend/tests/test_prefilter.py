@@ -0,0 +1,186 @@
+import copy
+import random
+
+import pytest
+
+from services import job_features
+from services.matching import CITY_ALIASES, JOB_TYPE_KEYWORDS, ROLE_SYNONYMS
+from services.prefilter import PREFILTER_LIMIT, StreamingPreFilter, pre_filter_jobs
+
+
+def _nested_loop_pre_filter(jobs, prefs, resume, limit=PREFILTER_LIMIT):
+    """The per-job loop pre_filter_jobs replaced, kept as the reference for its results."""
+    preferred_locations = [loc.lower().strip() for loc in prefs.get("location", [])]
+    preferred_roles = [role.lower().strip() for role in prefs.get("role", [])]
+    tech_stack = [tech.lower().strip() for tech in prefs.get("tech_stack", [])]
+    exclude_keywords = [kw.lower().strip() for kw in prefs.get("exclude_keywords", [])]
+    must_have_keywords = [kw.lower().strip() for kw in prefs.get("must_have_keywords", [])]
+    job_types = [jt.lower().strip() for jt in prefs.get("job_type", [])]
+    work_arrangements = [wa.lower().strip() for wa in prefs.get("work_arrangement", [])]
+    experience_level = prefs.get("experience_level", "").lower().strip()
+    role_type = prefs.get("role_type", "").lower().strip()
+    primary_skills, secondary_skills = tech_stack[:5], tech_stack[5:]
+
+    expanded_roles = set()
+    for role in preferred_roles:
+        expanded_roles.add(role)
+        for key, synonyms in ROLE_SYNONYMS.items():
+            if role in key or key in role:
+                expanded_roles.update(synonyms)
+    expanded_roles = list(expanded_roles)
+    for r in (resume or {}).get("roles", []):
+        expanded_roles.append(r.lower().strip())
+        expanded_roles.extend(ROLE_SYNONYMS.get(r.lower().strip(), []))
+
+    user_wants_remote = any("remote" in loc for loc in preferred_locations + work_arrangements)
+    is_fresher, is_senior, is_mid_level = job_features.user_seniority(prefs)
+    user_max_years = job_features.USER_MAX_EXPERIENCE_YEARS.get(
+        experience_level, job_features.DEFAULT_USER_MAX_EXPERIENCE_YEARS
+    )
+
+    filtered = []
+    for job in jobs:
+        title = (job.get("title") or "").lower()
+        location = (job.get("location") or "").lower()
+        description = (job.get("description") or "").lower()
+        full_text = f"{title} {description}"
+
+        # Tier 1: hard filters
+        if any(kw in title or kw in description for kw in exclude_keywords):
+            continue
+        is_senior_job = any(kw in title for kw in job_features.SENIOR_TITLE_KEYWORDS)
+        is_entry_job = any(kw in title for kw in job_features.ENTRY_TITLE_KEYWORDS)
+        is_management_job = any(kw in title for kw in job_features.MANAGEMENT_TITLE_KEYWORDS)
+        if is_fresher and is_senior_job:
+            continue
+        if is_senior and is_entry_job and not is_senior_job:
+            continue
+        job_min_years = job.get("experience_min_years")
+        if job_min_years is not None and job_min_years > user_max_years + job_features.EXPERIENCE_TOLERANCE_YEARS:
+            continue
+        if "individual contributor" in role_type and is_management_job:
+            continue
+        if "management" in role_type and not is_management_job:
+            continue
+        if must_have_keywords and not any(kw in title or kw in description for kw in must_have_keywords):
+            continue
+
+        # Tier 2: relevance
+        score = 0
+        relevance_matched = False
+        is_remote_job = any(kw in location for kw in job_features.REMOTE_KEYWORDS)
+        if user_wants_remote and is_remote_job:
+            score += 5
+            relevance_matched = True
+        elif preferred_locations:
+            for loc in preferred_locations:
+                city = loc.replace("remote", "").replace("(", "").replace(")", "").replace("india", "").replace("global", "").strip()
+                if city and any(alias in location for alias in CITY_ALIASES.get(city, [city])):
+                    score += 5
+                    relevance_matched = True
+                    break
+        role_match_score = 0
+        for role in expanded_roles:
+            if role in title:
+                role_match_score = max(role_match_score, 5)
+                relevance_matched = True
+            elif any(word in title for word in role.split()):
+                role_match_score = max(role_match_score, 3)
+                relevance_matched = True
+        score += role_match_score
+        primary_matches = sum(1 for tech in primary_skills if tech in full_text)
+        secondary_matches = sum(1 for tech in secondary_skills if tech in full_text)
+        if primary_matches >= 2 or (primary_matches >= 1 and secondary_matches >= 2):
+            relevance_matched = True
+        score += min(primary_matches * 3 + secondary_matches, 15)
+        if not relevance_matched:
+            continue
+
+        # Tier 3: quality scoring
+        for jt in job_types:
+            if any(kw in full_text for kw in JOB_TYPE_KEYWORDS.get(jt, [jt])):
+                score += 2
+                break
+        if work_arrangements:
+            if "remote" in work_arrangements and is_remote_job:
+                score += 2
+            elif "hybrid" in work_arrangements and "hybrid" in full_text:
+                score += 2
+            elif any(x in work_arrangements for x in ["on-site", "onsite"]) and not is_remote_job:
+                score += 2
+        if (is_fresher and is_entry_job) or (is_senior and is_senior_job) or \
+                (is_mid_level and not is_entry_job and not is_senior_job):
+            score += 3
+
+        filtered.append((score, job))
+
+    filtered.sort(key=lambda item: item[0], reverse=True)
+    return [(job["_id"], score) for score, job in filtered[:limit]]
+
+
+TITLE_WORDS = ["senior", "junior", "lead", "intern", "staff", "manager", "principal", "associate", "head of"]
+DESCRIPTION_WORDS = ("react python java aws sql go kubernetes remote hybrid full-time contract internship "
+                     "permanent freelance trainee microservices spark docker startup fintech").split()
+LOCATIONS = ["Bangalore", "Bengaluru, India", "Remote", "Remote (India)", "Delhi NCR", "Gurugram", "Pune",
+             "Hyderabad, India", "Mumbai", "Chennai", "Work from home", None]
+ROLES = list(ROLE_SYNONYMS) + ["react developer", "developer", "sre", "designer", "engineer"]
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = random.Random(11)
+    jobs = []
+    for i in range(400):
+        title = " ".join(rng.sample(TITLE_WORDS, rng.randint(0, 1)) + [rng.choice(ROLES).title()])
+        jobs.append({
+            "_id": i,
+            "title": title if i % 50 else None,
+            "description": " ".join(rng.choices(DESCRIPTION_WORDS, k=rng.randint(0, 25))),
+            "location": rng.choice(LOCATIONS),
+            "experience_min_years": rng.choice([None, 0, 1, 2, 4, 6, 10]),
+        })
+    return jobs
+
+
+PREFERENCES = [
+    {},
+    {"role": ["Software Engineer"], "location": ["Bangalore"], "tech_stack": ["python", "aws"]},
+    {"role": ["Frontend Developer", "Fullstack Developer"], "location": ["Remote (India)", "Pune"],
+     "tech_stack": ["react", "java", "sql", "go", "docker", "spark", "kubernetes"], "experience_level": "3-5 years",
+     "job_type": ["full-time"], "work_arrangement": ["hybrid"]},
+    {"role": ["Data Scientist"], "location": ["Delhi NCR"], "experience_level": "Fresher",
+     "job_type": ["internship"], "work_arrangement": ["remote"], "exclude_keywords": ["startup"]},
+    {"role": ["DevOps Engineer"], "location": ["Hyderabad"], "experience_level": "10+ years",
+     "role_type": "Individual Contributor", "must_have_keywords": ["kubernetes", "docker"],
+     "work_arrangement": ["onsite"]},
+    {"role": ["Project Manager"], "location": ["Mumbai", "Chennai"], "role_type": "Management",
+     "tech_stack": ["sql"], "job_type": ["contract", "part-time"]},
+]
+RESUMES = [None, {"roles": ["Backend Developer", "Python Developer"]}]
+
+
+@pytest.mark.parametrize("resume", RESUMES)
+@pytest.mark.parametrize("prefs", PREFERENCES)
+def test_pre_filter_jobs_matches_nested_loop(corpus, prefs, resume):
+    expected = _nested_loop_pre_filter(copy.deepcopy(corpus), prefs, resume)
+    result = pre_filter_jobs(copy.deepcopy(corpus), prefs, resume)
+    assert [(job["_id"], job["_prefilter_score"]) for job in result] == expected
+    assert all(job["_relevance_matched"] for job in result)
+
+
+@pytest.mark.parametrize("limit", [PREFILTER_LIMIT, 7])
+@pytest.mark.parametrize("prefs", PREFERENCES)
+def test_streaming_pre_filter_matches_nested_loop(corpus, prefs, limit):
+    resume = RESUMES[1]
+    expected = _nested_loop_pre_filter(copy.deepcopy(corpus), prefs, resume, limit)
+    jobs = copy.deepcopy(corpus)
+    stream = StreamingPreFilter(prefs, resume, limit=limit, pool_size=50)
+    for start in range(0, len(jobs), 37):
+        stream.add(jobs[start:start + 37])
+    assert [(job["_id"], job["_prefilter_score"]) for job in stream.result()] == expected
+    assert stream.total == len(jobs)
+    assert [job["_id"] for job in stream.pool] == list(range(50))
+
+
+def test_pre_filter_jobs_on_empty_list():
+    assert pre_filter_jobs([], PREFERENCES[1]) == []
@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+from services.job_text import PROMPT_DESCRIPTION_CHARS
+from services.prompt_builder import JsonArrayStream, assign_job_ids, estimate_tokens, pack_jobs
+
+
+def _jobs(count: int, description_chars: int = 600) -> dict:
+    return assign_job_ids([
+        {
+            "title": f"Backend Developer {i}",
+            "company": f"Company {i}",
+            "location": "Bengaluru, India",
+            "description": ("Build and run Python services on AWS. " * 20)[:description_chars],
+            "_prefilter_score": 20 - i % 20,
+        }
+        for i in range(count)
+    ])
+
+
+# --- pack_jobs ---
+def test_pack_jobs_keeps_full_snippets_when_they_fit():
+    jobs_by_id = _jobs(5)
+    jobs_json, ids, chars = pack_jobs(jobs_by_id, budget_tokens=100_000)
+    assert ids == list(jobs_by_id)
+    assert chars == PROMPT_DESCRIPTION_CHARS
+    rows = json.loads(jobs_json)
+    assert [row["id"] for row in rows] == ids
+    assert all(row["d"].endswith("...") and len(row["d"]) == PROMPT_DESCRIPTION_CHARS + 3 for row in rows)
+
+
+@pytest.mark.parametrize("budget", [400, 700, 1000, 1500])
+def test_pack_jobs_stays_within_budget(budget):
+    jobs_json, ids, chars = pack_jobs(_jobs(20), budget_tokens=budget)
+    assert estimate_tokens(jobs_json) <= budget
+    assert len(json.loads(jobs_json)) == len(ids)
+    # The longest description cut that fits: one more character would not
+    if 0 < chars < PROMPT_DESCRIPTION_CHARS:
+        jobs_by_id = _jobs(20)
+        longer = [{**json.loads(jobs_json)[i], "d": jobs_by_id[job_id]["description"][:chars + 1] + "..."}
+                  for i, job_id in enumerate(ids)]
+        assert estimate_tokens(json.dumps(longer, separators=(",", ":"))) > budget
+
+
+def test_pack_jobs_shortens_descriptions_before_dropping_jobs():
+    jobs_by_id = _jobs(20)
+    _, ids, chars = pack_jobs(jobs_by_id, budget_tokens=1000)
+    assert ids == list(jobs_by_id)
+    assert 0 < chars < PROMPT_DESCRIPTION_CHARS
+
+
+def test_pack_jobs_drops_lowest_ranked_jobs_last():
+    jobs_by_id = _jobs(50)
+    jobs_json, ids, chars = pack_jobs(jobs_by_id, budget_tokens=300)
+    assert chars == 0
+    assert 0 < len(ids) < len(jobs_by_id)
+    assert ids == list(jobs_by_id)[:len(ids)]
+    assert all("d" not in row for row in json.loads(jobs_json))
+    assert estimate_tokens(jobs_json) <= 300
+
+
+def test_pack_jobs_without_descriptions():
+    jobs_by_id = _jobs(3, description_chars=0)
+    jobs_json, ids, _ = pack_jobs(jobs_by_id, budget_tokens=1000)
+    assert ids == list(jobs_by_id)
+    assert all("d" not in row for row in json.loads(jobs_json))
+
+
+# --- JsonArrayStream ---
+RESPONSE = [
+    {"id": "j3", "match_score": 91, "reason": "Python, \"AWS\" and {braces} [brackets]"},
+    {"id": "j1", "match_score": 84, "reason": "Back\\slash \\\"quoted\\\" path C:\\jobs\\, comma"},
+    {"id": "j7", "match_score": 70, "reason": "Unicode ✓ and a newline\nin the reason"},
+]
+
+
+def _feed_all(text: str, chunk_size: int) -> list:
+    stream = JsonArrayStream()
+    items = []
+    for start in range(0, len(text), chunk_size):
+        items.extend(stream.feed(text[start:start + chunk_size]))
+    return items
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 16, 1000])
+def test_stream_parses_split_chunks(chunk_size):
+    assert _feed_all(json.dumps(RESPONSE), chunk_size) == RESPONSE
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5])
+def test_stream_parses_escaped_characters(chunk_size):
+    text = json.dumps(RESPONSE, ensure_ascii=True)
+    assert "\\\\" in text and '\\"' in text and "\\u" in text
+    assert _feed_all(text, chunk_size) == RESPONSE
+
+
+def test_stream_yields_items_as_soon_as_they_close():
+    stream = JsonArrayStream()
+    text = json.dumps(RESPONSE)
+    # "[" plus the first object; the braces inside its reason string don't close it
+    first_end = 1 + len(json.dumps(RESPONSE[0]))
+    assert stream.feed(text[:first_end - 1]) == []
+    assert stream.feed(text[first_end - 1:first_end]) == [RESPONSE[0]]
+
+
+def test_stream_skips_markdown_fence_and_trailing_text():
+    text = "```json\n" + json.dumps(RESPONSE, indent=2) + "\n```\n[{\"id\": \"j9\"}]"
+    stream = JsonArrayStream()
+    assert _feed_all(text, 4) == RESPONSE
+    stream.feed(text)
+    assert stream.done
+
+
+def test_stream_drops_truncated_item():
+    text = json.dumps(RESPONSE)
+    cut = text.rindex('"reason"')
+    assert _feed_all(text[:cut], 3) == RESPONSE[:2]
+
+
+def test_stream_parses_string_items():
+    assert _feed_all('["j4", "j\\"1", "j2"]', 2) == ["j4", 'j"1', "j2"]
@@ -0,0 +1,37 @@
+import numpy as np
+from bson import ObjectId
+
+from services.vector_search import ID_MAP_DTYPE, _lookup_job_ids
+
+
+def _id_map(faiss_ids):
+    """Sorted id map with a fresh ObjectId per faiss_id, plus the ids by faiss_id."""
+    job_ids = {fid: ObjectId() for fid in faiss_ids}
+    id_map = np.zeros(len(faiss_ids), dtype=ID_MAP_DTYPE)
+    id_map["faiss_id"] = sorted(faiss_ids)
+    for row, fid in enumerate(sorted(faiss_ids)):
+        id_map[row]["oid"] = np.frombuffer(job_ids[fid].binary, dtype=np.uint8)
+    return id_map, job_ids
+
+
+def test_lookup_preserves_search_order():
+    id_map, job_ids = _id_map([3, 7, 10, 42])
+    assert _lookup_job_ids(id_map, [42, 3, 10]) == [job_ids[42], job_ids[3], job_ids[10]]
+
+
+def test_lookup_skips_empty_slots_and_unknown_ids():
+    id_map, job_ids = _id_map([3, 7, 10, 42])
+    # -1 pads results when fewer than k vectors match; 5 falls between known ids,
+    # 1 sorts before the first and 99 past the last
+    assert _lookup_job_ids(id_map, [-1, 7, 5, 1, 99, 42, -1]) == [job_ids[7], job_ids[42]]
+
+
+def test_lookup_with_only_missing_ids():
+    id_map, _ = _id_map([3, 7])
+    assert _lookup_job_ids(id_map, [-1, -1, 8]) == []
+    assert _lookup_job_ids(id_map, []) == []
+
+
+def test_lookup_on_empty_map():
+    id_map, _ = _id_map([])
+    assert _lookup_job_ids(id_map, [0, -1]) == []
@@ -0,0 +1,16 @@
+"""
+Recommendation generation worker.
+
+Runs queued generation tasks (see services/task_queue.py) outside the API
+process. Use with GENERATION_MODE=queue on the API; start as many workers as
+needed, each running GENERATION_WORKER_CONCURRENCY tasks at a time:
+
+    python worker.py
+"""
+
+import asyncio
+from routes.recommendations import _run_recommendation_generation
+from services.task_queue import run_worker
+
+if __name__ == "__main__":
+    asyncio.run(run_worker(_run_recommendation_generation))
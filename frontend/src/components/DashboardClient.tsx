@@ -90,6 +90,7 @@ export default function DashboardClient() {
   const router = useRouter();
   const searchParams = useSearchParams();
   const pollingIntervalRef = useRef<NodeJS.Timeout | null>(null);
+  const pollingTaskRef = useRef<string | null>(null);
   const hasShownDemoToast = useRef(false);
 
   const token = typeof window !== "undefined" ? Cookies.get("token") : null;
@@ -186,8 +187,9 @@ export default function DashboardClient() {
 
     // Cleanup polling on component unmount
     return () => {
+      pollingTaskRef.current = null;
       if (pollingIntervalRef.current) {
-        clearInterval(pollingIntervalRef.current);
+        clearTimeout(pollingIntervalRef.current);
       }
     };
   }, [plan, searchParams, router, fetchAllJobs, token]);
@@ -358,17 +360,23 @@ export default function DashboardClient() {
 
   const pollTaskStatus = useCallback((taskId: string) => {
     if (pollingIntervalRef.current) {
-      clearInterval(pollingIntervalRef.current);
+      clearTimeout(pollingIntervalRef.current);
     }
+    pollingTaskRef.current = taskId;
+    let since: string | null = null;
 
-    pollingIntervalRef.current = setInterval(async () => {
+    // Long poll: after the first answer, the server holds each request until the task changes
+    const poll = async () => {
       try {
         const { data: task } = await axios.get(`${process.env.NEXT_PUBLIC_API_URL}/recommendations/status/${taskId}`, {
           headers: { Authorization: `Bearer ${token}` },
+          params: since ? { wait: 20, since } : {},
         });
+        if (pollingTaskRef.current !== taskId) return; // superseded or unmounted
+        since = task.updated_at;
 
         if (task.status === 'complete') {
-          if (pollingIntervalRef.current) clearInterval(pollingIntervalRef.current);
+          pollingTaskRef.current = null;
           setIsGenerating(false);
           setGenerationProgress(100);
           setGenerationMessage("Done!");
@@ -386,7 +394,7 @@ export default function DashboardClient() {
 
           // Don't auto-show feedback modal - let smart triggers handle it
         } else if (task.status === 'failed') {
-          if (pollingIntervalRef.current) clearInterval(pollingIntervalRef.current);
+          pollingTaskRef.current = null;
           setIsGenerating(false);
           setGenerationProgress(0);
           setGenerationMessage("");
@@ -400,15 +408,18 @@ export default function DashboardClient() {
           if (task.message) {
              setGenerationMessage(task.message);
           }
+          pollingIntervalRef.current = setTimeout(poll, 500);
         }
       } catch (error) {
-        if (pollingIntervalRef.current) clearInterval(pollingIntervalRef.current);
+        if (pollingTaskRef.current !== taskId) return;
+        pollingTaskRef.current = null;
         setIsGenerating(false);
         setError('Failed to get task status.');
         toast.error('Could not check the status of the recommendation task.');
         console.error("Polling error:", error);
       }
-    }, 5000); // Poll every 5 seconds
+    };
+    poll();
   }, [token, fetchAllJobs]);
 
   const generateDemoRecommendations = async () => {
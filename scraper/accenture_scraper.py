@@ -3,6 +3,7 @@ import requests
 import logging
 from typing import List, Dict
 from dotenv import load_dotenv
+from job_uploader import JobUploader
 
 # Load environment variables
 load_dotenv()
@@ -80,44 +81,42 @@ def scrape_accenture():
     # Import experience extraction utility
     from experience_utils import extract_experience_from_text
 
-    for i, job in enumerate(jobs, start=1):
-        title = job.get("title", "N/A")
-        locations = job.get("location", [])
-        location_str = ", ".join(locations) if locations else "N/A"
-        
-        job_url_template = job.get("jobDetailUrl", "")
-        country_site = PAYLOAD.get('countrySite', 'in-en')
-        job_url = f"https://www.accenture.com/{country_site}/careers/jobdetails?id={job.get('requisitionId', '')}_en&title={job.get('title', '')}" if job_url_template else "Not available"
-        
-        description = job.get("jobDescriptionClean", "N/A")
-        
-        # Extract experience from description and title
-        experience_required, experience_min_years = extract_experience_from_text(description)
-        
-        # Also try from title if not found
-        if experience_min_years is None:
-            _, experience_min_years = extract_experience_from_text(title)
-            if experience_min_years is not None:
-                experience_required = f"{experience_min_years}+ years"
-
-        payload = {
-            "title": title,
-            "company": "Accenture",
-            "location": location_str,
-            "job_url": job_url,
-            "description": description,
-            "experience_required": experience_required,
-            "experience_min_years": experience_min_years
-        }
-
-        logging.info(f"[{i}] {title} at {location_str} — Exp: {experience_required} ({experience_min_years} yrs)")
-        try:
-            url = f"{BACKEND_ENDPOINT}/jobs"
-            post_resp = requests.post(url, json=payload, timeout=30)
-            post_resp.raise_for_status()
-            logging.info(f"Successfully posted job '{title}' to backend.")
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Failed posting job '{title}': {e}")
+    uploader = JobUploader(BACKEND_ENDPOINT, "Accenture")
+    try:
+        for i, job in enumerate(jobs, start=1):
+            title = job.get("title", "N/A")
+            locations = job.get("location", [])
+            location_str = ", ".join(locations) if locations else "N/A"
+
+            job_url_template = job.get("jobDetailUrl", "")
+            country_site = PAYLOAD.get('countrySite', 'in-en')
+            job_url = f"https://www.accenture.com/{country_site}/careers/jobdetails?id={job.get('requisitionId', '')}_en&title={job.get('title', '')}" if job_url_template else "Not available"
+
+            description = job.get("jobDescriptionClean", "N/A")
+
+            # Extract experience from description and title
+            experience_required, experience_min_years = extract_experience_from_text(description)
+
+            # Also try from title if not found
+            if experience_min_years is None:
+                _, experience_min_years = extract_experience_from_text(title)
+                if experience_min_years is not None:
+                    experience_required = f"{experience_min_years}+ years"
+
+            payload = {
+                "title": title,
+                "company": "Accenture",
+                "location": location_str,
+                "job_url": job_url,
+                "description": description,
+                "experience_required": experience_required,
+                "experience_min_years": experience_min_years
+            }
+
+            logging.info(f"[{i}] {title} at {location_str} — Exp: {experience_required} ({experience_min_years} yrs)")
+            uploader.add(payload)
+    finally:
+        uploader.close()
 
 if __name__ == "__main__":
     scrape_accenture()
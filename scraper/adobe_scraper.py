@@ -1,11 +1,11 @@
 import os
-import requests
 import logging
 from typing import List, Dict
 import re
 import json
 import http.client
 from dotenv import load_dotenv
+from job_uploader import JobUploader
 
 # Load environment variables
 load_dotenv()
@@ -78,49 +78,46 @@ def scrape_adobe():
     # Import experience extraction utility
     from experience_utils import extract_experience_from_text
 
-    for index, job in enumerate(job_listings, start=1):
-        title = job.get("title", "N/A")
-        location = job.get("locationsText", "N/A")
-        
-        # Construct the full job URL
-        external_path = job.get("externalPath")
-        if external_path:
-            job_url = f"https://adobe.wd5.myworkdayjobs.com/en-US/external_experienced{external_path}"
-        else:
-            job_url = "Not available"
-
-        # The description is often in a 'bulletPoints' field or similar, not a simple 'description' key.
-        # Based on typical Workday APIs, we look for 'jobDescription' or 'bulletPoints'.
-        # Since we can't inspect the live response, we'll check for common fields.
-        # The previous scraper used a 'description' field which is not standard in the response.
-        # We will attempt to get a more structured description if possible.
-        # For now, we'll use a placeholder as the full description is not available in a clean format.
-        # A better approach would be to visit job_url and scrape the description, but that's more complex.
-        description = "Full description available on the job page." # Placeholder
-        
-        # Extract experience from title (Adobe often has seniority in title like "Senior", "Staff")
-        experience_required, experience_min_years = extract_experience_from_text(title)
-
-        payload = {
-            "title": title,
-            "company": "Adobe",
-            "location": location,
-            "job_url": job_url,
-            "description": description,
-            "experience_required": experience_required,
-            "experience_min_years": experience_min_years
-        }
-
-        logging.info(f"[{index}] {title} | {location} — Exp: {experience_required} ({experience_min_years} yrs)")
-
-        # Push to backend
-        try:
-            url = f"{BACKEND_ENDPOINT}/jobs"
-            backend_response = requests.post(url, json=payload, timeout=30)
-            backend_response.raise_for_status()
-            logging.info(f"Successfully sent job '{title}' to backend.")
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Error sending job '{title}' to backend: {e}")
+    uploader = JobUploader(BACKEND_ENDPOINT, "Adobe")
+    try:
+        for index, job in enumerate(job_listings, start=1):
+            title = job.get("title", "N/A")
+            location = job.get("locationsText", "N/A")
+
+            # Construct the full job URL
+            external_path = job.get("externalPath")
+            if external_path:
+                job_url = f"https://adobe.wd5.myworkdayjobs.com/en-US/external_experienced{external_path}"
+            else:
+                job_url = "Not available"
+
+            # The description is often in a 'bulletPoints' field or similar, not a simple 'description' key.
+            # Based on typical Workday APIs, we look for 'jobDescription' or 'bulletPoints'.
+            # Since we can't inspect the live response, we'll check for common fields.
+            # The previous scraper used a 'description' field which is not standard in the response.
+            # We will attempt to get a more structured description if possible.
+            # For now, we'll use a placeholder as the full description is not available in a clean format.
+            # A better approach would be to visit job_url and scrape the description, but that's more complex.
+            description = "Full description available on the job page." # Placeholder
+
+            # Extract experience from title (Adobe often has seniority in title like "Senior", "Staff")
+            experience_required, experience_min_years = extract_experience_from_text(title)
+
+            payload = {
+                "title": title,
+                "company": "Adobe",
+                "location": location,
+                "job_url": job_url,
+                "description": description,
+                "experience_required": experience_required,
+                "experience_min_years": experience_min_years
+            }
+
+            logging.info(f"[{index}] {title} | {location} — Exp: {experience_required} ({experience_min_years} yrs)")
+
+            uploader.add(payload)
+    finally:
+        uploader.close()
 
     logging.info("Adobe scraping completed successfully.")
 
@@ -0,0 +1,66 @@
+"""
+Normalized Job Fields Backfill for Tackleit v2.5
+
+POST /jobs stores a `normalized` subdocument on every new job (lowercased
+title/description/location/company, title tokens, the prompt snippet and the
+embedding text, see backend/services/job_text.py). This script adds it to jobs
+inserted before that, or recomputes it after NORMALIZED_VERSION is bumped.
+
+Usage:
+    python scraper/backfill_job_fields.py          # jobs missing current fields
+    python scraper/backfill_job_fields.py --all    # recompute every job
+
+Environment Variables Required:
+    MONGO_URI: MongoDB connection string
+"""
+
+import os
+import sys
+
+# Add backend to path for shared services
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from pymongo import MongoClient, UpdateOne
+from dotenv import load_dotenv
+
+from services.job_text import NORMALIZED_VERSION, normalize_job
+
+BATCH_SIZE = 500
+
+
+def backfill(recompute_all: bool = False):
+    client = MongoClient(os.getenv("MONGO_URI"))
+    jobs_collection = client["jobfinder"]["jobs"]
+
+    query = {} if recompute_all else {"normalized.version": {"$ne": NORMALIZED_VERSION}}
+    total = jobs_collection.count_documents(query)
+    print(f"📋 {total} jobs to normalize (version {NORMALIZED_VERSION})")
+
+    updated = 0
+    batch = []
+    cursor = jobs_collection.find(query, {"title": 1, "company": 1, "location": 1, "description": 1})
+    for job in cursor:
+        batch.append(UpdateOne({"_id": job["_id"]}, {"$set": {"normalized": normalize_job(job)}}))
+        if len(batch) >= BATCH_SIZE:
+            updated += jobs_collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+            print(f"  {updated}/{total}")
+    if batch:
+        updated += jobs_collection.bulk_write(batch, ordered=False).modified_count
+
+    print(f"✅ Normalized {updated} jobs")
+
+
+if __name__ == "__main__":
+    # Load environment variables from the backend .env file
+    dotenv_path = os.path.join(os.path.dirname(__file__), '..', 'backend', '.env')
+    if os.path.exists(dotenv_path):
+        load_dotenv(dotenv_path=dotenv_path)
+    else:
+        load_dotenv()
+
+    if not os.getenv("MONGO_URI"):
+        print("ERROR: MONGO_URI not set")
+        sys.exit(1)
+
+    backfill(recompute_all="--all" in sys.argv)
@@ -5,31 +5,58 @@ This script runs AFTER all scrapers in the GitHub Action.
 It:
 1. Fetches all jobs from MongoDB
 2. Embeds each job using Gemini text-embedding-004
-3. Builds a FAISS IndexFlatIP (cosine similarity)
-4. Stores the index + ID mapping in MongoDB GridFS
+3. Builds a FAISS index (exact IndexFlatIP by default, or an ANN index type)
+4. Stores the index + a binary faiss_id -> ObjectId map in MongoDB GridFS,
+   with per-job filter columns (experience, remote, seniority, company, metro)
+
+Builds are incremental: every job's vector is kept in the `job_embeddings`
+collection together with a hash of its embedding text, so only new or changed
+jobs are sent to Gemini. The index is an IndexIDMap2 keyed by a per-job
+faiss_id, which lets stale vectors be removed from the previous index
+without rebuilding it.
 
 Usage:
-    python scraper/build_embeddings.py
+    python scraper/build_embeddings.py           # incremental
+    python scraper/build_embeddings.py --full    # re-embed every job
+
+Embedding runs EMBED_CONCURRENCY batches in parallel under a shared
+EMBED_REQUESTS_PER_MINUTE token bucket, retrying with exponential backoff and
+jitter. Finished batches are checkpointed, so a crashed run resumes where it
+stopped.
 
 Environment Variables Required:
     MONGO_URI: MongoDB connection string
     GEMINI_API_KEY: Google Gemini API key
+
+Optional:
+    FAISS_INDEX_SPEC: flat (default), ivf-flat, hnsw, ivf-pq, sq8, or any
+                      faiss.index_factory string (e.g. "IVF256,SQ8")
+    FAISS_NPROBE: IVF lists probed per query (default: nlist / 8)
+    FAISS_EF_SEARCH: HNSW search depth (default: 128)
 """
 
 import os
 import sys
-import json
 import time
+import re
+import math
+import random
+import hashlib
+import threading
 import tempfile
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add backend to path for database import
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 from gridfs import GridFS
+from bson.binary import Binary
 from dotenv import load_dotenv
 import google.generativeai as genai
+from services.job_features import JOB_FEATURE_DTYPE, job_feature_row
+from services.job_text import NORMALIZED_VERSION, embedding_text
 
 # Load environment variables
 dotenv_path = os.path.join(os.path.dirname(__file__), '..', 'backend', '.env')
@@ -52,6 +79,38 @@ EMBEDDING_MODEL = "models/text-embedding-004"
 EMBEDDING_DIMENSION = 768
 BATCH_SIZE = 100  # Gemini batch embedding limit
 
+# Embedding pipeline: parallel batches under a shared request-rate budget
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_REQUESTS_PER_MINUTE = float(os.getenv("EMBED_REQUESTS_PER_MINUTE", "60"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+EMBED_BACKOFF_BASE_SECONDS = 2.0
+EMBED_BACKOFF_MAX_SECONDS = 60.0
+
+# Index type — read back by services/vector_search.load_index_async from the GridFS metadata
+FAISS_INDEX_SPEC = os.getenv("FAISS_INDEX_SPEC", "flat")
+FAISS_NPROBE = os.getenv("FAISS_NPROBE")
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "128"))
+
+# Short names for the index types we support; anything else goes to index_factory as-is
+INDEX_SPEC_ALIASES = {
+    "flat": "Flat",
+    "ivf-flat": "IVF{nlist},Flat",
+    "hnsw": "HNSW32,Flat",
+    "ivf-pq": "IVF{nlist},PQ96",  # 96 bytes per job instead of 3 KB (8 dims per sub-quantizer)
+    "sq8": "SQ8",                 # 768 bytes per job, no training set size requirements
+}
+# Set --full (or EMBEDDINGS_FULL_REBUILD=true) to ignore stored embeddings and re-embed everything
+FULL_REBUILD = "--full" in sys.argv or os.getenv("EMBEDDINGS_FULL_REBUILD", "false").lower() in ("1", "true", "yes")
+
+# faiss_id_map.npy layout (must match services/vector_search.ID_MAP_DTYPE):
+# rows sorted by faiss_id, each with the 12 raw bytes of the job's ObjectId,
+# followed by the job feature columns used for filtered search
+ID_MAP_DTYPE = [("faiss_id", "<i8"), ("oid", "u1", (12,))] + JOB_FEATURE_DTYPE
+
+# k-means in faiss wants ~39 training points per centroid; PQ codebooks have 256 centroids
+MIN_POINTS_PER_CENTROID = 39
+PQ_CENTROIDS = 256
+
 if not MONGO_URI:
     print("ERROR: MONGO_URI not set")
     sys.exit(1)
@@ -64,31 +123,32 @@ if not GEMINI_API_KEY:
 genai.configure(api_key=GEMINI_API_KEY)
 
 
-def create_job_text(job: dict) -> str:
-    """
-    Create a text representation of a job for embedding.
-    Combines title, company, location, and description into a single string.
-    """
-    parts = []
-    
-    title = job.get("title", "")
-    if title:
-        parts.append(f"{title}")
-    
-    company = job.get("company", "")
-    if company:
-        parts.append(f"at {company}")
-    
-    location = job.get("location", "")
-    if location:
-        parts.append(f"in {location}")
+def content_hash(text: str) -> str:
+    """Hash of the embedding input; a job is re-embedded only when this changes."""
+    return hashlib.sha256(f"{EMBEDDING_MODEL}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a request may be sent."""
     
-    description = job.get("description", "")
-    if description:
-        # Truncate description to keep embedding focused
-        parts.append(f". {description[:500]}")
+    def __init__(self, rate_per_minute: float, capacity: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
     
-    return " ".join(parts) if parts else "Job listing"
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
 
 
 def embed_batch(texts: list) -> np.ndarray:
@@ -98,11 +158,158 @@ def embed_batch(texts: list) -> np.ndarray:
         content=texts,
         task_type="retrieval_document"
     )
-    return np.array(result['embedding'], dtype=np.float32)
+    embeddings = np.array(result['embedding'], dtype=np.float32)
+    # Never let a malformed response through as a vector — it would pollute the index
+    if embeddings.shape != (len(texts), EMBEDDING_DIMENSION):
+        raise ValueError(f"unexpected embedding shape {embeddings.shape}")
+    if not np.isfinite(embeddings).all() or not np.linalg.norm(embeddings, axis=1).all():
+        raise ValueError("response contains zero or non-finite vectors")
+    return embeddings
+
+
+def embed_batch_with_retry(texts: list, bucket: TokenBucket, label: str):
+    """
+    Embed one batch, retrying with exponential backoff and full jitter.
+    
+    Returns:
+        np.ndarray of shape (len(texts), 768), or None once retries are exhausted
+    """
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        bucket.acquire()
+        try:
+            return embed_batch(texts)
+        except Exception as e:
+            if attempt == EMBED_MAX_RETRIES:
+                print(f"  ❌ {label} failed after {attempt + 1} attempts: {e}")
+                return None
+            delay = random.uniform(0, min(EMBED_BACKOFF_MAX_SECONDS, EMBED_BACKOFF_BASE_SECONDS * 2 ** attempt))
+            print(f"  ⚠️  {label} attempt {attempt + 1} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def resolve_index_spec(spec: str, num_vectors: int) -> tuple:
+    """
+    Turn a FAISS_INDEX_SPEC value into a faiss.index_factory string plus the
+    query-time parameters to store alongside it.
+    
+    Falls back to an exact Flat index when the corpus is too small to train
+    the requested quantizer.
+    
+    Returns:
+        tuple of (factory_string, search_params dict)
+    """
+    factory = INDEX_SPEC_ALIASES.get(spec.lower().strip(), spec.strip())
+    
+    if "{nlist}" in factory:
+        # Rule of thumb: ~4*sqrt(N) lists, capped so every list gets enough training points
+        nlist = min(int(4 * math.sqrt(num_vectors)), num_vectors // MIN_POINTS_PER_CENTROID)
+        if nlist < 2:
+            print(f"⚠️  Only {num_vectors} jobs — too few to train '{spec}', using Flat instead")
+            return "Flat", {}
+        factory = factory.format(nlist=nlist)
+    
+    if "PQ" in factory and num_vectors < PQ_CENTROIDS * MIN_POINTS_PER_CENTROID // 4:
+        print(f"⚠️  Only {num_vectors} jobs — too few to train PQ codebooks, using SQ8 instead")
+        factory = "SQ8"
+    
+    search_params = {}
+    ivf_match = re.match(r"IVF(\d+)", factory)
+    if ivf_match:
+        nlist = int(ivf_match.group(1))
+        search_params["nprobe"] = int(FAISS_NPROBE) if FAISS_NPROBE else max(1, nlist // 8)
+    if factory.startswith("HNSW"):
+        search_params["efSearch"] = FAISS_EF_SEARCH
+    return factory, search_params
+
+
+def build_faiss_index(embeddings_matrix: np.ndarray, faiss_ids: np.ndarray, spec: str) -> tuple:
+    """
+    Build (and train, if needed) a FAISS inner-product index over normalized vectors,
+    wrapped in an IndexIDMap2 so results come back as faiss_ids.
+    
+    Returns:
+        tuple of (faiss.Index, factory_string, search_params dict)
+    """
+    factory, search_params = resolve_index_spec(spec, embeddings_matrix.shape[0])
+    base = faiss.index_factory(EMBEDDING_DIMENSION, factory, faiss.METRIC_INNER_PRODUCT)
+    if not base.is_trained:
+        print(f"🎓 Training {factory} on {embeddings_matrix.shape[0]} vectors...")
+        base.train(embeddings_matrix)
+    index = faiss.IndexIDMap2(base)
+    index.add_with_ids(embeddings_matrix, faiss_ids)
+    return index, factory, search_params
+
+
+def load_previous_index(db, fs, tmp_dir: str):
+    """
+    Download the index from the last build if it can be updated in place.
+    
+    Returns:
+        tuple of (faiss.Index, metadata dict), or (None, None) if there's no
+        compatible previous index (first run, --full, other model or spec)
+    """
+    if FULL_REBUILD:
+        return None, None
+    index_file = db["fs.files"].find_one({"filename": "faiss_index.bin"}, sort=[("uploadDate", -1)])
+    metadata = (index_file or {}).get("metadata") or {}
+    if metadata.get("id_scheme") != "faiss_id" or metadata.get("model") != EMBEDDING_MODEL:
+        return None, None
+    if metadata.get("requested_spec") != FAISS_INDEX_SPEC:
+        print(f"  Index spec changed ({metadata.get('requested_spec')} -> {FAISS_INDEX_SPEC}), rebuilding")
+        return None, None
+    
+    path = os.path.join(tmp_dir, "faiss_index_previous.bin")
+    with open(path, "wb") as f:
+        f.write(fs.get(index_file["_id"]).read())
+    index = faiss.read_index(path)
+    os.remove(path)
+    return index, metadata
+
+
+def embed_missing_jobs(texts: list, hashes: list, checkpoint_collection) -> list:
+    """
+    Embed job texts through the concurrent, rate-limited pipeline.
+    
+    Each finished batch is written to the checkpoint collection (keyed by
+    content hash) straight away, so a crashed run doesn't pay for it twice.
+    
+    Returns:
+        list with one float32 vector per text, or None where embedding failed
+        (failed jobs are left out of the index and retried on the next run)
+    """
+    vectors = [None] * len(texts)
+    total_batches = (len(texts) + BATCH_SIZE - 1) // BATCH_SIZE
+    bucket = TokenBucket(EMBED_REQUESTS_PER_MINUTE, capacity=EMBED_CONCURRENCY)
+    
+    def run_batch(start: int):
+        batch_num = (start // BATCH_SIZE) + 1
+        batch = texts[start:start + BATCH_SIZE]
+        embeddings = embed_batch_with_retry(batch, bucket, f"Batch {batch_num}/{total_batches}")
+        if embeddings is not None:
+            checkpoint_collection.bulk_write([
+                UpdateOne(
+                    {"_id": h},
+                    {"$set": {"embedding": Binary(vec.tobytes()), "model": EMBEDDING_MODEL}},
+                    upsert=True,
+                )
+                for h, vec in zip(hashes[start:start + BATCH_SIZE], embeddings)
+            ], ordered=False)
+            print(f"  Batch {batch_num}/{total_batches} ({len(batch)} jobs) ✅")
+        return start, embeddings
+    
+    with ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY) as pool:
+        futures = [pool.submit(run_batch, start) for start in range(0, len(texts), BATCH_SIZE)]
+        for future in as_completed(futures):
+            start, embeddings = future.result()
+            if embeddings is not None:
+                for offset, vector in enumerate(embeddings):
+                    vectors[start + offset] = vector
+    
+    return vectors
 
 
 def build_index():
-    """Main function to build the FAISS index and store it in GridFS."""
+    """Main function to (incrementally) build the FAISS index and store it in GridFS."""
     print("=" * 60)
     print("TACKLEIT EMBEDDING INDEX BUILDER v2.5")
     print("=" * 60)
@@ -112,90 +319,171 @@ def build_index():
     client = MongoClient(MONGO_URI)
     db = client["jobfinder"]
     jobs_collection = db["jobs"]
+    embeddings_collection = db["job_embeddings"]
+    checkpoint_collection = db["job_embeddings_checkpoint"]
     fs = GridFS(db)
+    embeddings_collection.create_index("content_hash")
     
     # Fetch all jobs
     print("📋 Fetching jobs from database...")
-    jobs = list(jobs_collection.find({}))
+    # Jobs with normalized fields carry their embedding text, so their full descriptions stay in MongoDB
+    job_fields = {"title": 1, "company": 1, "location": 1, "experience_min_years": 1}
+    jobs = list(jobs_collection.find(
+        {"normalized.version": NORMALIZED_VERSION},
+        {**job_fields, "normalized.version": 1, "normalized.embedding_text": 1},
+    ))
+    jobs += list(jobs_collection.find(
+        {"normalized.version": {"$ne": NORMALIZED_VERSION}}, {**job_fields, "description": 1}
+    ))
     total_jobs = len(jobs)
     
     if total_jobs == 0:
         print("⚠️  No jobs found in database. Skipping index build.")
         return
     
-    print(f"✅ Found {total_jobs} jobs to embed")
-    
-    # Create text representations
-    print("\n📝 Creating text representations...")
-    job_texts = []
-    job_ids = []
+    print(f"✅ Found {total_jobs} jobs")
     
+    # Create text representations and compare against stored embeddings
+    print("\n📝 Diffing jobs against stored embeddings...")
+    job_hashes = {}
+    job_texts = {}
     for job in jobs:
-        text = create_job_text(job)
-        job_texts.append(text)
-        job_ids.append(str(job["_id"]))
-    
-    # Embed in batches
-    print(f"\n🧠 Embedding {total_jobs} jobs (batch size: {BATCH_SIZE})...")
-    all_embeddings = []
-    
-    for i in range(0, len(job_texts), BATCH_SIZE):
-        batch = job_texts[i:i + BATCH_SIZE]
-        batch_num = (i // BATCH_SIZE) + 1
-        total_batches = (len(job_texts) + BATCH_SIZE - 1) // BATCH_SIZE
-        
-        print(f"  Batch {batch_num}/{total_batches} ({len(batch)} jobs)...", end=" ")
-        
+        text = embedding_text(job)
+        job_texts[job["_id"]] = text
+        job_hashes[job["_id"]] = content_hash(text)
+    
+    stored = {} if FULL_REBUILD else {
+        doc["_id"]: doc for doc in embeddings_collection.find({}, {"content_hash": 1, "faiss_id": 1})
+    }
+    unchanged_ids = {jid for jid, h in job_hashes.items() if jid in stored and stored[jid]["content_hash"] == h}
+    pending_ids = [jid for jid in job_hashes if jid not in unchanged_ids]
+    # Vectors to drop: jobs that were deleted, and the old vector of jobs whose text changed
+    stale_ids = [jid for jid in stored if jid not in unchanged_ids]
+    stale_faiss_ids = [stored[jid]["faiss_id"] for jid in stale_ids]
+    
+    print(f"  Unchanged: {len(unchanged_ids)} | New or changed: {len(pending_ids)} | Stale: {len(stale_ids)}")
+    
+    # Jobs are re-scraped weekly with fresh _ids, so reuse vectors by content hash before calling the API.
+    # Batches checkpointed by an interrupted run are picked up the same way.
+    pending_vectors = {}
+    if pending_ids:
+        wanted_hashes = list({job_hashes[jid] for jid in pending_ids})
+        by_hash = {
+            doc["_id"]: np.frombuffer(doc["embedding"], dtype=np.float32)
+            for doc in checkpoint_collection.find({"_id": {"$in": wanted_hashes}, "model": EMBEDDING_MODEL})
+        }
+        if by_hash:
+            print(f"  Resuming with {len(by_hash)} checkpointed embeddings")
+        if not FULL_REBUILD:
+            by_hash.update({
+                doc["content_hash"]: np.frombuffer(doc["embedding"], dtype=np.float32)
+                for doc in embeddings_collection.find({"content_hash": {"$in": wanted_hashes}}, {"content_hash": 1, "embedding": 1})
+            })
+        for jid in pending_ids:
+            if job_hashes[jid] in by_hash:
+                pending_vectors[jid] = by_hash[job_hashes[jid]]
+        if pending_vectors:
+            print(f"  Reused {len(pending_vectors)} embeddings with identical content")
+    reused_count = len(unchanged_ids) + len(pending_vectors)
+    
+    to_embed = [jid for jid in pending_ids if jid not in pending_vectors]
+    if to_embed:
+        print(f"\n🧠 Embedding {len(to_embed)} jobs (batch size: {BATCH_SIZE}, "
+              f"concurrency: {EMBED_CONCURRENCY}, {EMBED_REQUESTS_PER_MINUTE:g} req/min)...")
+        fresh = embed_missing_jobs(
+            [job_texts[jid] for jid in to_embed],
+            [job_hashes[jid] for jid in to_embed],
+            checkpoint_collection,
+        )
+        failed = 0
+        for jid, vector in zip(to_embed, fresh):
+            if vector is None:
+                failed += 1
+            else:
+                pending_vectors[jid] = vector
+        if failed:
+            print(f"  ⚠️  {failed} jobs could not be embedded and are left out of this build")
+    else:
+        print("\n🧠 Nothing new to embed")
+    
+    tmp_dir = tempfile.gettempdir()
+    index, previous_meta = load_previous_index(db, fs, tmp_dir)
+    
+    # Assign fresh faiss_ids (changed jobs get a new id so the old vector can simply be removed).
+    # The uploaded index's counter also covers a run that crashed before recording its embeddings.
+    last = embeddings_collection.find_one({}, {"faiss_id": 1}, sort=[("faiss_id", -1)])
+    next_faiss_id = 0 if FULL_REBUILD else max(
+        (last["faiss_id"] + 1) if last else 0, (previous_meta or {}).get("next_faiss_id", 0)
+    )
+    added_ids = list(pending_vectors.keys())
+    added_faiss_ids = np.arange(next_faiss_id, next_faiss_id + len(added_ids), dtype=np.int64)
+    added_matrix = (
+        np.vstack([pending_vectors[jid] for jid in added_ids]).astype(np.float32)
+        if added_ids else np.zeros((0, EMBEDDING_DIMENSION), dtype=np.float32)
+    )
+    faiss.normalize_L2(added_matrix)
+    
+    # faiss_id of every job the new index should contain
+    indexed = {jid: stored[jid]["faiss_id"] for jid in unchanged_ids}
+    indexed.update((jid, int(fid)) for jid, fid in zip(added_ids, added_faiss_ids))
+    expected_faiss_ids = np.sort(np.fromiter(indexed.values(), dtype=np.int64, count=len(indexed)))
+    
+    # Update the previous index in place if possible, otherwise assemble from stored vectors
+    index_factory = search_params = None
+    if index is not None:
         try:
-            embeddings = embed_batch(batch)
-            all_embeddings.append(embeddings)
-            print("✅")
-        except Exception as e:
-            print(f"❌ Error: {e}")
-            # Wait and retry once
-            print(f"  Retrying in 5 seconds...")
-            time.sleep(5)
-            try:
-                embeddings = embed_batch(batch)
-                all_embeddings.append(embeddings)
-                print(f"  Retry ✅")
-            except Exception as e2:
-                print(f"  Retry failed: {e2}")
-                print(f"  Skipping batch {batch_num}")
-                # Create zero vectors for failed batch
-                zero_embeddings = np.zeros((len(batch), EMBEDDING_DIMENSION), dtype=np.float32)
-                all_embeddings.append(zero_embeddings)
-        
-        # Rate limiting: be nice to the API
-        if i + BATCH_SIZE < len(job_texts):
-            time.sleep(1)
-    
-    # Combine all embeddings
-    embeddings_matrix = np.vstack(all_embeddings)
-    print(f"\n📊 Embedding matrix shape: {embeddings_matrix.shape}")
-    
-    # Normalize vectors for cosine similarity
-    print("🔄 Normalizing vectors for cosine similarity...")
-    faiss.normalize_L2(embeddings_matrix)
-    
-    # Build FAISS index
-    print("🏗️  Building FAISS index (IndexFlatIP for cosine similarity)...")
-    index = faiss.IndexFlatIP(EMBEDDING_DIMENSION)
-    index.add(embeddings_matrix)
-    print(f"✅ Index built with {index.ntotal} vectors")
-    
-    # Create ID mapping (FAISS position -> MongoDB job _id)
-    id_map = {str(i): job_id for i, job_id in enumerate(job_ids)}
+            if stale_faiss_ids:
+                index.remove_ids(np.array(stale_faiss_ids, dtype=np.int64))
+            if added_ids:
+                index.add_with_ids(added_matrix, added_faiss_ids)
+            index_factory = previous_meta.get("index_spec")
+            search_params = previous_meta.get("search_params", {})
+            print(f"🔁 Updated previous {index_factory} index in place (-{len(stale_faiss_ids)} / +{len(added_ids)})")
+            # A crashed earlier run can leave the stored embeddings and the uploaded index out of sync
+            if not np.array_equal(np.sort(faiss.vector_to_array(index.id_map)), expected_faiss_ids):
+                print("⚠️  Previous index is out of sync with job_embeddings, rebuilding")
+                index = None
+        except RuntimeError as e:
+            # e.g. HNSW doesn't support remove_ids
+            print(f"⚠️  In-place update not supported ({e}), rebuilding from stored embeddings")
+            index = None
+    
+    if index is None:
+        print(f"🏗️  Building FAISS index (spec: {FAISS_INDEX_SPEC}, inner product for cosine similarity)...")
+        faiss_ids = [int(fid) for fid in added_faiss_ids]
+        vectors = [added_matrix] if added_ids else []
+        if unchanged_ids:
+            kept = list(embeddings_collection.find({"_id": {"$in": list(unchanged_ids)}}, {"faiss_id": 1, "embedding": 1}))
+            faiss_ids += [doc["faiss_id"] for doc in kept]
+            vectors.append(np.vstack([np.frombuffer(doc["embedding"], dtype=np.float32) for doc in kept]))
+        if not faiss_ids:
+            print("⚠️  No embeddings available. Skipping index build.")
+            return
+        embeddings_matrix = np.vstack(vectors)
+        print(f"📊 Embedding matrix shape: {embeddings_matrix.shape}")
+        index, index_factory, search_params = build_faiss_index(
+            embeddings_matrix, np.array(faiss_ids, dtype=np.int64), FAISS_INDEX_SPEC
+        )
+    print(f"✅ {index_factory} index has {index.ntotal} vectors (search params: {search_params})")
+    
+    # Create ID mapping (faiss_id -> MongoDB job _id) as a compact sorted array
+    mapping = sorted(indexed.items(), key=lambda item: item[1])
+    id_map = np.zeros(len(mapping), dtype=ID_MAP_DTYPE)
+    id_map["faiss_id"] = [fid for _, fid in mapping]
+    id_map["oid"] = np.frombuffer(b"".join(jid.binary for jid, _ in mapping), dtype=np.uint8).reshape(-1, 12)
+    # Filter columns are recomputed from the current job documents on every build
+    jobs_by_id = {job["_id"]: job for job in jobs}
+    features = np.array([job_feature_row(jobs_by_id.get(jid, {})) for jid, _ in mapping], dtype=JOB_FEATURE_DTYPE)
+    for name, _ in JOB_FEATURE_DTYPE:
+        id_map[name] = features[name]
     
     # Save to temporary files
-    tmp_dir = tempfile.gettempdir()
     index_path = os.path.join(tmp_dir, "faiss_index.bin")
-    map_path = os.path.join(tmp_dir, "faiss_id_map.json")
+    map_path = os.path.join(tmp_dir, "faiss_id_map.npy")
     
     print(f"\n💾 Saving index to temporary files...")
     faiss.write_index(index, index_path)
-    with open(map_path, "w") as f:
-        json.dump(id_map, f)
+    np.save(map_path, id_map)
     
     index_size_kb = os.path.getsize(index_path) / 1024
     map_size_kb = os.path.getsize(map_path) / 1024
@@ -203,42 +491,77 @@ def build_index():
     print(f"  ID map size: {map_size_kb:.1f} KB")
     print(f"  Total: {(index_size_kb + map_size_kb):.1f} KB")
     
-    # Upload to GridFS (overwrite existing)
+    # Upload to GridFS. The new files go up before the old ones are deleted, so a
+    # reader probing in between still finds an index (the newest upload wins)
     print(f"\n☁️  Uploading to MongoDB GridFS...")
     
-    # Delete old files if they exist
-    for filename in ["faiss_index.bin", "faiss_id_map.json"]:
-        existing = db["fs.files"].find_one({"filename": filename})
-        if existing:
-            fs.delete(existing["_id"])
-            print(f"  Deleted old {filename}")
+    # Id map first: readers treat the index upload as "version ready", and the
+    # index metadata names the id map file that belongs to it
+    with open(map_path, "rb") as f:
+        map_file_id = fs.put(f, filename="faiss_id_map.npy", metadata={
+            "total_mappings": len(id_map),
+            "built_at": time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
+        })
+    print(f"  ✅ Uploaded faiss_id_map.npy")
     
-    # Upload new files
     with open(index_path, "rb") as f:
-        fs.put(f, filename="faiss_index.bin", metadata={
-            "total_jobs": total_jobs,
+        index_file_id = fs.put(f, filename="faiss_index.bin", metadata={
+            "total_jobs": index.ntotal,
             "dimension": EMBEDDING_DIMENSION,
             "model": EMBEDDING_MODEL,
+            "index_spec": index_factory,
+            "requested_spec": FAISS_INDEX_SPEC,
+            "search_params": search_params,
+            "id_scheme": "faiss_id",
+            "id_map_format": "npy",
+            "id_map_file_id": map_file_id,
+            "next_faiss_id": next_faiss_id + len(added_ids),
             "built_at": time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
         })
     print(f"  ✅ Uploaded faiss_index.bin")
     
-    with open(map_path, "rb") as f:
-        fs.put(f, filename="faiss_id_map.json", metadata={
-            "total_mappings": len(id_map),
-            "built_at": time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
-        })
-    print(f"  ✅ Uploaded faiss_id_map.json")
+    # Delete the previous versions by _id
+    for filename in ["faiss_index.bin", "faiss_id_map.npy", "faiss_id_map.json"]:
+        old_files = db["fs.files"].find({"filename": filename, "_id": {"$nin": [index_file_id, map_file_id]}}, {"_id": 1})
+        for existing in list(old_files):
+            fs.delete(existing["_id"])
+            print(f"  Deleted old {filename}")
+    
+    # Record what the uploaded index contains; until here job_embeddings still matched the previous one
+    print("\n💾 Updating job_embeddings collection...")
+    if FULL_REBUILD:
+        embeddings_collection.delete_many({})
+    elif stale_ids:
+        embeddings_collection.delete_many({"_id": {"$in": [jid for jid in stale_ids if jid not in pending_vectors]}})
+    if added_ids:
+        now = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
+        embeddings_collection.bulk_write([
+            UpdateOne(
+                {"_id": jid},
+                {"$set": {
+                    "content_hash": job_hashes[jid],
+                    "faiss_id": int(fid),
+                    "embedding": Binary(added_matrix[row].tobytes()),
+                    "model": EMBEDDING_MODEL,
+                    "updated_at": now,
+                }},
+                upsert=True,
+            )
+            for row, (jid, fid) in enumerate(zip(added_ids, added_faiss_ids))
+        ], ordered=False)
+    print(f"  ✅ Stored {len(added_ids)} embeddings, removed {len(stale_ids)} stale")
     
-    # Clean up temp files
+    # Clean up temp files; the checkpoint is only needed until a build succeeds
     os.remove(index_path)
     os.remove(map_path)
+    checkpoint_collection.delete_many({})
     
     print(f"\n{'=' * 60}")
     print(f"✅ EMBEDDING INDEX BUILD COMPLETE")
-    print(f"   Jobs indexed: {total_jobs}")
+    print(f"   Jobs indexed: {index.ntotal}")
+    print(f"   Newly embedded: {len(added_ids) + len(unchanged_ids) - reused_count} | Reused: {reused_count}")
     print(f"   Vector dimension: {EMBEDDING_DIMENSION}")
-    print(f"   Index type: IndexFlatIP (cosine similarity)")
+    print(f"   Index type: {index_factory} (cosine similarity)")
     print(f"   Storage: MongoDB GridFS")
     print(f"   Total size: {(index_size_kb + map_size_kb):.1f} KB")
     print(f"{'=' * 60}")
@@ -4,6 +4,7 @@ import logging
 import re
 from typing import List, Dict
 from dotenv import load_dotenv
+from job_uploader import JobUploader
 
 # Load environment variables
 load_dotenv()
@@ -85,65 +86,63 @@ def scrape_capgemini():
     # Import experience extraction utility
     from experience_utils import extract_experience_from_text, parse_experience_level
 
-    for i, job in enumerate(jobs, start=1):
-        title = job.get("title", "N/A")
-        location = job.get("location", "N/A")
-        job_url = job.get("apply_job_url", "Not available")
-        
-        # Get experience level for better description
-        experience_level = job.get("experience_level", "")
-        brand = job.get("brand", "Capgemini")
-        professional_community = job.get("professional_communities", "")
-        
-        # Parse experience from structured field or description
-        experience_required = None
-        experience_min_years = None
-        
-        if experience_level:
-            experience_required, experience_min_years = parse_experience_level(experience_level)
-        
-        # If not found in structured field, try description
-        if experience_min_years is None:
+    uploader = JobUploader(BACKEND_ENDPOINT, "Capgemini")
+    try:
+        for i, job in enumerate(jobs, start=1):
+            title = job.get("title", "N/A")
+            location = job.get("location", "N/A")
+            job_url = job.get("apply_job_url", "Not available")
+
+            # Get experience level for better description
+            experience_level = job.get("experience_level", "")
+            brand = job.get("brand", "Capgemini")
+            professional_community = job.get("professional_communities", "")
+
+            # Parse experience from structured field or description
+            experience_required = None
+            experience_min_years = None
+
+            if experience_level:
+                experience_required, experience_min_years = parse_experience_level(experience_level)
+
+            # If not found in structured field, try description
+            if experience_min_years is None:
+                raw_description = job.get("description", "")
+                experience_required, experience_min_years = extract_experience_from_text(raw_description)
+
+            # Also try to extract from title
+            if experience_min_years is None:
+                experience_required, experience_min_years = extract_experience_from_text(title)
+
+            # Clean and format description
             raw_description = job.get("description", "")
-            experience_required, experience_min_years = extract_experience_from_text(raw_description)
-        
-        # Also try to extract from title
-        if experience_min_years is None:
-            experience_required, experience_min_years = extract_experience_from_text(title)
-        
-        # Clean and format description
-        raw_description = job.get("description", "")
-        clean_desc = clean_html(raw_description)
-        
-        # Build informative description
-        description_parts = []
-        if experience_level:
-            description_parts.append(f"Experience Level: {experience_level}")
-        if professional_community:
-            description_parts.append(f"Domain: {professional_community}")
-        if clean_desc:
-            description_parts.append(clean_desc)
-        
-        description = " | ".join(description_parts) if description_parts else "Full description available on job page."
-
-        payload = {
-            "title": title,
-            "company": brand if brand else "Capgemini",
-            "location": location,
-            "job_url": job_url,
-            "description": description,
-            "experience_required": experience_required,
-            "experience_min_years": experience_min_years
-        }
-
-        logging.info(f"[{i}] {title} at {location} — Exp: {experience_required} ({experience_min_years} yrs)")
-        try:
-            url = f"{BACKEND_ENDPOINT}/jobs"
-            post_resp = requests.post(url, json=payload, timeout=30)
-            post_resp.raise_for_status()
-            logging.info(f"Successfully posted job '{title}' to backend.")
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Failed posting job '{title}': {e}")
+            clean_desc = clean_html(raw_description)
+
+            # Build informative description
+            description_parts = []
+            if experience_level:
+                description_parts.append(f"Experience Level: {experience_level}")
+            if professional_community:
+                description_parts.append(f"Domain: {professional_community}")
+            if clean_desc:
+                description_parts.append(clean_desc)
+
+            description = " | ".join(description_parts) if description_parts else "Full description available on job page."
+
+            payload = {
+                "title": title,
+                "company": brand if brand else "Capgemini",
+                "location": location,
+                "job_url": job_url,
+                "description": description,
+                "experience_required": experience_required,
+                "experience_min_years": experience_min_years
+            }
+
+            logging.info(f"[{i}] {title} at {location} — Exp: {experience_required} ({experience_min_years} yrs)")
+            uploader.add(payload)
+    finally:
+        uploader.close()
 
     logging.info("Capgemini scraping completed successfully.")
 
@@ -3,6 +3,7 @@ import requests
 import logging
 import json
 from dotenv import load_dotenv
+from job_uploader import JobUploader
 
 # Load environment variables
 load_dotenv()
@@ -37,41 +38,39 @@ def scrape_deloitte():
         # Import experience extraction utility
         from experience_utils import extract_experience_from_text
 
-        for i, job in enumerate(jobs, start=1):
-            translated_data = job.get("translated", {})
-            title = translated_data.get("title", "N/A")
-            description = translated_data.get("description", "N/A")
-            job_url = translated_data.get("link", "Not available")
-            
-            locations = job.get("locations", [])
-            location_str = "N/A"
-            if locations and len(locations) > 0:
-                location_str = locations[0].get("translated", {}).get("title", "N/A")
-            
-            # Extract experience from title and description
-            experience_required, experience_min_years = extract_experience_from_text(title)
-            
-            if experience_min_years is None:
-                experience_required, experience_min_years = extract_experience_from_text(description)
+        uploader = JobUploader(BACKEND_ENDPOINT, "Deloitte")
+        try:
+            for i, job in enumerate(jobs, start=1):
+                translated_data = job.get("translated", {})
+                title = translated_data.get("title", "N/A")
+                description = translated_data.get("description", "N/A")
+                job_url = translated_data.get("link", "Not available")
 
-            payload = {
-                "title": title,
-                "company": "Deloitte",
-                "location": location_str,
-                "job_url": job_url,
-                "description": description,
-                "experience_required": experience_required,
-                "experience_min_years": experience_min_years
-            }
+                locations = job.get("locations", [])
+                location_str = "N/A"
+                if locations and len(locations) > 0:
+                    location_str = locations[0].get("translated", {}).get("title", "N/A")
 
-            logging.info(f"[{i}] {title} at {location_str} — Exp: {experience_required} ({experience_min_years} yrs)")
-            try:
-                url = f"{BACKEND_ENDPOINT}/jobs"
-                post_resp = requests.post(url, json=payload, timeout=30)
-                post_resp.raise_for_status()
-                logging.info(f"Successfully posted job '{title}' to backend.")
-            except requests.exceptions.RequestException as e:
-                logging.error(f"Failed posting job '{title}': {e}")
+                # Extract experience from title and description
+                experience_required, experience_min_years = extract_experience_from_text(title)
+
+                if experience_min_years is None:
+                    experience_required, experience_min_years = extract_experience_from_text(description)
+
+                payload = {
+                    "title": title,
+                    "company": "Deloitte",
+                    "location": location_str,
+                    "job_url": job_url,
+                    "description": description,
+                    "experience_required": experience_required,
+                    "experience_min_years": experience_min_years
+                }
+
+                logging.info(f"[{i}] {title} at {location_str} — Exp: {experience_required} ({experience_min_years} yrs)")
+                uploader.add(payload)
+        finally:
+            uploader.close()
 
     except requests.exceptions.RequestException as e:
         logging.error(f"Deloitte API fetch error: {e}")
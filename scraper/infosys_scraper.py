@@ -2,6 +2,7 @@ import os
 import requests
 import logging
 from dotenv import load_dotenv
+from job_uploader import JobUploader
 
 # Load environment variables
 load_dotenv()
@@ -44,59 +45,56 @@ def scrape_infosys():
 
     logging.info(f"Fetched {len(jobs)} jobs. Processing each now...")
 
-    for index, job in enumerate(jobs, start=1):
-        # Extracting necessary fields
-        title = job.get("postingTitle", "N/A")
-        location = job.get("location", "N/A")
-        reference_code = job.get("referenceCode")
-        posting_id = job.get("postingId")
-        min_exp = job.get("minExperienceLevel")
-        max_exp = job.get("maxExperienceLevel")
-        skills = job.get("technicalRequirement") or job.get("preferredSkills") or "N/A"
-
-        # Construct job URL if postingId exists
-        if reference_code:
-            job_url = f"https://career.infosys.com/jobdesc?jobReferenceCode={reference_code}&rc=0&jobType=normal"
-        else:
-            job_url = "Not available"
-
-        # Create description combining experience and skills
-        description = f"Experience: {min_exp}-{max_exp} years. Skills: {skills}."
-        
-        # Format experience for new fields
-        experience_required = None
-        experience_min_years = None
-        
-        if min_exp is not None:
-            try:
-                experience_min_years = int(min_exp)
-                if max_exp is not None:
-                    experience_required = f"{min_exp}-{max_exp} years"
-                else:
-                    experience_required = f"{min_exp}+ years"
-            except (ValueError, TypeError):
-                experience_required = str(min_exp) if min_exp else None
-
-        payload = {
-            "title": title,
-            "company": "Infosys",
-            "location": location,
-            "job_url": job_url,
-            "description": description,
-            "experience_required": experience_required,
-            "experience_min_years": experience_min_years
-        }
-
-        logging.info(f"[{index}] {title} | {location} | Exp: {experience_required}")
-
-        # Push to backend
-        try:
-            url = f"{BACKEND_ENDPOINT}/jobs"
-            backend_response = requests.post(url, json=payload, timeout=30)
-            backend_response.raise_for_status()
-            logging.info(f"Successfully sent job '{title}' to backend.")
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Error sending job '{title}' to backend: {e}")
+    uploader = JobUploader(BACKEND_ENDPOINT, "Infosys")
+    try:
+        for index, job in enumerate(jobs, start=1):
+            # Extracting necessary fields
+            title = job.get("postingTitle", "N/A")
+            location = job.get("location", "N/A")
+            reference_code = job.get("referenceCode")
+            posting_id = job.get("postingId")
+            min_exp = job.get("minExperienceLevel")
+            max_exp = job.get("maxExperienceLevel")
+            skills = job.get("technicalRequirement") or job.get("preferredSkills") or "N/A"
+
+            # Construct job URL if postingId exists
+            if reference_code:
+                job_url = f"https://career.infosys.com/jobdesc?jobReferenceCode={reference_code}&rc=0&jobType=normal"
+            else:
+                job_url = "Not available"
+
+            # Create description combining experience and skills
+            description = f"Experience: {min_exp}-{max_exp} years. Skills: {skills}."
+
+            # Format experience for new fields
+            experience_required = None
+            experience_min_years = None
+
+            if min_exp is not None:
+                try:
+                    experience_min_years = int(min_exp)
+                    if max_exp is not None:
+                        experience_required = f"{min_exp}-{max_exp} years"
+                    else:
+                        experience_required = f"{min_exp}+ years"
+                except (ValueError, TypeError):
+                    experience_required = str(min_exp) if min_exp else None
+
+            payload = {
+                "title": title,
+                "company": "Infosys",
+                "location": location,
+                "job_url": job_url,
+                "description": description,
+                "experience_required": experience_required,
+                "experience_min_years": experience_min_years
+            }
+
+            logging.info(f"[{index}] {title} | {location} | Exp: {experience_required}")
+
+            uploader.add(payload)
+    finally:
+        uploader.close()
 
     logging.info("Infosys scraping completed successfully.")
 
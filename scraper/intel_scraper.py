@@ -1,9 +1,9 @@
 import os
-import requests
 import logging
 import json
 import http.client
 from dotenv import load_dotenv
+from job_uploader import JobUploader
 
 # Load environment variables
 load_dotenv()
@@ -61,43 +61,40 @@ def scrape_intel():
     jobs = all_jobs
     logging.info(f"Total Intel jobs fetched: {len(jobs)}. Processing...")
 
-    for index, job in enumerate(jobs, start=1):
-        title = job.get("title", "N/A")
-        location = job.get("locationsText", "N/A")
-        external_path = job.get("externalPath", "")
-        
-        if external_path:
-            job_url = f"https://intel.wd1.myworkdayjobs.com/en-US/External{external_path}"
-        else:
-            job_url = "Not available"
+    uploader = JobUploader(BACKEND_ENDPOINT, "Intel")
+    try:
+        for index, job in enumerate(jobs, start=1):
+            title = job.get("title", "N/A")
+            location = job.get("locationsText", "N/A")
+            external_path = job.get("externalPath", "")
 
-        # Placeholder for description as it's not in the list view
-        description = "Full description available on the job page."
-        
-        # Extract experience from title (Intel typically has seniority in title)
-        from experience_utils import extract_experience_from_text
-        experience_required, experience_min_years = extract_experience_from_text(title)
+            if external_path:
+                job_url = f"https://intel.wd1.myworkdayjobs.com/en-US/External{external_path}"
+            else:
+                job_url = "Not available"
 
-        payload = {
-            "title": title,
-            "company": "Intel",
-            "location": location,
-            "job_url": job_url,
-            "description": description,
-            "experience_required": experience_required,
-            "experience_min_years": experience_min_years
-        }
+            # Placeholder for description as it's not in the list view
+            description = "Full description available on the job page."
 
-        logging.info(f"[{index}] {title} | {location} — Exp: {experience_required} ({experience_min_years} yrs)")
+            # Extract experience from title (Intel typically has seniority in title)
+            from experience_utils import extract_experience_from_text
+            experience_required, experience_min_years = extract_experience_from_text(title)
 
-        # Push to backend
-        try:
-            url = f"{BACKEND_ENDPOINT}/jobs"
-            backend_response = requests.post(url, json=payload, timeout=30)
-            backend_response.raise_for_status()
-            logging.info(f"Successfully sent job '{title}' to backend.")
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Error sending job '{title}' to backend: {e}")
+            payload = {
+                "title": title,
+                "company": "Intel",
+                "location": location,
+                "job_url": job_url,
+                "description": description,
+                "experience_required": experience_required,
+                "experience_min_years": experience_min_years
+            }
+
+            logging.info(f"[{index}] {title} | {location} — Exp: {experience_required} ({experience_min_years} yrs)")
+
+            uploader.add(payload)
+    finally:
+        uploader.close()
 
     logging.info("Intel scraping completed successfully.")
 
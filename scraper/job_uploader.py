@@ -0,0 +1,108 @@
+"""
+Batched job upload for the scrapers.
+
+Scrapers hand each scraped job to a JobUploader, which sends them to the
+backend's POST /jobs/bulk endpoint a batch at a time (upserted by job_url, so
+re-scraped jobs update instead of duplicating) rather than one POST per job:
+
+    uploader = JobUploader(BACKEND_ENDPOINT, "Adobe")
+    try:
+        for job in listings:
+            uploader.add(payload)
+    finally:
+        uploader.close()
+
+Connection errors, timeouts and 5xx responses are retried; any other 4xx fails
+the batch right away. A backend without /jobs/bulk (404/405) gets the jobs one
+at a time on /jobs.
+"""
+
+import os
+import time
+import logging
+import requests
+
+UPLOAD_BATCH_SIZE = int(os.getenv("JOB_UPLOAD_BATCH_SIZE", "200"))
+UPLOAD_RETRIES = 3
+COUNTED_FIELDS = ("received", "inserted", "updated", "unchanged", "duplicates", "invalid", "failed")
+
+
+class JobUploader:
+    def __init__(self, backend_endpoint: str, source: str, batch_size: int = UPLOAD_BATCH_SIZE):
+        self.backend_endpoint = backend_endpoint.rstrip("/")
+        self.source = source
+        self.batch_size = batch_size
+        self.pending = []
+        self.totals = dict.fromkeys(COUNTED_FIELDS, 0)
+        self._bulk_supported = True
+
+    def add(self, job: dict):
+        self.pending.append(job)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Send the pending jobs."""
+        if not self.pending:
+            return
+        jobs, self.pending = self.pending, []
+        if self._bulk_supported:
+            report = self._post_bulk(jobs)
+            if report is not None:
+                for field in COUNTED_FIELDS:
+                    self.totals[field] += report.get(field, 0)
+                for error in report.get("errors", []):
+                    logging.warning(f"{self.source}: job rejected by backend: {error}")
+                return
+        if not self._bulk_supported:
+            self._post_one_by_one(jobs)
+
+    def _post_bulk(self, jobs: list):
+        """The endpoint's counts report, or None if the batch couldn't be sent."""
+        url = f"{self.backend_endpoint}/jobs/bulk"
+        for attempt in range(1, UPLOAD_RETRIES + 1):
+            try:
+                response = requests.post(url, json=jobs, timeout=120)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            else:
+                if response.status_code in (404, 405):
+                    logging.warning(f"{self.source}: backend has no /jobs/bulk, posting jobs one at a time.")
+                    self._bulk_supported = False
+                    return None
+                if response.ok:
+                    logging.info(f"{self.source}: uploaded {len(jobs)} jobs to backend.")
+                    try:
+                        return response.json()
+                    except ValueError:
+                        logging.warning(f"{self.source}: backend accepted the batch but sent no counts report.")
+                        return {"received": len(jobs)}
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code < 500:
+                    # The backend rejected the batch itself; sending it again won't change that
+                    logging.error(f"{self.source}: bulk upload of {len(jobs)} jobs rejected: {error}")
+                    break
+            logging.error(f"{self.source}: bulk upload of {len(jobs)} jobs failed (attempt {attempt}): {error}")
+            if attempt < UPLOAD_RETRIES:
+                time.sleep(2 ** attempt)
+        self.totals["received"] += len(jobs)
+        self.totals["failed"] += len(jobs)
+        return None
+
+    def _post_one_by_one(self, jobs: list):
+        url = f"{self.backend_endpoint}/jobs"
+        for job in jobs:
+            self.totals["received"] += 1
+            try:
+                response = requests.post(url, json=job, timeout=30)
+                response.raise_for_status()
+                self.totals["inserted"] += 1
+            except requests.exceptions.RequestException as e:
+                self.totals["failed"] += 1
+                logging.error(f"{self.source}: failed posting job '{job.get('title')}': {e}")
+
+    def close(self) -> dict:
+        """Send what's left and log the run's totals."""
+        self.flush()
+        logging.info(f"{self.source} upload totals: {self.totals}")
+        return self.totals
@@ -1,10 +1,10 @@
 import os
-import requests
 import logging
 from typing import List, Dict
 import json
 import http.client
 from dotenv import load_dotenv
+from job_uploader import JobUploader
 
 # Load environment variables
 load_dotenv()
@@ -64,37 +64,35 @@ def scrape_nvidia():
     # Import experience extraction utility
     from experience_utils import extract_experience_from_text
 
-    for i, job in enumerate(jobs, start=1):
-        title = job.get("title", "N/A")
-        location = job.get("locationsText", "N/A")
-        path = job.get("externalPath", "")
-        job_url = f"https://nvidia.wd5.myworkdayjobs.com/en-US/NVIDIAExternalCareerSite{path}"
-        description = " | ".join(job.get("bulletFields", [])) if job.get("bulletFields") else "N/A"
-        
-        # Extract experience from title and description
-        experience_required, experience_min_years = extract_experience_from_text(title)
-        
-        if experience_min_years is None and description != "N/A":
-            experience_required, experience_min_years = extract_experience_from_text(description)
+    uploader = JobUploader(BACKEND_ENDPOINT, "NVIDIA")
+    try:
+        for i, job in enumerate(jobs, start=1):
+            title = job.get("title", "N/A")
+            location = job.get("locationsText", "N/A")
+            path = job.get("externalPath", "")
+            job_url = f"https://nvidia.wd5.myworkdayjobs.com/en-US/NVIDIAExternalCareerSite{path}"
+            description = " | ".join(job.get("bulletFields", [])) if job.get("bulletFields") else "N/A"
 
-        payload = {
-            "title": title,
-            "company": "NVIDIA",
-            "location": location,
-            "job_url": job_url,
-            "description": description,
-            "experience_required": experience_required,
-            "experience_min_years": experience_min_years
-        }
+            # Extract experience from title and description
+            experience_required, experience_min_years = extract_experience_from_text(title)
 
-        logging.info(f"[{i}] {title} at {location} — Exp: {experience_required} ({experience_min_years} yrs)")
-        try:
-            url = f"{BACKEND_ENDPOINT}/jobs"
-            post_resp = requests.post(url, json=payload, timeout=30)
-            post_resp.raise_for_status()
-            logging.info("Posted successfully.")
-        except Exception as e:
-            logging.error(f"Failed posting job[{i}]: {e}")
+            if experience_min_years is None and description != "N/A":
+                experience_required, experience_min_years = extract_experience_from_text(description)
+
+            payload = {
+                "title": title,
+                "company": "NVIDIA",
+                "location": location,
+                "job_url": job_url,
+                "description": description,
+                "experience_required": experience_required,
+                "experience_min_years": experience_min_years
+            }
+
+            logging.info(f"[{i}] {title} at {location} — Exp: {experience_required} ({experience_min_years} yrs)")
+            uploader.add(payload)
+    finally:
+        uploader.close()
 
 if __name__ == "__main__":
     scrape_nvidia()
@@ -4,6 +4,7 @@ import logging
 from typing import List, Dict
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
+from job_uploader import JobUploader
 
 # Load environment variables
 load_dotenv()
@@ -78,47 +79,45 @@ def scrape_qualcomm():
     # Import experience extraction utility
     from experience_utils import extract_experience_from_text
 
-    for i, job in enumerate(jobs, start=1):
-        title = job.get("name", "N/A")
-        location = job.get("location", "N/A")
-        job_url = job.get("canonicalPositionUrl", "Not available")
-        
-        # Fetch the full job description from the job URL
-        description = get_job_description(job_url)
-        
-        # Try to get experience from API field first, then parse from description
-        experience_required = job.get("experienceLevel", "") or job.get("experience", "")
-        experience_min_years = None
-        
-        if not experience_required:
-            # Parse from description
-            experience_required, experience_min_years = extract_experience_from_text(description)
-        else:
-            # If we have structured experience, parse the years from it
-            _, experience_min_years = extract_experience_from_text(experience_required)
-        
-        # Also try to extract from title
-        if experience_min_years is None:
-            _, experience_min_years = extract_experience_from_text(title)
-
-        payload = {
-            "title": title,
-            "company": "Qualcomm",
-            "location": location,
-            "job_url": job_url,
-            "description": description,
-            "experience_required": experience_required,
-            "experience_min_years": experience_min_years
-        }
-
-        logging.info(f"[{i}] {title} at {location} — Exp: {experience_required} ({experience_min_years} yrs)")
-        try:
-            url = f"{BACKEND_ENDPOINT}/jobs"
-            post_resp = requests.post(url, json=payload, timeout=30)
-            post_resp.raise_for_status()
-            logging.info(f"Successfully posted job '{title}' to backend.")
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Failed posting job '{title}': {e}")
+    uploader = JobUploader(BACKEND_ENDPOINT, "Qualcomm")
+    try:
+        for i, job in enumerate(jobs, start=1):
+            title = job.get("name", "N/A")
+            location = job.get("location", "N/A")
+            job_url = job.get("canonicalPositionUrl", "Not available")
+
+            # Fetch the full job description from the job URL
+            description = get_job_description(job_url)
+
+            # Try to get experience from API field first, then parse from description
+            experience_required = job.get("experienceLevel", "") or job.get("experience", "")
+            experience_min_years = None
+
+            if not experience_required:
+                # Parse from description
+                experience_required, experience_min_years = extract_experience_from_text(description)
+            else:
+                # If we have structured experience, parse the years from it
+                _, experience_min_years = extract_experience_from_text(experience_required)
+
+            # Also try to extract from title
+            if experience_min_years is None:
+                _, experience_min_years = extract_experience_from_text(title)
+
+            payload = {
+                "title": title,
+                "company": "Qualcomm",
+                "location": location,
+                "job_url": job_url,
+                "description": description,
+                "experience_required": experience_required,
+                "experience_min_years": experience_min_years
+            }
+
+            logging.info(f"[{i}] {title} at {location} — Exp: {experience_required} ({experience_min_years} yrs)")
+            uploader.add(payload)
+    finally:
+        uploader.close()
 
 if __name__ == "__main__":
     scrape_qualcomm()
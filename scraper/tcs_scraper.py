@@ -3,6 +3,7 @@ import requests
 import logging
 from typing import List, Dict
 from dotenv import load_dotenv
+from job_uploader import JobUploader
 
 # Load environment variables
 load_dotenv()
@@ -81,55 +82,53 @@ def scrape_tcs():
     # Import experience extraction utility
     from experience_utils import extract_experience_from_text
 
-    for i, job in enumerate(jobs, start=1):
-        title = job.get("jobTitle", "N/A")
-        location = job.get("location", "N/A")
-        job_id = job.get("id")
-        
-        job_url = f"https://ibegin.tcsapps.com/candidate/job/{job_id}" if job_id else "Not available"
-        
-        experience = job.get("experience", "N/A")
-        skills = job.get("skills", "N/A")
-        description = f"Experience: {experience} years. Skills: {skills}"
-        
-        # Parse experience from API field
-        experience_required = None
-        experience_min_years = None
-        
-        if experience and experience != "N/A":
-            try:
-                # TCS API returns experience as a string like "3-5" or "3"
-                experience_required = f"{experience} years"
-                # Extract minimum years
-                if "-" in str(experience):
-                    experience_min_years = int(str(experience).split("-")[0])
-                else:
-                    experience_min_years = int(experience)
-            except (ValueError, TypeError):
-                experience_required, experience_min_years = extract_experience_from_text(str(experience))
-        
-        # Fallback to parsing from title
-        if experience_min_years is None:
-            experience_required, experience_min_years = extract_experience_from_text(title)
-
-        payload = {
-            "title": title,
-            "company": "TCS",
-            "location": location,
-            "job_url": job_url,
-            "description": description,
-            "experience_required": experience_required,
-            "experience_min_years": experience_min_years
-        }
-
-        logging.info(f"[{i}] {title} at {location} — Exp: {experience_required} ({experience_min_years} yrs)")
-        try:
-            url = f"{BACKEND_ENDPOINT}/jobs"
-            post_resp = requests.post(url, json=payload, timeout=30)
-            post_resp.raise_for_status()
-            logging.info(f"Successfully posted job '{title}' to backend.")
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Failed posting job '{title}': {e}")
+    uploader = JobUploader(BACKEND_ENDPOINT, "TCS")
+    try:
+        for i, job in enumerate(jobs, start=1):
+            title = job.get("jobTitle", "N/A")
+            location = job.get("location", "N/A")
+            job_id = job.get("id")
+
+            job_url = f"https://ibegin.tcsapps.com/candidate/job/{job_id}" if job_id else "Not available"
+
+            experience = job.get("experience", "N/A")
+            skills = job.get("skills", "N/A")
+            description = f"Experience: {experience} years. Skills: {skills}"
+
+            # Parse experience from API field
+            experience_required = None
+            experience_min_years = None
+
+            if experience and experience != "N/A":
+                try:
+                    # TCS API returns experience as a string like "3-5" or "3"
+                    experience_required = f"{experience} years"
+                    # Extract minimum years
+                    if "-" in str(experience):
+                        experience_min_years = int(str(experience).split("-")[0])
+                    else:
+                        experience_min_years = int(experience)
+                except (ValueError, TypeError):
+                    experience_required, experience_min_years = extract_experience_from_text(str(experience))
+
+            # Fallback to parsing from title
+            if experience_min_years is None:
+                experience_required, experience_min_years = extract_experience_from_text(title)
+
+            payload = {
+                "title": title,
+                "company": "TCS",
+                "location": location,
+                "job_url": job_url,
+                "description": description,
+                "experience_required": experience_required,
+                "experience_min_years": experience_min_years
+            }
+
+            logging.info(f"[{i}] {title} at {location} — Exp: {experience_required} ({experience_min_years} yrs)")
+            uploader.add(payload)
+    finally:
+        uploader.close()
 
 if __name__ == "__main__":
     scrape_tcs()
\ No newline at end of file